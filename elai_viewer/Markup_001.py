@@ -1,770 +1,1420 @@
+# Импорт отчёта о времени запуска (первым: время запуска отсчитывается от его импорта)
+from startup_profile import startup_profile
 # Импорт модуля взаимодействия с ОС, выполняет операции с файлами и папками
 import os
-# Импорт библиотеки OpenCV для обработки изображений и видео, для задач компьютерного зрения (CV)
-import cv2
-# Импорт библиотеки NumPy для работы с массивами и математическими операциями
-import numpy as np
-# Импорт классов Image и ImageTk из библиотеки PIL для работы с изображениями и их отображения в Tkinter
-from PIL import Image, ImageTk
+# Импорт модуля разбора аргументов командной строки
+import argparse
+# Импорт модуля журналирования (проверка уровня трассировки геометрии)
+import logging
 # Импорт библиотеки Tkinter для создания графического интерфейса
 import tkinter as tk
 # Импорт модуля messagebox из Tkinter для вывода всплывающих сообщений об ошибках или уведомлениях
 from tkinter import messagebox
+# Импорт ядра просмотрщика без графического интерфейса (кадры, аннотации, кэши, отрисовка)
+from engine import ViewerEngine
+# Импорт масштабирования кадра исходного размера для вывода
+from frame_io import render_scaled, DEFAULT_BOX_COLOR
+# Импорт отложенной загрузки тяжёлых модулей (OpenCV, PIL загружаются при первом использовании)
+from lazy_import import lazy_import
+# Импорт фоновой предзагрузки соседних кадров
+from prefetch import FramePrefetcher
+# Импорт инкрементальной подсветки бокса при наведении
+from hover import HoverRenderer
+# Импорт плиточной отрисовки очень больших кадров
+from tile_renderer import TileRenderer
+# Импорт векторного слоя боксов (элементы canvas поверх изображения)
+from box_overlay import BoxOverlay, tk_color
+# Импорт ленты миниатюр кадров и их построения с кэшем на диске
+from filmstrip import Filmstrip
+from thumbnails import ThumbnailCache, DEFAULT_THUMBNAIL_DIR
+# Импорт профилировщика горячих путей и панели производительности
+from perf import profiler
+from perf_hud import PerfHud
+# Импорт журналирования просмотрщика (уровни, ограничение частоты, вывод в отдельном потоке)
+from logs import get_logger, setup_logging, GEOMETRY_LOGGER
+# Импорт планировщика отрисовки по событиям мыши (слияние событий, не чаще кадра)
+from redraw_scheduler import RedrawScheduler
+startup_profile.mark("imports")
+
+# Формы курсора для маркеров редактирования бокса (углы и края)
+HANDLE_CURSORS = {
+    "top_left": "size_nw_se",
+    "bottom_right": "size_nw_se",
+    "bottom_left": "size_ne_sw",
+    "top_right": "size_ne_sw",
+    "vertical": "size_we",
+    "horizontal": "size_ns",
+}
+
+# Размер отображаемого изображения (в пикселях), начиная с которого кадр
+# выводится плитками по видимой области, а не одним изображением
+TILED_MODE_PIXELS = 8_000_000
+# Интервал опроса фонового сканирования каталога кадров в миллисекундах
+SCAN_POLL_INTERVAL_MS = 100
+# Задержка обновления подсказки дополнения после ввода символа в миллисекундах
+COMPLETION_DELAY_MS = 120
+# Число вариантов дополнения, подсчитываемых для подсказки
+COMPLETION_LIMIT = 10
+# Наименьший интервал между отрисовками по движению мыши в миллисекундах (около 60 кадров в секунду)
+REDRAW_INTERVAL_MS = 16
+# Во сколько раз (не меньше) уменьшается при декодировании первый кадр для чернового показа
+PREVIEW_REDUCTION = 4
+# Интервал опроса фоновой загрузки подробного кадра после чернового показа в миллисекундах
+DETAIL_POLL_INTERVAL_MS = 15
+
+# Журнал просмотрщика и журнал отладочной трассировки геометрии (включается настройкой)
+log = get_logger("viewer")
+geometry_log = logging.getLogger(GEOMETRY_LOGGER)
+# Класс PhotoImage для вывода изображений в Tkinter
+ImageTk = lazy_import("PIL.ImageTk")
 
 #================================================================
-# Функция для просмотра аннотированных кадров. Проверяет существование
-# указанных директорий с кадрами и аннотациями, выводит информацию о них.
-# Если директории не существуют - прерывает выполнение с сообщением.
-# Создаёт окно с интерфейсом для просмотра и редактирования изображений.
+# Класс окна просмотра и редактирования размеченных кадров на Tk.
 #================================================================
-def view_annotated_frames(frames_dir, annotations_dir):
-    # Вывод пути к директории с кадрами для проверки
-    print(f"Проверяемый путь frames_dir: '{frames_dir}'")
-    # Проверка и вывод информации о существовании директории с кадрами
-    print(f"Существует ли frames_dir? {os.path.exists(frames_dir)}")
-    # Если директория существует, показать первые 5 элементов содержимого
-    if os.path.exists(frames_dir):
-        print(f"Содержимое frames_dir: {os.listdir(frames_dir)[:5]}")
-    # Вывод пути к директории с аннотациями для проверки
-    print(f"Проверяемый путь annotations_dir: '{annotations_dir}'")
-    # Проверка и вывод информации о существовании директории с аннотациями
-    print(f"Существует ли annotations_dir? {os.path.exists(annotations_dir)}")
-    # Если директория существует, показать первые 5 элементов содержимого
-    if os.path.exists(annotations_dir):
-        print(f"Содержимое annotations_dir: {os.listdir(annotations_dir)[:5]}")
-    # Проверка отсутствия любой из директорий
-    if not os.path.exists(frames_dir) or not os.path.exists(annotations_dir):
-        # Вывод сообщения об ошибке, если какая-то директория отсутствует
-        print("Папки с кадрами или аннотациями не найдены.")
-        # Выход из функции без выполнения дальнейших операций
-        return
-    
-    # Определение внутреннего класса для управления интерфейсом просмотра и редактирования
-    class ImageViewer:
-        # Инициализация объекта просмотра с передачей параметров    
-        def __init__(self, master, frames_dir, annotations_dir):
-            # Сохранение ссылки на главное окно Tkinter
-            self.master = master
-            # Сохранение пути к директории с кадрами
-            self.frames_dir = frames_dir
-            # Сохранение пути к директории с аннотациями
-            self.annotations_dir = annotations_dir
-            # Создание отсортированного списка файлов изображений с расширениями .png, .jpg, .jpeg
-            self.image_files = sorted([f for f in os.listdir(frames_dir) if f.endswith(('.png', '.jpg', '.jpeg'))])
-            # Установка начального индекса текущего изображения (первое изображение)
-            self.index = 0
-            # Установка начального коэффициента масштабирования изображения (1.0 - без масштаба)
-            self.scale_factor = 1.0
-            # Установка начальной чувствительности перетаскивания изображения
-            self.drag_sensitivity = 0.5
-            # Установка начальной прозрачности затемнения (50%)
-            self.transparency = 0.5
-            # Создание пустого словаря для кэширования обработанных изображений
-            self.image_cache = {}
-            # Установка начального смещения изображения по оси X на canvas
-            self.image_x = 0
-            # Установка начального смещения изображения по оси Y на canvas
-            self.image_y = 0
-            # Установка начальной относительной позиции центра изображения по X (центр по умолчанию)
-            self.relative_center_x = 0.5
-            # Установка начальной относительной позиции центра изображения по Y (центр по умолчанию)
-            self.relative_center_y = 0.5
-            # Создание пустого списка для хранения bounding box'ов текущего кадра
-            self.bboxes = []
-            # Инициализация переменной для хранения исходного изображения (пока None)
-            self.original_frame = None
-            # Создание словаря для хранения цветов классов (по умолчанию несколько цветов)
-            self.class_colors = {"person": (0, 255, 0), "table": (255, 0, 0), "chair": (0, 0, 255)}
-            # Инициализация переменной для хранения текущего редактируемого бокса
-            self.current_box = None
-            # Инициализация переменной для хранения окна редактирования
-            self.edit_window = None
-            # Инициализация переменной для создания нового бокса
-            self.creating_box = False
-            # Инициализация начальных координат для создания бокса
-            self.start_x = self.start_y = None
-            
-            # Установка заголовка главного окна
-            master.title("Просмотр и редактирование размеченных кадров")
-            # Установка размеров и положения окна (ширина 1024, высота 768, смещение +100 по X, +50 по Y)
-            master.geometry("1024x768+100+50")
-            
-            # Создание фрейма для размещения элементов управления
-            self.controls_frame = tk.Frame(master)
-            # Размещение фрейма с отступом 5 пикселей сверху и снизу
-            self.controls_frame.pack(pady=5)
-            
-            # Создание фрейма для кнопок навигации
-            self.nav_frame = tk.Frame(self.controls_frame)
-            # Размещение фрейма навигации внутри controls_frame
-            self.nav_frame.pack()
-            # Создание кнопки "Назад" с командой перехода к предыдущему изображению
-            self.prev_btn = tk.Button(self.nav_frame, text="← Назад", command=self.prev_image)
-            # Размещение кнопки "Назад" слева с отступом 5 пикселей
-            self.prev_btn.pack(side=tk.LEFT, padx=5)
-            # Создание кнопки "Вперёд" с командой перехода к следующему изображению
-            self.next_btn = tk.Button(self.nav_frame, text="Вперед →", command=self.next_image)
-            # Размещение кнопки "Вперёд" слева с отступом 5 пикселей
-            self.next_btn.pack(side=tk.LEFT, padx=5)
-            
-            # Создание надписи с информацией о текущем кадре и общем количестве
-            self.info_label = tk.Label(self.controls_frame, text=f"Кадр 1 из {len(self.image_files)}")
-            # Размещение надписи с отступом 5 пикселей сверху и снизу
-            self.info_label.pack(pady=5)
-            
-            # Создание фрейма для элементов перехода к конкретному кадру
-            self.goto_frame = tk.Frame(self.controls_frame)
-            # Размещение фрейма перехода
-            self.goto_frame.pack()
-            # Создание надписи для поля ввода номера или имени кадра
-            self.frame_entry_label = tk.Label(self.goto_frame, text="Перейти к кадру (№ или имя):")
-            # Размещение надписи слева с отступом 5 пикселей
-            self.frame_entry_label.pack(side=tk.LEFT, padx=5)
-            # Создание поля ввода для номера или имени кадра шириной 20 символов
-            self.frame_entry = tk.Entry(self.goto_frame, width=20)
-            # Размещение поля ввода слева с отступом 5 пикселей
-            self.frame_entry.pack(side=tk.LEFT, padx=5)
-            # Создание кнопки "Перейти" с командой перехода к указанному кадру
-            self.go_btn = tk.Button(self.goto_frame, text="Перейти", command=self.go_to_frame)
-            # Размещение кнопки "Перейти" слева с отступом 5 пикселей
-            self.go_btn.pack(side=tk.LEFT, padx=5)
-            
-            # Создание фрейма для размещения ползунков управления
-            self.sliders_frame = tk.Frame(self.controls_frame)
-            # Размещение фрейма ползунков с отступом 5 пикселей сверху и снизу
-            self.sliders_frame.pack(pady=5)
-            # Создание ползунка масштаба с диапазоном от 0.1 до 3.0, шагом 0.1, горизонтальной ориентацией
-            self.scale_slider = tk.Scale(self.sliders_frame, from_=0.1, to=3.0, resolution=0.1,
-                                        orient=tk.HORIZONTAL, length=200, label="Масштаб",
-                                        command=self.update_scale)
-            # Установка начального значения ползунка масштаба
-            self.scale_slider.set(self.scale_factor)
-            # Размещение ползунка масштаба слева с отступом 10 пикселей
-            self.scale_slider.pack(side=tk.LEFT, padx=10)
-            
-            # Создание ползунка чувствительности перетаскивания с диапазоном от 0.1 до 1.0, шагом 0.1
-            self.sensitivity_slider = tk.Scale(self.sliders_frame, from_=0.1, to=1.0, resolution=0.1,
-                                            orient=tk.HORIZONTAL, length=200, label="Плавность",
-                                            command=self.update_sensitivity)
-            # Установка начального значения ползунка чувствительности
-            self.sensitivity_slider.set(self.drag_sensitivity)
-            # Размещение ползунка чувствительности слева с отступом 10 пикселей
-            self.sensitivity_slider.pack(side=tk.LEFT, padx=10)
-            
-            # Создание ползунка прозрачности затемнения с диапазоном от 0.0 до 1.0, шагом 0.1
-            self.transparency_slider = tk.Scale(self.sliders_frame, from_=0.0, to=1.0, resolution=0.1,
-                                            orient=tk.HORIZONTAL, length=200, label="Прозрачность затемнения",
-                                            command=self.update_transparency)
-            # Установка начального значения ползунка прозрачности
-            self.transparency_slider.set(self.transparency)
-            # Размещение ползунка прозрачности слева с отступом 10 пикселей
-            self.transparency_slider.pack(side=tk.LEFT, padx=10)
-            
-            # Создание надписи с именем текущего файла (по умолчанию "ещё не загружен")
-            self.filename_label = tk.Label(master, text="Файл: (ещё не загружен)")
-            # Размещение надписи с отступом 5 пикселей сверху и снизу
-            self.filename_label.pack(pady=5)
-            
-            # Создание фрейма для области отображения изображения
-            self.canvas_frame = tk.Frame(master)
-            # Размещение фрейма с заполнением всего доступного пространства и возможностью расширения
-            self.canvas_frame.pack(fill=tk.BOTH, expand=True)
-            
-            # Создание canvas для отображения изображения
-            self.canvas = tk.Canvas(self.canvas_frame)
-            # Создание горизонтальной полосы прокрутки, связанной с canvas
-            self.h_scrollbar = tk.Scrollbar(self.canvas_frame, orient=tk.HORIZONTAL, command=self.canvas.xview)
-            # Создание вертикальной полосы прокрутки, связанной с canvas
-            self.v_scrollbar = tk.Scrollbar(self.canvas_frame, orient=tk.VERTICAL, command=self.canvas.yview)
-            # Настройка canvas для работы с полосами прокрутки
-            self.canvas.configure(xscrollcommand=self.h_scrollbar.set, yscrollcommand=self.v_scrollbar.set)
-            
-            # Размещение горизонтальной полосы прокрутки внизу с заполнением по горизонтали
-            self.h_scrollbar.pack(side=tk.BOTTOM, fill=tk.X)
-            # Размещение вертикальной полосы прокрутки справа с заполнением по вертикали
-            self.v_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
-            # Размещение canvas слева с заполнением пространства и возможностью расширения
-            self.canvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
-            
-            # Создание метки для отображения изображения внутри canvas
-            self.image_label = tk.Label(self.canvas, cursor="crosshair")
-            # Вставка метки с изображением в canvas с привязкой к верхнему левому углу
-            self.image_id = self.canvas.create_window((0, 0), window=self.image_label, anchor="nw")
-            
-            # Привязка событий для создания и редактирования bounding box'ов с учётом Ctrl
-            self.image_label.bind("<Button-1>", self.start_box_or_drag)
-            self.image_label.bind("<B1-Motion>", self.update_box_or_drag)
-            self.image_label.bind("<ButtonRelease-1>", self.finish_box_or_drag)
-            self.image_label.bind("<Motion>", self.on_mouse_motion)
-            self.image_label.bind("<MouseWheel>", self.on_mouse_wheel)
-            
-            # Создание словаря для хранения данных о перетаскивании изображения
-            self.drag_data = {"x": 0, "y": 0, "dragging": False}
-            # Создание словаря для хранения данных о редактировании бокса
-            self.edit_data = {"mode": None, "corner": None, "edge": None}
-            
-            # Запуск загрузки первого изображения через 100 миллисекунд после инициализации
-            self.master.after(100, self.load_image)
+class ImageViewer:
+    # Инициализация объекта просмотра с передачей параметров    
+    def __init__(self, master, engine, vector_overlay=False, perf_overlay=False, thumbnails=None):
+        # Сохранение ссылки на главное окно Tkinter
+        self.master = master
+        # Ядро просмотра: источник и список кадров, кэши, аннотации и их запись, текущий кадр
+        self.engine = engine
+        # Варианты дополнения ввода (позиции кадров) и отложенное обновление подсказки
+        self.completions = []
+        self.completion_job = None
+        # Установка начального коэффициента масштабирования изображения (1.0 - без масштаба)
+        self.scale_factor = 1.0
+        # Установка начальной чувствительности перетаскивания изображения
+        self.drag_sensitivity = 0.5
+        # Установка начальной прозрачности затемнения (50%)
+        self.transparency = 0.5
+        # Режим векторного слоя: изображение без боксов, боксы - элементы canvas
+        self.vector_overlay = vector_overlay
+        # Установка начального смещения изображения по оси X на canvas
+        self.image_x = 0
+        # Установка начального смещения изображения по оси Y на canvas
+        self.image_y = 0
+        # Установка начальной относительной позиции центра изображения по X (центр по умолчанию)
+        self.relative_center_x = 0.5
+        # Установка начальной относительной позиции центра изображения по Y (центр по умолчанию)
+        self.relative_center_y = 0.5
+        # Рабочее изображение Tkinter для перерисовок (не из кэша, обновляется на месте)
+        self.work_photo = None
+        # Инициализация переменной для хранения текущего редактируемого бокса
+        self.current_box = None
+        # Инициализация переменной для хранения окна редактирования
+        self.edit_window = None
+        # Инициализация переменной для создания нового бокса
+        self.creating_box = False
+        # Инициализация начальных координат для создания бокса
+        self.start_x = self.start_y = None
+        # Идентификатор запланированного обновления статуса записи
+        self.write_status_id = None
+        # Направление навигации для предзагрузки (+1 - вперёд, -1 - назад)
+        self.prefetch_direction = 1
+        # Создание фоновой предзагрузки соседних кадров
+        self.prefetcher = FramePrefetcher(master, engine.load_pyramid, engine.read_frame_annotations,
+                                          engine.image_cache, engine.class_colors, draw_boxes=not vector_overlay,
+                                          hidden_classes=engine.hidden_classes)
+        
+        # Установка заголовка главного окна
+        master.title("Просмотр и редактирование размеченных кадров")
+        # Установка размеров и положения окна (ширина 1024, высота 768, смещение +100 по X, +50 по Y)
+        master.geometry("1024x768+100+50")
+        
+        # Создание фрейма для размещения элементов управления
+        self.controls_frame = tk.Frame(master)
+        # Размещение фрейма с отступом 5 пикселей сверху и снизу
+        self.controls_frame.pack(pady=5)
+        
+        # Создание фрейма для кнопок навигации
+        self.nav_frame = tk.Frame(self.controls_frame)
+        # Размещение фрейма навигации внутри controls_frame
+        self.nav_frame.pack()
+        # Создание кнопки "Назад" с командой перехода к предыдущему изображению
+        self.prev_btn = tk.Button(self.nav_frame, text="← Назад", command=self.prev_image)
+        # Размещение кнопки "Назад" слева с отступом 5 пикселей
+        self.prev_btn.pack(side=tk.LEFT, padx=5)
+        # Создание кнопки "Вперёд" с командой перехода к следующему изображению
+        self.next_btn = tk.Button(self.nav_frame, text="Вперед →", command=self.next_image)
+        # Размещение кнопки "Вперёд" слева с отступом 5 пикселей
+        self.next_btn.pack(side=tk.LEFT, padx=5)
+        
+        # Создание надписи с информацией о текущем кадре и общем количестве
+        self.info_label = tk.Label(self.controls_frame,
+                                   text=f"Кадр 1 из {len(self.image_files)}" if self.image_files else "Поиск кадров...")
+        # Размещение надписи с отступом 5 пикселей сверху и снизу
+        self.info_label.pack(pady=5)
+        
+        # Создание фрейма для элементов перехода к конкретному кадру
+        self.goto_frame = tk.Frame(self.controls_frame)
+        # Размещение фрейма перехода
+        self.goto_frame.pack()
+        # Создание надписи для поля ввода номера или имени кадра
+        self.frame_entry_label = tk.Label(self.goto_frame, text="Перейти к кадру (№ или имя):")
+        # Размещение надписи слева с отступом 5 пикселей
+        self.frame_entry_label.pack(side=tk.LEFT, padx=5)
+        # Создание поля ввода для номера или имени кадра шириной 20 символов
+        self.frame_entry = tk.Entry(self.goto_frame, width=20)
+        # Размещение поля ввода слева с отступом 5 пикселей
+        self.frame_entry.pack(side=tk.LEFT, padx=5)
+        # Подсказка дополнения при вводе, Tab - подставить вариант, Enter - перейти
+        self.frame_entry.bind("<KeyRelease>", self.schedule_completion)
+        self.frame_entry.bind("<Tab>", self.accept_completion)
+        self.frame_entry.bind("<Return>", lambda event: self.go_to_frame())
+        # Создание кнопки "Перейти" с командой перехода к указанному кадру
+        self.go_btn = tk.Button(self.goto_frame, text="Перейти", command=self.go_to_frame)
+        # Размещение кнопки "Перейти" слева с отступом 5 пикселей
+        self.go_btn.pack(side=tk.LEFT, padx=5)
+        # Создание надписи с подсказкой дополнения имени кадра
+        self.completion_label = tk.Label(self.goto_frame, text="", fg="gray")
+        # Размещение подсказки справа от кнопки
+        self.completion_label.pack(side=tk.LEFT, padx=5)
+        
+        # Создание фрейма для размещения ползунков управления
+        self.sliders_frame = tk.Frame(self.controls_frame)
+        # Размещение фрейма ползунков с отступом 5 пикселей сверху и снизу
+        self.sliders_frame.pack(pady=5)
+        # Создание ползунка масштаба с диапазоном от 0.1 до 3.0, шагом 0.1, горизонтальной ориентацией
+        self.scale_slider = tk.Scale(self.sliders_frame, from_=0.1, to=3.0, resolution=0.1,
+                                    orient=tk.HORIZONTAL, length=200, label="Масштаб",
+                                    command=self.update_scale)
+        # Установка начального значения ползунка масштаба
+        self.scale_slider.set(self.scale_factor)
+        # Размещение ползунка масштаба слева с отступом 10 пикселей
+        self.scale_slider.pack(side=tk.LEFT, padx=10)
+        
+        # Создание ползунка чувствительности перетаскивания с диапазоном от 0.1 до 1.0, шагом 0.1
+        self.sensitivity_slider = tk.Scale(self.sliders_frame, from_=0.1, to=1.0, resolution=0.1,
+                                        orient=tk.HORIZONTAL, length=200, label="Плавность",
+                                        command=self.update_sensitivity)
+        # Установка начального значения ползунка чувствительности
+        self.sensitivity_slider.set(self.drag_sensitivity)
+        # Размещение ползунка чувствительности слева с отступом 10 пикселей
+        self.sensitivity_slider.pack(side=tk.LEFT, padx=10)
+        
+        # Создание ползунка прозрачности затемнения с диапазоном от 0.0 до 1.0, шагом 0.1
+        self.transparency_slider = tk.Scale(self.sliders_frame, from_=0.0, to=1.0, resolution=0.1,
+                                        orient=tk.HORIZONTAL, length=200, label="Прозрачность затемнения",
+                                        command=self.update_transparency)
+        # Установка начального значения ползунка прозрачности
+        self.transparency_slider.set(self.transparency)
+        # Размещение ползунка прозрачности слева с отступом 10 пикселей
+        self.transparency_slider.pack(side=tk.LEFT, padx=10)
+        
+        # Создание фрейма флажков видимости классов (флажок добавляется для каждого нового класса)
+        self.classes_frame = tk.Frame(self.controls_frame)
+        self.classes_frame.pack(pady=2)
+        tk.Label(self.classes_frame, text="Классы:").pack(side=tk.LEFT, padx=5)
+        # Флажки видимости: имя класса -> переменная Tk
+        self.class_vars = {}
+        self.update_class_toggles()
+        
+        # Создание надписи с именем текущего файла (по умолчанию "ещё не загружен")
+        self.filename_label = tk.Label(master, text="Файл: (ещё не загружен)")
+        # Размещение надписи с отступом 5 пикселей сверху и снизу
+        self.filename_label.pack(pady=5)
+        # Создание надписи со статусом фоновой записи аннотаций (пустая, пока нечего сообщить)
+        self.write_status_label = tk.Label(master, text="")
+        # Размещение надписи под именем файла
+        self.write_status_label.pack()
+        
+        # Создание фрейма для области отображения изображения
+        self.canvas_frame = tk.Frame(master)
+        # Размещение фрейма с заполнением всего доступного пространства и возможностью расширения
+        self.canvas_frame.pack(fill=tk.BOTH, expand=True)
+        
+        # Лента миниатюр кадров под областью изображения (размещается раньше неё,
+        # чтобы при уменьшении окна сжималась область изображения, а не лента)
+        self.filmstrip_frame = tk.Frame(master)
+        self.filmstrip_frame.pack(side=tk.BOTTOM, fill=tk.X, before=self.canvas_frame)
+        self.filmstrip = Filmstrip(master, self.filmstrip_frame, thumbnails, engine.frame_path, self.select_frame)
+        self.filmstrip.set_names(self.image_files)
+        
+        # Создание canvas для отображения изображения
+        self.canvas = tk.Canvas(self.canvas_frame)
+        # Создание горизонтальной полосы прокрутки, связанной с canvas
+        self.h_scrollbar = tk.Scrollbar(self.canvas_frame, orient=tk.HORIZONTAL, command=self.scroll_x)
+        # Создание вертикальной полосы прокрутки, связанной с canvas
+        self.v_scrollbar = tk.Scrollbar(self.canvas_frame, orient=tk.VERTICAL, command=self.scroll_y)
+        # Настройка canvas для работы с полосами прокрутки
+        self.canvas.configure(xscrollcommand=self.h_scrollbar.set, yscrollcommand=self.v_scrollbar.set)
+        
+        # Размещение горизонтальной полосы прокрутки внизу с заполнением по горизонтали
+        self.h_scrollbar.pack(side=tk.BOTTOM, fill=tk.X)
+        # Размещение вертикальной полосы прокрутки справа с заполнением по вертикали
+        self.v_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        # Размещение canvas слева с заполнением пространства и возможностью расширения
+        self.canvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        
+        # Создание метки для отображения изображения внутри canvas
+        self.image_label = tk.Label(self.canvas, cursor="crosshair")
+        # Вставка метки с изображением в canvas с привязкой к верхнему левому углу
+        self.image_id = self.canvas.create_window((0, 0), window=self.image_label, anchor="nw")
+        # Изображение метки (None - кадр ещё не показан)
+        self.tk_image = None
+        # Создание подсветки бокса при наведении, работающей с изображением метки
+        self.hover_renderer = HoverRenderer(self.image_label)
+        
+        # Привязка событий для создания и редактирования bounding box'ов с учётом Ctrl
+        self.image_label.bind("<Button-1>", self.start_box_or_drag)
+        self.image_label.bind("<B1-Motion>", self.update_box_or_drag)
+        self.image_label.bind("<ButtonRelease-1>", self.finish_box_or_drag)
+        self.image_label.bind("<Motion>", self.on_mouse_motion)
+        self.image_label.bind("<MouseWheel>", self.on_mouse_wheel)
+        
+        # Плиточная отрисовка очень больших кадров прямо на canvas (метка при этом скрыта)
+        self.tile_renderer = TileRenderer(self.canvas)
+        # Признак плиточного режима для текущего кадра и масштаба
+        self.tiled_mode = False
+        # Версия содержимого кадра (меняется при перерисовке боксов) для ключа плиток
+        self.render_version = 0
+        
+        # Изображение без боксов как элемент canvas (элементы-окна всегда выше
+        # остальных элементов, поэтому векторный слой над меткой невозможен)
+        self.raster_id = self.canvas.create_image(0, 0, anchor="nw", state="hidden")
+        # Векторный слой боксов, подписей и маркеров углов
+        self.overlay = BoxOverlay(self.canvas, self.class_colors, engine.hidden_classes)
+        # Бокс, маркеры углов которого показаны в векторном слое
+        self.overlay_hovered = None
+        # Изображение элемента canvas (ссылка от сборщика мусора)
+        self.raster_image = None
+        # Подсветка бокса при наведении для изображения-элемента canvas
+        self.overlay_hover = HoverRenderer(
+            self.canvas, show=lambda image: self.canvas.itemconfigure(self.raster_id, image=image))
+        # Режим фокуса: вне выбранных боксов (Shift+щелчок) и боксов выбранных классов
+        # (клавиша F над боксом) кадр затемнён; выбор боксов действует в пределах кадра
+        self.focus_selected = set()
+        self.focus_classes = set()
+        # Кадр, к которому относятся выбранные боксы
+        self.focus_filename = None
+        # Версия набора боксов фокуса (часть ключа затемнённого варианта плиток)
+        self.focus_version = 0
+        # Бокс под указателем (индекс или None)
+        self.hovered_box = None
+        if vector_overlay:
+            self.canvas.itemconfigure(self.image_id, state="hidden")
+            self.canvas.itemconfigure(self.raster_id, state="normal")
+            self.canvas.config(cursor="crosshair")
+        
+        # В плиточном режиме и в режиме векторного слоя события мыши приходят от canvas, а не от метки
+        for sequence, handler in (("<Button-1>", self.start_box_or_drag),
+                                  ("<B1-Motion>", self.update_box_or_drag),
+                                  ("<ButtonRelease-1>", self.finish_box_or_drag),
+                                  ("<Motion>", self.on_mouse_motion),
+                                  ("<MouseWheel>", self.on_mouse_wheel)):
+            self.canvas.bind(sequence, lambda event, handler=handler: self.canvas_events() and handler(event))
+        # Дорисовка плиток при изменении размера окна
+        self.canvas.bind("<Configure>", lambda event: self.tiled_mode and self.render_tiles())
+        
+        # Панель производительности поверх области изображения (замеры включены, пока она видна)
+        self.perf_hud = PerfHud(master, self.canvas_frame, profiler, self.image_cache)
+        master.bind("<F3>", lambda event: self.perf_hud.toggle())
+        master.bind("<Control-F3>", lambda event: self.perf_hud.export_trace())
+        # Фокус на классе бокса под указателем (F) и сброс фокуса (Escape)
+        master.bind("<KeyPress-f>", self.toggle_focus_class)
+        master.bind("<KeyPress-F>", self.toggle_focus_class)
+        master.bind("<Escape>", self.clear_focus)
+        if perf_overlay:
+            self.perf_hud.show()
+        
+        # Планировщик отрисовки по движению мыши: события между кадрами сливаются в одно
+        self.redraw = RedrawScheduler(master, REDRAW_INTERVAL_MS)
+        
+        # Создание словаря для хранения данных о перетаскивании изображения
+        self.drag_data = {"x": 0, "y": 0, "dragging": False}
+        # Создание словаря для хранения данных о редактировании бокса
+        self.edit_data = {"mode": None, "corner": None, "edge": None}
+        
+        # Заглушка на месте изображения до показа первого кадра
+        self.placeholder_id = self.canvas.create_text(20, 20, anchor="nw", text="Загрузка кадра...", fill="gray")
+        # Первый кадр декодируется уменьшенным и показывается черновым, подробный - загружается в фоне
+        self.first_frame = True
+        startup_profile.mark("widgets")
+        # Вывод окна с заглушкой на экран до чтения кадров
+        master.update()
+        startup_profile.mark("first_paint")
+        
+        # Загрузка первого изображения, если список кадров уже известен (видео, кэш списка),
+        # иначе первый кадр загрузится, как только его найдёт фоновое сканирование
+        if self.image_files:
+            self.master.after_idle(self.load_image)
+        # Опрос фонового сканирования каталога кадров
+        self.poll_frame_list()
 
-        #================================================================
-        # Функция загрузки и отображения текущего изображения. Открывает файл,
-        # считывает аннотации, рисует bounding box'ы с цветами по классам и обновляет интерфейс.
-        #================================================================
-        def load_image(self):
-            # Проверка наличия изображений в списке
-            if not self.image_files:
-                # Вывод сообщения, если изображений нет
-                print("Нет изображений для отображения")
-                # Выход из функции
-                return
-            
-            # Закрытие окна редактирования, если оно открыто
-            if self.edit_window:
-                self.edit_window.destroy()
-                self.edit_window = None
-                self.current_box = None
-            
-            # Формирование полного пути к текущему изображению
-            image_path = os.path.join(self.frames_dir, self.image_files[self.index])
-            # Создание ключа для кэша на основе имени файла и текущего масштаба
-            cache_key = (self.image_files[self.index], self.scale_factor)
-            
-            # Проверка наличия изображения в кэше
-            if cache_key in self.image_cache:
-                # Использование кэшированного изображения
-                self.tk_image = self.image_cache[cache_key]
-            # Если изображения нет в кэше, выполнить загрузку и обработку
-            else:
-                # Попытка открытия изображения
-                try:
-                    # Открытие файла изображения с помощью PIL
-                    img = Image.open(image_path)
-                # Обработка возможных ошибок при открытии файла
-                except Exception as e:
-                    # Вывод сообщения об ошибке с указанием пути
-                    print(f"Ошибка загрузки изображения {image_path}: {e}")
-                    # Выход из функции
-                    return
-                
-                # Преобразование изображения в формат BGR для работы с OpenCV
-                frame = cv2.cvtColor(np.array(img), cv2.COLOR_RGB2BGR)
-                # Сохранение копии исходного изображения для последующей обработки
-                self.original_frame = frame.copy()
-                # Очистка списка bounding box'ов перед загрузкой новых
-                self.bboxes = []
-                
-                # Формирование имени файла аннотации (замена расширения на .txt)
-                current_frame_name = self.image_files[self.index].replace('.jpg', '.txt')
-                # Формирование полного пути к файлу аннотации
-                annotation_path = os.path.join(self.annotations_dir, current_frame_name)
-                
-                # Проверка существования файла аннотации
-                if os.path.exists(annotation_path):
-                    # Открытие файла аннотации для чтения
-                    with open(annotation_path, 'r') as f:
-                        # Чтение всех строк из файла аннотации
-                        annotations = f.readlines()
-                    # Обработка каждой строки аннотации
-                    for ann in annotations:
-                        # Разделение строки на части (класс и координаты)
-                        parts = ann.strip().split()
-                        # Проверка, что строка содержит 5 элементов (класс и 4 координаты)
-                        if len(parts) == 5:
-                            # Попытка парсинга данных аннотации
-                            try:
-                                # Первый элемент - класс объекта (строка)
-                                class_name = parts[0]
-                                # Преобразование координат в числа с плавающей точкой
-                                x1, y1, x2, y2 = map(float, parts[1:])
-                                # Преобразование координат в целые числа для OpenCV
-                                x1, y1, x2, y2 = int(x1), int(y1), int(x2), int(y2)
-                                # Добавление bounding box'а в список (класс и координаты)
-                                self.bboxes.append((class_name, x1, y1, x2, y2))
-                                # Получение цвета для текущего класса (по умолчанию зелёный, если класса нет в словаре)
-                                color = self.class_colors.get(class_name, (0, 255, 0))
-                                # Рисование прямоугольника bounding box'а на изображении с цветом класса
-                                cv2.rectangle(frame, (x1, y1), (x2, y2), color, 2)
-                                # Добавление текста с классом над bounding box'ом
-                                cv2.putText(frame, f"{class_name}", (x1, y1 - 10), 
-                                            cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 2)
-                            # Обработка ошибок при парсинге аннотации
-                            except ValueError as e:
-                                # Вывод сообщения об ошибке парсинга
-                                print(f"Ошибка разбора аннотации: {e}")
-                
-                # Преобразование изображения обратно в RGB для отображения
-                frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                # Создание объекта PIL Image из массива RGB
-                img = Image.fromarray(frame_rgb)
-                # Вычисление новой ширины изображения с учётом масштаба
-                new_width = int(img.width * self.scale_factor)
-                # Вычисление новой высоты изображения с учётом масштаба
-                new_height = int(img.height * self.scale_factor)
-                # Изменение размера изображения с использованием алгоритма LANCZOS
-                img = img.resize((new_width, new_height), Image.Resampling.LANCZOS)
-                
-                # Преобразование изображения в формат, пригодный для Tkinter
-                self.tk_image = ImageTk.PhotoImage(image=img)
-                # Сохранение обработанного изображения в кэш
-                self.image_cache[cache_key] = self.tk_image
-            
-            # Установка нового изображения в метку для отображения
-            self.image_label.configure(image=self.tk_image)
-            # Сохранение ссылки на изображение для предотвращения удаления сборщиком мусора
-            self.image_label.image = self.tk_image
-            
-            # Получение ширины canvas (по умолчанию 1024, если не определена)
-            canvas_width = self.canvas.winfo_width() or 1024
-            # Получение высоты canvas (по умолчанию 768, если не определена)
-            canvas_height = self.canvas.winfo_height() or 768
-            # Получение ширины текущего изображения
-            img_width = self.tk_image.width()
-            # Получение высоты текущего изображения
-            img_height = self.tk_image.height()
-            
-            # Вычисление координаты X центра изображения
-            center_x = img_width * self.relative_center_x
-            # Вычисление координаты Y центра изображения
-            center_y = img_height * self.relative_center_y
-            # Вычисление смещения по X для центрирования изображения на canvas
-            self.image_x = center_x - canvas_width // 2
-            # Вычисление смещения по Y для центрирования изображения на canvas
-            self.image_y = center_y - canvas_height // 2
-            
-            # Обновление позиции изображения на canvas
-            self.update_position()
-            
-            # Обновление текста надписи с информацией о текущем кадре и масштабе
-            self.info_label.configure(text=f"Кадр {self.index + 1} из {len(self.image_files)} (Масштаб: {self.scale_factor:.1f}x)")
-            # Обновление текста надписи с именем текущего файла
-            self.filename_label.configure(text=f"Файл: {self.image_files[self.index]}")
+    #================================================================
+    # Функция опроса фонового сканирования каталога кадров. Забирает
+    # новую версию списка, сохраняет позицию текущего кадра (новые
+    # кадры могут оказаться перед ним) и загружает первый найденный кадр.
+    #================================================================
+    def poll_frame_list(self):
+        if self.engine.poll():
+            self.filmstrip.set_names(self.image_files)
+            if self.engine.loaded_filename is not None:
+                self.update_info_label()
+                self.filmstrip.set_current(self.index)
+            elif self.image_files:
+                self.load_image()
+        # Сканирование продолжается - следующий опрос
+        if not self.engine.complete:
+            self.master.after(SCAN_POLL_INTERVAL_MS, self.poll_frame_list)
+            return
+        if not self.image_files:
+            self.info_label.configure(text="Кадры не найдены")
+        # Список кадров полный - построение индекса поиска в фоне
+        self.engine.build_frame_index()
 
-        #================================================================
-        # Функция начала создания нового бокса или перетаскивания изображения.
-        # Разделяет действия: создание бокса (ЛКМ) и перетаскивание (Ctrl + ЛКМ).
-        #================================================================
-        def start_box_or_drag(self, event):
-            # Преобразование координат мыши в исходные координаты изображения
-            orig_x = event.x / self.scale_factor
-            orig_y = event.y / self.scale_factor
-            
-            # Проверка, зажата ли клавиша Ctrl (event.state & 0x4 означает Ctrl)
-            ctrl_pressed = event.state & 0x4
-            
-            # Если Ctrl зажат, начать перетаскивание изображения
-            if ctrl_pressed:
-                self.drag_data["x"] = event.x
-                self.drag_data["y"] = event.y
-                self.drag_data["dragging"] = True
-                return
-            
-            # Проверка, попадает ли курсор в существующий бокс (без Ctrl)
-            for i, (class_name, x1, y1, x2, y2) in enumerate(self.bboxes):
-                if x1 <= orig_x <= x2 and y1 <= orig_y <= y2:
-                    # Установка текущего редактируемого бокса
-                    self.current_box = i
-                    # Проверка положения курсора для определения режима редактирования
-                    if abs(orig_x - x1) < 10 and abs(orig_y - y1) < 10:
-                        self.edit_data["mode"] = "resize"
-                        self.edit_data["corner"] = "top_left"
-                    elif abs(orig_x - x2) < 10 and abs(orig_y - y2) < 10:
-                        self.edit_data["mode"] = "resize"
-                        self.edit_data["corner"] = "bottom_right"
-                    elif abs(orig_x - x1) < 10 and abs(orig_y - y2) < 10:
-                        self.edit_data["mode"] = "resize"
-                        self.edit_data["corner"] = "bottom_left"
-                    elif abs(orig_x - x2) < 10 and abs(orig_y - y1) < 10:
-                        self.edit_data["mode"] = "resize"
-                        self.edit_data["corner"] = "top_right"
-                    elif abs(orig_x - x1) < 10 or abs(orig_x - x2) < 10:
-                        self.edit_data["mode"] = "move"
-                        self.edit_data["edge"] = "vertical"
-                    elif abs(orig_y - y1) < 10 or abs(orig_y - y2) < 10:
-                        self.edit_data["mode"] = "move"
-                        self.edit_data["edge"] = "horizontal"
-                    else:
-                        self.edit_data["mode"] = "drag_box"
-                    # Открытие окна редактирования для выбранного бокса
-                    self.open_edit_window()
-                    return
-            
-            # Если Ctrl не зажат и курсор не в боксе, начать создание нового бокса
-            self.creating_box = True
-            self.start_x = orig_x
-            self.start_y = orig_y
+    # Список имён кадров и индекс текущего кадра хранятся в ядре
+    @property
+    def image_files(self):
+        return self.engine.image_files
 
-        #================================================================
-        # Функция обновления создаваемого бокса или перетаскивания.
-        # Рисует новый бокс в реальном времени или перемещает изображение.
-        #================================================================
-        def update_box_or_drag(self, event):
-            # Преобразование координат мыши в исходные координаты изображения
-            orig_x = event.x / self.scale_factor
-            orig_y = event.y / self.scale_factor
-            
-            # Если создаётся новый бокс
-            if self.creating_box and self.start_x != orig_x and self.start_y != orig_y:
-                # Создание временной копии изображения
-                frame = self.original_frame.copy()
-                # Отрисовка существующих боксов
-                for class_name, x1, y1, x2, y2 in self.bboxes:
-                    color = self.class_colors.get(class_name, (0, 255, 0))
-                    cv2.rectangle(frame, (x1, y1), (x2, y2), color, 2)
-                # Отрисовка создаваемого бокса
-                x1, y1 = int(min(self.start_x, orig_x)), int(min(self.start_y, orig_y))
-                x2, y2 = int(max(self.start_x, orig_x)), int(max(self.start_y, orig_y))
-                cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 255, 0), 2)
-                # Обновление изображения
-                self.update_image(frame)
-            
-            # Если редактируется существующий бокс
-            elif self.current_box is not None and self.edit_data["mode"]:
-                class_name, x1, y1, x2, y2 = self.bboxes[self.current_box]
-                if self.edit_data["mode"] == "resize":
-                    if self.edit_data["corner"] == "top_left":
-                        x1, y1 = int(orig_x), int(orig_y)
-                    elif self.edit_data["corner"] == "bottom_right":
-                        x2, y2 = int(orig_x), int(orig_y)
-                    elif self.edit_data["corner"] == "bottom_left":
-                        x1, y2 = int(orig_x), int(orig_y)
-                    elif self.edit_data["corner"] == "top_right":
-                        x2, y1 = int(orig_x), int(orig_y)
-                elif self.edit_data["mode"] == "move":
-                    dx = int(orig_x - (x1 + x2) / 2)
-                    dy = int(orig_y - (y1 + y2) / 2)
-                    x1 += dx
-                    x2 += dx
-                    y1 += dy
-                    y2 += dy
-                # Обновление координат бокса
-                self.bboxes[self.current_box] = (class_name, x1, y1, x2, y2)
-                # Перерисовка изображения
-                self.redraw_image()
-            
-            # Если перетаскивается изображение (с Ctrl)
-            elif self.drag_data["dragging"]:
-                # Вычисление смещения по X с учётом чувствительности
-                dx = int((event.x - self.drag_data["x"]) * self.drag_sensitivity)
-                # Вычисление смещения по Y с учётом чувствительности
-                dy = int((event.y - self.drag_data["y"]) * self.drag_sensitivity)
-                # Обновление позиции изображения по X
-                self.image_x += dx
-                # Обновление позиции изображения по Y
-                self.image_y += dy
-                # Применение новой позиции
-                self.update_position()
-                # Обновление текущих координат мыши
-                self.drag_data["x"] = event.x
-                self.drag_data["y"] = event.y
+    @property
+    def index(self):
+        return self.engine.index
 
+    @index.setter
+    def index(self, value):
+        self.engine.index = value
 
-        #================================================================
-        # Функция завершения создания бокса или перетаскивания.
-        # Финализирует новый бокс или завершает редактирование.
-        #================================================================
-        def finish_box_or_drag(self, event):
-            # Преобразование координат мыши в исходные координаты изображения
-            orig_x = event.x / self.scale_factor
-            orig_y = event.y / self.scale_factor
-            
-            # Если создавался новый бокс
-            if self.creating_box:
-                self.creating_box = False
-                if self.start_x != orig_x and self.start_y != orig_y:
-                    x1, y1 = int(min(self.start_x, orig_x)), int(min(self.start_y, orig_y))
-                    x2, y2 = int(max(self.start_x, orig_x)), int(max(self.start_y, orig_y))
-                    # Добавление нового бокса с временным классом "new"
-                    self.bboxes.append(("new", x1, y1, x2, y2))
-                    self.current_box = len(self.bboxes) - 1
-                    # Открытие окна редактирования для нового бокса
-                    self.open_edit_window()
-                self.redraw_image()
-            
-            # Завершение редактирования бокса
-            elif self.current_box is not None:
-                self.edit_data["mode"] = None
-                self.edit_data["corner"] = None
-                self.edit_data["edge"] = None
-            
-            # Завершение перетаскивания изображения
-            self.drag_data["dragging"] = False
-        
-        #================================================================
-        # Функция открытия окна редактирования bounding box'а.
-        # Позволяет задать класс, удалить или сохранить бокс.
-        #================================================================
-        def open_edit_window(self):
-            # Закрытие предыдущего окна редактирования, если оно открыто
-            if self.edit_window:
-                self.edit_window.destroy()
-            
-            # Создание нового окна редактирования
-            self.edit_window = tk.Toplevel(self.master)
-            self.edit_window.title("Редактирование Bounding Box")
-            self.edit_window.geometry("300x150")
-            
-            # Получение данных текущего бокса
-            class_name, x1, y1, x2, y2 = self.bboxes[self.current_box]
-            
-            # Создание поля ввода класса
-            tk.Label(self.edit_window, text="Класс:").pack(pady=5)
-            class_entry = tk.Entry(self.edit_window)
-            class_entry.insert(0, class_name)
-            class_entry.pack()
-            
-            # Создание кнопки удаления бокса
-            delete_btn = tk.Button(self.edit_window, text="Удалить", 
-                                 command=lambda: self.delete_box(class_entry))
-            delete_btn.pack(pady=5)
-            
-            # Создание кнопки сохранения бокса
-            save_btn = tk.Button(self.edit_window, text="Сохранить", 
-                               command=lambda: self.save_box(class_entry))
-            save_btn.pack(pady=5)
-        
-        #================================================================
-        # Функция удаления текущего bounding box'а.
-        # Удаляет бокс из списка и обновляет изображение.
-        #================================================================
-        def delete_box(self, class_entry):
-            # Удаление текущего бокса из списка
-            del self.bboxes[self.current_box]
-            # Закрытие окна редактирования
-            self.edit_window.destroy()
-            self.edit_window = None
-            self.current_box = None
-            # Перерисовка изображения без удалённого бокса
-            self.redraw_image()
+    # Кэш изображений и цвета классов ядра
+    @property
+    def image_cache(self):
+        return self.engine.image_cache
+
+    @property
+    def class_colors(self):
+        return self.engine.class_colors
+
+    # Текущий кадр (FrameDocument), его пирамида масштабов и боксы (None - кадр не загружен)
+    @property
+    def document(self):
+        return self.engine.document
+
+    @property
+    def pyramid(self):
+        return None if self.document is None else self.document.pyramid
+
+    @property
+    def bboxes(self):
+        return None if self.document is None else self.document.store
+
+    # Исходный кадр (RGB, только для чтения, отрисовка идёт в копиях); после
+    # уменьшенного декодирования загружается при первом обращении
+    @property
+    def original_frame(self):
+        return None if self.document is None else self.document.original_frame
+
+    # Обновление надписи с номером текущего кадра, их количеством и масштабом
+    def update_info_label(self):
+        scanning = "" if self.engine.complete else " - поиск кадров..."
+        self.info_label.configure(text=f"Кадр {self.index + 1} из {len(self.image_files)}{scanning} "
+                                       f"(Масштаб: {self.scale_factor:.1f}x)")
+
+    #================================================================
+    # Функция загрузки и отображения текущего изображения. Открывает файл,
+    # считывает аннотации, рисует bounding box'ы с цветами по классам и обновляет интерфейс.
+    #================================================================
+    @profiler.traced("load_image")
+    def load_image(self):
+        # Проверка наличия изображений в списке
+        if not self.image_files:
+            # Вывод сообщения, если изображений нет
+            log.info("Нет изображений для отображения")
+            # Выход из функции
+            return
         
-        #================================================================
-        # Функция сохранения текущего bounding box'а.
-        # Обновляет класс и записывает аннотации в файл.
-        #================================================================
-        def save_box(self, class_entry):
-            # Получение нового класса из поля ввода
-            new_class = class_entry.get().strip()
-            if not new_class:
-                new_class = "unknown"
-            # Обновление класса текущего бокса
-            _, x1, y1, x2, y2 = self.bboxes[self.current_box]
-            self.bboxes[self.current_box] = (new_class, x1, y1, x2, y2)
-            # Запись всех боксов в файл аннотации
-            annotation_path = os.path.join(self.annotations_dir, 
-                                         self.image_files[self.index].replace('.jpg', '.txt'))
-            with open(annotation_path, 'w') as f:
-                for class_name, x1, y1, x2, y2 in self.bboxes:
-                    f.write(f"{class_name} {x1} {y1} {x2} {y2}\n")
-            # Закрытие окна редактирования
+        # Закрытие окна редактирования, если оно открыто
+        if self.edit_window:
             self.edit_window.destroy()
             self.edit_window = None
             self.current_box = None
-            # Перерисовка изображения
-            self.redraw_image()
         
-        #================================================================
-        # Функция обработки движения мыши. Подсвечивает бокс при наведении
-        # и обновляет курсор для редактирования.
-        #================================================================
-        def on_mouse_motion(self, event):
-            # Проверка наличия исходного изображения и bounding box'ов
-            if self.original_frame is None or not self.bboxes:
-                # Выход из функции, если данных нет
-                return
-            
-            # Преобразование координат мыши в исходные координаты изображения
-            orig_x = event.x / self.scale_factor
-            orig_y = event.y / self.scale_factor
-            # Вывод координат мыши на canvas для отладки
-            print(f"Координаты мыши на canvas: ({event.x}, {event.y})")
-            # Вывод текущего масштаба для отладки
-            print(f"Масштаб: {self.scale_factor}")
-            # Вывод координат в исходном изображении для отладки
-            print(f"Координаты в исходном изображении: ({orig_x}, {orig_y})")
-            
-            # Создание копии изображения для обработки
-            frame = self.original_frame.copy()
-            highlighted = False
-            
-            # Проверка попадания курсора в бокс для подсветки
-            for i, (class_name, x1, y1, x2, y2) in enumerate(self.bboxes):
-                # Вывод координат проверяемого бокса для отладки
-                print(f"Проверка бокса {class_name}: ({x1}, {y1}, {x2}, {y2})")
-                if x1 <= orig_x <= x2 and y1 <= orig_y <= y2:
-                    # Создание затемнённого слоя
-                    overlay = frame.copy()
-                    cv2.rectangle(overlay, (0, 0), (frame.shape[1], frame.shape[0]), (100, 100, 100), -1)
-                    alpha = self.transparency
-                    cv2.addWeighted(overlay, alpha, frame, 1 - alpha, 0, frame)
-                    # Восстановление области внутри бокса
-                    frame[y1:y2, x1:x2] = self.original_frame[y1:y2, x1:x2]
-                    highlighted = True
-                    # Вывод сообщения о подсветке для отладки
-                    print(f"Подсвечен бокс {class_name}")
-                    break
-            
-            # Отрисовка всех боксов
-            for class_name, x1, y1, x2, y2 in self.bboxes:
-                color = self.class_colors.get(class_name, (0, 255, 0))
-                cv2.rectangle(frame, (x1, y1), (x2, y2), color, 2)
-                cv2.putText(frame, f"{class_name}", (x1, y1 - 10), 
-                            cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 2)
-            
-            # Обновление курсора для редактирования
-            for i, (class_name, x1, y1, x2, y2) in enumerate(self.bboxes):
-                if x1 <= orig_x <= x2 and y1 <= orig_y <= y2:
-                    if abs(orig_x - x1) < 10 and abs(orig_y - y1) < 10:
-                        self.image_label.config(cursor="size_nw_se")
-                    elif abs(orig_x - x2) < 10 and abs(orig_y - y2) < 10:
-                        self.image_label.config(cursor="size_nw_se")
-                    elif abs(orig_x - x1) < 10 and abs(orig_y - y2) < 10:
-                        self.image_label.config(cursor="size_ne_sw")
-                    elif abs(orig_x - x2) < 10 and abs(orig_y - y1) < 10:
-                        self.image_label.config(cursor="size_ne_sw")
-                    elif abs(orig_x - x1) < 10 or abs(orig_x - x2) < 10:
-                        self.image_label.config(cursor="size_we")
-                    elif abs(orig_y - y1) < 10 or abs(orig_y - y2) < 10:
-                        self.image_label.config(cursor="size_ns")
-                    else:
-                        self.image_label.config(cursor="crosshair")
-                    break
-            else:
-                self.image_label.config(cursor="crosshair")
+        # Отложенные по движению мыши отрисовки относятся к прежнему изображению
+        self.redraw.invalidate()
+        # Имя текущего файла изображения (ключ кэша)
+        filename = self.engine.filename
+        # Загрузка кадра ядром: пирамида масштабов из кэша или декодирование
+        # (при масштабе меньше 0.5 - уменьшенное), аннотации из кэша или из файла
+        try:
+            document = self.engine.load(self.scale_factor, PREVIEW_REDUCTION if self.first_frame else 1)
+        # Обработка возможных ошибок при открытии файла
+        except Exception as e:
+            # Вывод сообщения об ошибке с указанием имени кадра
+            log.error("Ошибка загрузки изображения %s: %s", filename, e)
+            # Выход из функции
+            return
+        
+        # Выбранные боксы относятся к прежнему кадру (фокус на классах сохраняется)
+        self.hovered_box = None
+        if filename != self.focus_filename:
+            self.focus_filename = filename
+            if self.focus_selected:
+                self.focus_selected.clear()
+                self.focus_version += 1
+        
+        # Очень большое изображение выводится плитками только в пределах видимой области
+        width, height = document.size
+        self.set_tiled_mode(width * height * self.scale_factor ** 2 > TILED_MODE_PIXELS)
+        if self.tiled_mode:
+            # Источник плиток пересобирается только при смене кадра (масштаб берётся из пирамиды)
+            key = self.tile_renderer.source_key
+            if key is None or key[0] != filename:
+                self.render_version += 1
+                # В режиме векторного слоя источник - кадр без боксов
+                source = document.original_frame if self.vector_overlay else document.annotated_frame()
+                self.tile_renderer.set_source((filename, self.render_version), source, self.make_tile_variant,
+                                              self.tile_variant())
+        # Поиск готового масштабированного изображения в кэше
+        else:
+            self.tk_image = self.image_cache.get_render(filename, self.scale_factor, plain=self.vector_overlay,
+                                                        hidden=self.engine.class_filter)
+        # Кадр декодирован уменьшенным, а масштаб требует подробного - черновой показ
+        # без загрузки исходного кадра (подробный загружается в фоне, см. wait_detail)
+        coarse = not self.tiled_mode and not document.detailed_for(self.scale_factor)
+        # Если изображения нет в кэше, выполнить отрисовку и масштабирование
+        if not self.tiled_mode and self.tk_image is None:
+            # Пересчёт из ближайшего уровня пирамиды и отрисовка боксов в экранном размере
+            # (в режиме векторного слоя боксы не рисуются)
+            img = document.render(self.scale_factor, boxes=not self.vector_overlay, coarse=coarse)
             
-            # Обновление изображения
-            self.update_image(frame)
-        
-        #================================================================
-        # Вспомогательная функция для перерисовки изображения.
-        # Используется после изменения боксов.
-        #================================================================
-        def redraw_image(self):
-            # Создание копии изображения
-            frame = self.original_frame.copy()
-            # Отрисовка всех боксов
-            for class_name, x1, y1, x2, y2 in self.bboxes:
-                color = self.class_colors.get(class_name, (0, 255, 0))
-                cv2.rectangle(frame, (x1, y1), (x2, y2), color, 2)
-                cv2.putText(frame, f"{class_name}", (x1, y1 - 10), 
-                            cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 2)
-            # Обновление изображения
-            self.update_image(frame)
-        
-        #================================================================
-        # Вспомогательная функция для обновления изображения на canvas.
-        # Преобразует массив в Tkinter-формат и отображает.
-        #================================================================
-        def update_image(self, frame):
-            # Преобразование изображения в RGB
-            frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            # Создание объекта PIL Image
-            img = Image.fromarray(frame_rgb)
-            # Изменение размера с учётом масштаба
-            new_width = int(img.width * self.scale_factor)
-            new_height = int(img.height * self.scale_factor)
-            img = img.resize((new_width, new_height), Image.Resampling.LANCZOS)
-            # Преобразование в формат Tkinter
+            # Преобразование изображения в формат, пригодный для Tkinter
+            with profiler.stage("photo"):
+                self.tk_image = ImageTk.PhotoImage(image=img)
+            # Сохранение обработанного изображения в кэш (черновое не сохраняется)
+            if not coarse:
+                self.image_cache.put_render(filename, self.scale_factor, self.tk_image, plain=self.vector_overlay,
+                                            hidden=self.engine.class_filter)
+        
+        if not self.tiled_mode:
+            self.set_photo(self.tk_image)
+        # Первый кадр на экране - заглушка больше не нужна
+        if self.first_frame:
+            self.first_frame = False
+            self.canvas.delete(self.placeholder_id)
+            startup_profile.mark("first_frame")
+        if coarse:
+            self.wait_detail(filename, document, self.engine.load_detail(document))
+        else:
+            self.finish_startup()
+        
+        # Получение ширины canvas (по умолчанию 1024, если не определена)
+        canvas_width = self.canvas.winfo_width() or 1024
+        # Получение высоты canvas (по умолчанию 768, если не определена)
+        canvas_height = self.canvas.winfo_height() or 768
+        # Получение ширины и высоты текущего изображения
+        img_width, img_height = self.display_size()
+        
+        # Вычисление координаты X центра изображения
+        center_x = img_width * self.relative_center_x
+        # Вычисление координаты Y центра изображения
+        center_y = img_height * self.relative_center_y
+        # Вычисление смещения по X для центрирования изображения на canvas
+        self.image_x = center_x - canvas_width // 2
+        # Вычисление смещения по Y для центрирования изображения на canvas
+        self.image_y = center_y - canvas_height // 2
+        
+        # Обновление позиции изображения на canvas
+        self.update_position()
+        profiler.frame()
+        # Построение векторного слоя боксов (только при смене кадра или масштаба)
+        if self.vector_overlay:
+            self.overlay.set_boxes(self.bboxes, self.scale_factor, (self.image_x, self.image_y))
+            self.overlay_hovered = None
+        
+        # Обновление текста надписи с информацией о текущем кадре и масштабе
+        self.update_info_label()
+        # Обновление текста надписи с именем текущего файла
+        self.filename_label.configure(text=f"Файл: {self.image_files[self.index]}")
+        # Фоновая предзагрузка следующих кадров по направлению движения
+        self.prefetcher.schedule(self.image_files, self.index, self.prefetch_direction, self.scale_factor)
+        # Выделение текущего кадра в ленте миниатюр
+        self.filmstrip.set_current(self.index)
+        # Флажки для классов, впервые встретившихся в этом кадре
+        self.update_class_toggles()
+
+    # Вывод изображения Tkinter: в элемент canvas (векторный слой) или в метку
+    def set_photo(self, photo):
+        if self.vector_overlay:
+            # Вывод изображения без боксов в элемент canvas
+            with profiler.stage("configure"):
+                self.canvas.itemconfigure(self.raster_id, image=photo)
+            self.raster_image = photo
+            self.overlay_hover.reset(photo)
+            self.show_focus(self.overlay_hover)
+        else:
+            # Установка нового изображения в метку для отображения
+            with profiler.stage("configure"):
+                self.image_label.configure(image=photo)
+            # Сохранение ссылки на изображение для предотвращения удаления сборщиком мусора
+            self.image_label.image = photo
+            # Сброс подсветки: новое изображение становится основой для неё
+            self.hover_renderer.reset(photo)
+            self.show_focus(self.hover_renderer)
+    
+    # Добавление флажков видимости для ещё не показанных классов
+    def update_class_toggles(self):
+        for class_name in self.engine.known_classes():
+            if class_name in self.class_vars:
+                continue
+            var = tk.BooleanVar(master=self.master, value=class_name not in self.engine.hidden_classes)
+            self.class_vars[class_name] = var
+            tk.Checkbutton(self.classes_frame, text=class_name, variable=var,
+                           fg=tk_color(self.class_colors.get(class_name, DEFAULT_BOX_COLOR)),
+                           command=lambda name=class_name: self.toggle_class(name)).pack(side=tk.LEFT)
+    
+    #================================================================
+    # Функция показа или скрытия класса по флажку. Кадр не читается и
+    # аннотации не разбираются заново: изображение берётся из кэша
+    # (с тем же набором скрытых классов) или собирается из пирамиды
+    # кадра и боксов в памяти; в векторном слое меняется только
+    # состояние элементов класса.
+    #================================================================
+    def toggle_class(self, class_name):
+        visible = self.class_vars[class_name].get()
+        self.engine.set_class_visible(class_name, visible)
+        document = self.document
+        if document is None:
+            return
+        # Бокс под неподвижным указателем мог стать скрытым
+        self.redraw.forget("motion")
+        if self.vector_overlay:
+            self.overlay.set_class_visible(class_name, visible)
+            self.overlay.show_handles(None)
+            self.overlay_hovered = None
+            if self.focus_active():
+                self.update_focus()
+            return
+        if self.tiled_mode:
+            self.update_image(document.annotated_frame())
+            return
+        filename = self.engine.filename
+        photo = self.image_cache.get_render(filename, self.scale_factor, hidden=self.engine.class_filter)
+        if photo is None:
+            coarse = not document.detailed_for(self.scale_factor)
+            img = document.render(self.scale_factor, coarse=coarse)
+            with profiler.stage("photo"):
+                photo = ImageTk.PhotoImage(image=img)
+            if not coarse:
+                self.image_cache.put_render(filename, self.scale_factor, photo, hidden=self.engine.class_filter)
+        self.tk_image = photo
+        self.set_photo(photo)
+        profiler.frame()
+    
+    #================================================================
+    # Функция ожидания подробного кадра после чернового показа (опрос
+    # future через after()). Если кадр всё ещё на экране в плоском
+    # режиме, черновое изображение заменяется подробным того же размера.
+    #================================================================
+    def wait_detail(self, filename, document, future):
+        if not future.done():
+            self.master.after(DETAIL_POLL_INTERVAL_MS, self.wait_detail, filename, document, future)
+            return
+        if future.exception() is not None:
+            log.error("Ошибка загрузки изображения %s: %s", filename, future.exception())
+            return
+        self.engine.put_detail(filename, document)
+        # С тех пор загружен другой кадр или масштаб - он уже показан по-своему
+        if document is not self.document or self.tiled_mode:
+            return
+        img = document.render(self.scale_factor, boxes=not self.vector_overlay)
+        with profiler.stage("photo"):
             self.tk_image = ImageTk.PhotoImage(image=img)
-            # Установка нового изображения
-            self.image_label.configure(image=self.tk_image)
-            self.image_label.image = self.tk_image
+        self.image_cache.put_render(filename, self.scale_factor, self.tk_image, plain=self.vector_overlay,
+                                    hidden=self.engine.class_filter)
+        self.set_photo(self.tk_image)
+        # Подсветка под неподвижным указателем строится заново на подробном изображении
+        self.redraw.forget("motion")
+        profiler.frame()
+        startup_profile.mark("full_detail")
+        self.finish_startup()
+    
+    # Вывод отчёта о времени запуска (один раз, если он включён)
+    def finish_startup(self):
+        report = startup_profile.finish()
+        if report is not None:
+            print(report)
+    
+    #================================================================
+    # Функция начала создания нового бокса или перетаскивания изображения.
+    # Разделяет действия: создание бокса (ЛКМ) и перетаскивание (Ctrl + ЛКМ).
+    #================================================================
+    def start_box_or_drag(self, event):
+        # Новый жест: положение указателя прошлого жеста не считается уже отрисованным
+        self.redraw.forget("drag")
+        # Преобразование координат мыши в исходные координаты изображения
+        x, y = self.event_point(event)
+        orig_x = x / self.scale_factor
+        orig_y = y / self.scale_factor
         
-        # Остальные функции остаются без изменений для краткости
-        def update_transparency(self, value):
-            self.transparency = float(value)
-            self.load_image()
+        # Проверка, зажата ли клавиша Ctrl (event.state & 0x4 означает Ctrl)
+        ctrl_pressed = event.state & 0x4
         
-        def update_position(self):
-            self.canvas.coords(self.image_id, self.image_x, self.image_y)
-            self.canvas.configure(scrollregion=(self.image_x, self.image_y, 
-                                              self.image_x + self.tk_image.width(), 
-                                              self.image_y + self.tk_image.height()))
-            img_width = self.tk_image.width()
-            img_height = self.tk_image.height()
-            canvas_width = self.canvas.winfo_width() or 1024
-            canvas_height = self.canvas.winfo_height() or 768
-            center_x = self.image_x + canvas_width // 2
-            center_y = self.image_y + canvas_height // 2
-            self.relative_center_x = center_x / img_width if img_width > 0 else 0.5
-            self.relative_center_y = center_y / img_height if img_height > 0 else 0.5
-        
-        def update_sensitivity(self, value):
-            self.drag_sensitivity = float(value)
-        
-        def update_scale(self, value):
-            old_center_x = self.image_x + self.tk_image.width() / 2
-            old_center_y = self.image_y + self.tk_image.height() / 2
-            self.scale_factor = float(value)
-            self.load_image()
-            new_width = self.tk_image.width()
-            new_height = self.tk_image.height()
-            self.image_x = old_center_x - new_width / 2
-            self.image_y = old_center_y - new_height / 2
-            self.update_position()
+        # Если Ctrl зажат, начать перетаскивание изображения
+        if ctrl_pressed:
+            self.drag_data["x"] = event.x
+            self.drag_data["y"] = event.y
+            self.drag_data["dragging"] = True
+            return
+        
+        # Кадр ещё не загружен (или загрузка не удалась) - боксов нет
+        if self.document is None:
+            return
         
-        def on_mouse_wheel(self, event):
-            old_center_x = self.image_x + self.tk_image.width() / 2
-            old_center_y = self.image_y + self.tk_image.height() / 2
-            if event.delta > 0:
-                self.scale_factor += 0.1
+        # Поиск бокса и маркера редактирования под курсором через пространственный индекс (без Ctrl)
+        hit = self.document.hit(orig_x, orig_y)
+        
+        # Shift+щелчок: бокс добавляется в фокус или убирается из него (вне боксов - сброс выбора)
+        if event.state & 0x1:
+            if hit is None:
+                self.focus_selected.clear()
             else:
-                self.scale_factor -= 0.1
-            self.scale_factor = max(0.1, min(3.0, self.scale_factor))
-            self.scale_slider.set(self.scale_factor)
-            self.load_image()
-            new_width = self.tk_image.width()
-            new_height = self.tk_image.height()
-            self.image_x = old_center_x - new_width / 2
-            self.image_y = old_center_y - new_height / 2
-            self.update_position()
+                self.focus_selected ^= {hit[0]}
+            self.update_focus()
+            return
         
-        def next_image(self):
-            if self.index < len(self.image_files) - 1:
-                self.index += 1
-                self.load_image()
+        if hit is not None:
+            # Установка текущего редактируемого бокса и режима редактирования
+            self.current_box, mode, corner, edge = hit
+            self.edit_data["mode"] = mode
+            if corner is not None:
+                self.edit_data["corner"] = corner
+            if edge is not None:
+                self.edit_data["edge"] = edge
+            # Открытие окна редактирования для выбранного бокса
+            self.open_edit_window()
+            return
         
-        def prev_image(self):
-            if self.index > 0:
-                self.index -= 1
-                self.load_image()
+        # Если Ctrl не зажат и курсор не в боксе, начать создание нового бокса
+        self.creating_box = True
+        self.start_x = orig_x
+        self.start_y = orig_y
+
+    #================================================================
+    # Функция обработки движения мыши с нажатой кнопкой. Запоминает
+    # положение указателя; рамка, бокс или изображение обновляются
+    # планировщиком не чаще одного раза за кадр (render_drag).
+    #================================================================
+    def update_box_or_drag(self, event):
+        self.redraw.request("drag", self.render_drag, (*self.event_point(event), event.x, event.y))
+    
+    #================================================================
+    # Функция обновления создаваемого бокса или перетаскивания.
+    # Рисует новый бокс в реальном времени или перемещает изображение.
+    # x, y - координаты отображаемого изображения, event_x, event_y -
+    # координаты события (для перетаскивания изображения).
+    #================================================================
+    def render_drag(self, x, y, event_x, event_y):
+        # Преобразование координат мыши в исходные координаты изображения
+        orig_x = x / self.scale_factor
+        orig_y = y / self.scale_factor
         
-        def go_to_frame(self):
-            input_value = self.frame_entry.get().strip()
-            if not input_value:
+        # Если создаётся новый бокс
+        if self.creating_box and self.start_x != orig_x and self.start_y != orig_y and self.vector_overlay:
+            # Перемещение рамки создаваемого бокса без перерисовки изображения
+            self.overlay.preview((min(self.start_x, orig_x), min(self.start_y, orig_y),
+                                  max(self.start_x, orig_x), max(self.start_y, orig_y)))
+        
+        elif self.creating_box and self.start_x != orig_x and self.start_y != orig_y:
+            # Рамка создаваемого бокса
+            x1, y1 = int(min(self.start_x, orig_x)), int(min(self.start_y, orig_y))
+            x2, y2 = int(max(self.start_x, orig_x)), int(max(self.start_y, orig_y))
+            if self.tiled_mode:
+                # Источник плиток - копия исходного кадра с боксами и рамкой
+                self.update_image(self.document.annotated_frame(preview_box=(x1, y1, x2, y2)))
+            else:
+                # Отрисовка в экранном размере в рабочих буферах (без копии исходного кадра)
+                self.show_image(self.document.render(self.scale_factor, preview_box=(x1, y1, x2, y2)))
+        
+        # Если редактируется существующий бокс
+        elif self.current_box is not None and self.edit_data["mode"]:
+            class_name, x1, y1, x2, y2 = self.bboxes[self.current_box]
+            if self.edit_data["mode"] == "resize":
+                if self.edit_data["corner"] == "top_left":
+                    x1, y1 = int(orig_x), int(orig_y)
+                elif self.edit_data["corner"] == "bottom_right":
+                    x2, y2 = int(orig_x), int(orig_y)
+                elif self.edit_data["corner"] == "bottom_left":
+                    x1, y2 = int(orig_x), int(orig_y)
+                elif self.edit_data["corner"] == "top_right":
+                    x2, y1 = int(orig_x), int(orig_y)
+            elif self.edit_data["mode"] == "move":
+                dx = int(orig_x - (x1 + x2) / 2)
+                dy = int(orig_y - (y1 + y2) / 2)
+                x1 += dx
+                x2 += dx
+                y1 += dy
+                y2 += dy
+            # Бокс не изменился (смещение меньше пикселя исходного кадра) - перерисовка не нужна
+            # Иначе - обновление координат бокса на месте и его положения в индексе
+            if not self.document.set_box(self.current_box, x1, y1, x2, y2):
                 return
-            if input_value.isdigit():
-                frame_num = int(input_value)
-                if 1 <= frame_num <= len(self.image_files):
-                    self.index = frame_num - 1
-                    self.load_image()
-                else:
-                    messagebox.showerror("Ошибка", f"Номер кадра должен быть от 1 до {len(self.image_files)}")
+            # В режиме векторного слоя меняются только координаты элементов бокса
+            if self.vector_overlay:
+                self.overlay.update_box(self.current_box, (x1, y1, x2, y2))
+                self.overlay.show_handles(self.to_display_rect(x1, y1, x2, y2))
+            # Перерисовка изображения
             else:
-                matching_files = [f for f in self.image_files if input_value.lower() in f.lower()]
-                if matching_files:
-                    self.index = self.image_files.index(matching_files[0])
-                    self.load_image()
-                else:
-                    messagebox.showerror("Ошибка", "Файл с таким именем не найден")
+                self.redraw_image()
+        
+        # Если перетаскивается изображение (с Ctrl)
+        elif self.drag_data["dragging"]:
+            # Вычисление смещения по X с учётом чувствительности
+            dx = int((event_x - self.drag_data["x"]) * self.drag_sensitivity)
+            # Вычисление смещения по Y с учётом чувствительности
+            dy = int((event_y - self.drag_data["y"]) * self.drag_sensitivity)
+            # Обновление позиции изображения по X
+            self.image_x += dx
+            # Обновление позиции изображения по Y
+            self.image_y += dy
+            # Применение новой позиции
+            self.update_position()
+            # Обновление текущих координат мыши
+            self.drag_data["x"] = event_x
+            self.drag_data["y"] = event_y
+
+    #================================================================
+    # Функция завершения создания бокса или перетаскивания.
+    # Финализирует новый бокс или завершает редактирование.
+    #================================================================
+    def finish_box_or_drag(self, event):
+        # Применение последнего положения указателя, ещё не отрисованного планировщиком
+        self.redraw.flush("drag")
+        # Преобразование координат мыши в исходные координаты изображения
+        x, y = self.event_point(event)
+        orig_x = x / self.scale_factor
+        orig_y = y / self.scale_factor
+        
+        # Если создавался новый бокс
+        if self.creating_box:
+            self.creating_box = False
+            self.overlay.preview(None)
+            if self.start_x != orig_x and self.start_y != orig_y:
+                x1, y1 = int(min(self.start_x, orig_x)), int(min(self.start_y, orig_y))
+                x2, y2 = int(max(self.start_x, orig_x)), int(max(self.start_y, orig_y))
+                # Добавление нового бокса с временным классом "new"
+                self.current_box = self.document.add_box("new", x1, y1, x2, y2)
+                # Открытие окна редактирования для нового бокса
+                self.open_edit_window()
+            self.redraw_image()
+        
+        # Завершение редактирования бокса
+        elif self.current_box is not None:
+            self.edit_data["mode"] = None
+            self.edit_data["corner"] = None
+            self.edit_data["edge"] = None
+        
+        # Завершение перетаскивания изображения
+        self.drag_data["dragging"] = False
+    
+    #================================================================
+    # Функция открытия окна редактирования bounding box'а.
+    # Позволяет задать класс, удалить или сохранить бокс.
+    #================================================================
+    def open_edit_window(self):
+        # Закрытие предыдущего окна редактирования, если оно открыто
+        if self.edit_window:
+            self.edit_window.destroy()
+        
+        # Создание нового окна редактирования
+        self.edit_window = tk.Toplevel(self.master)
+        self.edit_window.title("Редактирование Bounding Box")
+        self.edit_window.geometry("300x150")
+        
+        # Получение данных текущего бокса
+        class_name, x1, y1, x2, y2 = self.bboxes[self.current_box]
+        
+        # Создание поля ввода класса
+        tk.Label(self.edit_window, text="Класс:").pack(pady=5)
+        class_entry = tk.Entry(self.edit_window)
+        class_entry.insert(0, class_name)
+        class_entry.pack()
+        
+        # Создание кнопки удаления бокса
+        delete_btn = tk.Button(self.edit_window, text="Удалить", 
+                             command=lambda: self.delete_box(class_entry))
+        delete_btn.pack(pady=5)
+        
+        # Создание кнопки сохранения бокса
+        save_btn = tk.Button(self.edit_window, text="Сохранить", 
+                           command=lambda: self.save_box(class_entry))
+        save_btn.pack(pady=5)
+    
+    #================================================================
+    # Функция удаления текущего bounding box'а.
+    # Удаляет бокс из списка и обновляет изображение.
+    #================================================================
+    def delete_box(self, class_entry):
+        # Удаление текущего бокса из списка и из индекса
+        self.document.delete_box(self.current_box)
+        # Индексы выбранных боксов после удалённого сдвигаются на один
+        deleted = self.current_box
+        self.focus_selected = {i - (i > deleted) for i in self.focus_selected if i != deleted}
+        # Сброс кэшированных изображений кадра с устаревшими боксами
+        self.engine.invalidate_renders()
+        # Закрытие окна редактирования
+        self.edit_window.destroy()
+        self.edit_window = None
+        self.current_box = None
+        # Перерисовка изображения без удалённого бокса
+        self.redraw_image()
+    
+    #================================================================
+    # Функция сохранения текущего bounding box'а.
+    # Обновляет класс и записывает аннотации в файл.
+    #================================================================
+    def save_box(self, class_entry):
+        # Получение нового класса из поля ввода
+        new_class = class_entry.get().strip()
+        if not new_class:
+            new_class = "unknown"
+        # Обновление класса текущего бокса
+        self.document.set_class(self.current_box, new_class)
+        # Фоновая запись аннотаций кадра, обновление упакованного хранилища и кэша,
+        # сброс изображений кадра с устаревшими боксами
+        self.engine.save_annotations()
+        self.update_write_status()
+        # Закрытие окна редактирования
+        self.edit_window.destroy()
+        self.edit_window = None
+        self.current_box = None
+        # Перерисовка изображения
+        self.redraw_image()
+    
+    #================================================================
+    # Функция обновления надписи о фоновой записи аннотаций.
+    # Пока есть ожидающие записи, перезапускает себя через after().
+    #================================================================
+    def update_write_status(self):
+        if self.write_status_id is not None:
+            self.master.after_cancel(self.write_status_id)
+            self.write_status_id = None
+        pending, failed = self.engine.writer.status()
+        # Ошибки записи показываются красным до успешной повторной записи
+        if failed:
+            self.write_status_label.configure(text=f"Ошибок записи аннотаций: {failed}", fg="red")
+        elif pending:
+            self.write_status_label.configure(text=f"Сохранение аннотаций: в очереди {pending}", fg="black")
+        else:
+            self.write_status_label.configure(text="", fg="black")
+        # Продолжение опроса, пока очередь не опустела
+        if pending:
+            self.write_status_id = self.master.after(250, self.update_write_status)
+    
+    #================================================================
+    # Функция обработки движения мыши. Запоминает положение указателя;
+    # подсветка выполняется планировщиком не чаще одного раза за кадр.
+    #================================================================
+    def on_mouse_motion(self, event):
+        # Проверка наличия исходного изображения и bounding box'ов
+        if self.pyramid is None or not self.bboxes:
+            # Выход из функции, если данных нет
+            return
+        self.redraw.request("motion", self.render_motion, self.event_point(event))
+    
+    #================================================================
+    # Функция подсветки бокса под указателем (x, y - координаты
+    # отображаемого изображения) и обновления курсора для редактирования.
+    #================================================================
+    @profiler.traced("motion")
+    def render_motion(self, x, y):
+        if self.pyramid is None or not self.bboxes:
+            return
+        # Преобразование координат мыши в исходные координаты изображения
+        orig_x = x / self.scale_factor
+        orig_y = y / self.scale_factor
+        # Трассировка геометрии только при включённой настройке (без форматирования строк иначе)
+        trace = geometry_log.isEnabledFor(logging.DEBUG)
+        if trace:
+            geometry_log.debug("Мышь на canvas: (%s, %s), масштаб: %s, в исходном изображении: (%.1f, %.1f)",
+                               x, y, self.scale_factor, orig_x, orig_y)
+        
+        # Один запрос к пространственному индексу: бокс под курсором и маркер редактирования
+        hit = self.document.hit(orig_x, orig_y)
+        hovered = None
+        hovered_rect = None
+        cursor = "crosshair"
+        if hit is not None:
+            hovered, mode, corner, edge = hit
+            class_name, x1, y1, x2, y2 = self.bboxes[hovered]
+            # Область бокса в координатах отображаемого изображения
+            hovered_rect = self.to_display_rect(x1, y1, x2, y2)
+            # Форма курсора для маркера редактирования
+            cursor = HANDLE_CURSORS.get(corner or edge, "crosshair")
+            if trace:
+                geometry_log.debug("Подсвечен бокс %s: (%d, %d, %d, %d)", class_name, x1, y1, x2, y2)
+        
+        self.hovered_box = hovered
+        # Подсветка: перерисовываются только области (или плитки) старого и нового бокса
+        if self.tiled_mode:
+            self.tile_renderer.set_focus(self.tile_variant(hovered is not None), hovered_rect)
+        else:
+            with profiler.stage("photo"):
+                changed = self.active_hover().highlight(hovered, hovered_rect, self.transparency,
+                                                        self.render_dimmed)
+            if changed:
+                profiler.frame()
+        # Маркеры углов подсвеченного бокса в векторном слое
+        if self.vector_overlay and hovered != self.overlay_hovered:
+            self.overlay.show_handles(hovered_rect)
+            self.overlay_hovered = hovered
+        
+        # Обновление курсора для редактирования (только при смене формы)
+        target = self.canvas if self.canvas_events() else self.image_label
+        if target.cget("cursor") != cursor:
+            target.config(cursor=cursor)
+    
+    #================================================================
+    # Вспомогательная функция получения координат мыши в пикселях
+    # отображаемого изображения. В плиточном режиме событие приходит
+    # от canvas, и координаты пересчитываются с учётом прокрутки.
+    #================================================================
+    def event_point(self, event):
+        if event.widget is self.canvas:
+            return self.canvas.canvasx(event.x) - self.image_x, self.canvas.canvasy(event.y) - self.image_y
+        return event.x, event.y
+    
+    # События мыши приходят от canvas (плиточный режим или векторный слой)
+    def canvas_events(self):
+        return self.tiled_mode or self.vector_overlay
+    
+    # Подсветка при наведении для текущего способа вывода изображения
+    def active_hover(self):
+        return self.overlay_hover if self.vector_overlay else self.hover_renderer
+    
+    # Размер отображаемого изображения (ширина, высота) в текущем режиме
+    def display_size(self):
+        if self.tiled_mode:
+            return self.tile_renderer.display_size(self.scale_factor)
+        # Кадр ещё не показан (заглушка первого кадра или неудачная загрузка)
+        if self.tk_image is None:
+            return 0, 0
+        return self.tk_image.width(), self.tk_image.height()
+    
+    #================================================================
+    # Функция переключения плиточного режима: в нём метка с изображением
+    # скрывается, а видимая область выводится плитками на canvas.
+    #================================================================
+    def set_tiled_mode(self, tiled):
+        if tiled == self.tiled_mode:
+            return
+        self.tiled_mode = tiled
+        # Изображение выводится меткой или элементом canvas (векторный слой), в плиточном режиме - плитками
+        image_item = self.raster_id if self.vector_overlay else self.image_id
+        self.canvas.itemconfigure(image_item, state="hidden" if tiled else "normal")
+        if not tiled:
+            self.tile_renderer.reset()
+            if not self.vector_overlay:
+                self.canvas.config(cursor="")
+    
+    # Отрисовка плиток видимой области при текущем масштабе и положении
+    def render_tiles(self):
+        with profiler.stage("tiles"):
+            self.tile_renderer.render(self.scale_factor, (self.image_x, self.image_y))
+        profiler.frame()
+        # Новые плитки создаются поверх - векторный слой поднимается над ними
+        if self.vector_overlay:
+            self.overlay.raise_()
+    
+    # Прокрутка canvas полосами прокрутки с дорисовкой плиток
+    def scroll_x(self, *args):
+        self.canvas.xview(*args)
+        if self.tiled_mode:
+            self.render_tiles()
+    
+    def scroll_y(self, *args):
+        self.canvas.yview(*args)
+        if self.tiled_mode:
+            self.render_tiles()
+    
+    #================================================================
+    # Вспомогательная функция перевода бокса из координат исходного
+    # изображения в координаты отображаемого (масштабированного).
+    #================================================================
+    def to_display_rect(self, x1, y1, x2, y2):
+        s = self.scale_factor
+        return int(x1 * s), int(y1 * s), int(x2 * s), int(y2 * s)
+    
+    #================================================================
+    # Вспомогательная функция построения затемнённой копии кадра для
+    # подсветки: затемнение, отрисовка боксов и масштабирование.
+    #================================================================
+    def render_dimmed(self, transparency):
+        # Затемнение изображения экранного размера из пирамиды (кроме боксов фокуса) и отрисовка
+        # боксов поверх (в режиме векторного слоя боксы остаются элементами canvas)
+        img = self.document.render(self.scale_factor, transparency, boxes=not self.vector_overlay,
+                                   coarse=not self.document.detailed_for(self.scale_factor),
+                                   focus=self.focus_rects())
+        with profiler.stage("photo"):
+            return ImageTk.PhotoImage(image=img)
+    
+    # Источник плиток для варианта подсветки ("dim", прозрачность, версия фокуса)
+    def make_tile_variant(self, variant):
+        return self.document.dimmed_frame(variant[1], boxes=not self.vector_overlay, focus=self.focus_rects())
+    
+    # Вариант плиток для подсветки (None - затемнения нет: ни бокса под указателем, ни фокуса)
+    def tile_variant(self, hovered=False):
+        if not hovered and not self.focus_active():
+            return None
+        return "dim", self.transparency, self.focus_version
+    
+    # Включён ли режим фокуса
+    def focus_active(self):
+        return bool(self.focus_selected or self.focus_classes)
+    
+    # Прямоугольники боксов фокуса (None - фокуса нет, затемняется весь кадр)
+    def focus_rects(self):
+        if not self.focus_active() or self.document is None:
+            return None
+        return self.document.focus_rects(self.focus_selected, self.focus_classes)
+    
+    #================================================================
+    # Функция показа фокуса на новом изображении кадра: если набор
+    # боксов фокуса не пуст, подсветка hover сразу показывает кадр,
+    # затемнённый вне этих боксов.
+    #================================================================
+    def show_focus(self, hover):
+        if not hover.focused and not self.focus_active():
+            return
+        hover.set_focused(self.focus_active())
+        hover.highlight(None, None, self.transparency, self.render_dimmed)
+    
+    #================================================================
+    # Функция применения изменившегося набора боксов фокуса: новая
+    # версия затемнённых копий (плиток) и перерисовка подсветки с
+    # сохранением бокса под указателем.
+    #================================================================
+    def update_focus(self):
+        self.focus_version += 1
+        if self.document is None:
+            return
+        if self.tiled_mode:
+            rect = self.tile_renderer.focus[1] if self.tile_renderer.focus is not None else None
+            self.tile_renderer.set_focus(self.tile_variant(rect is not None), rect)
+            return
+        hover = self.active_hover()
+        hover.set_focused(self.focus_active())
+        if hover.highlight(hover.hovered, hover.hovered_rect, self.transparency, self.render_dimmed):
+            profiler.frame()
+    
+    # Фокус на классе бокса под указателем (повторно - снятие); вне боксов - сброс фокуса на классах
+    def toggle_focus_class(self, event):
+        if event.widget is self.frame_entry or self.document is None:
+            return
+        if self.hovered_box is None or self.hovered_box >= len(self.document.store):
+            self.focus_classes.clear()
+        else:
+            self.focus_classes ^= {self.document.store.class_name(self.hovered_box)}
+        self.update_focus()
+    
+    # Сброс фокуса: выбранные боксы и классы
+    def clear_focus(self, event=None):
+        if event is not None and event.widget is self.frame_entry:
+            return
+        if self.focus_active():
+            self.focus_selected.clear()
+            self.focus_classes.clear()
+            self.update_focus()
+    
+    #================================================================
+    # Вспомогательная функция для перерисовки изображения.
+    # Используется после изменения боксов.
+    #================================================================
+    @profiler.traced("redraw")
+    def redraw_image(self):
+        # Боксы изменились - подсветку под неподвижным указателем нужно найти заново
+        self.redraw.forget("motion")
+        # В режиме векторного слоя пересобираются только элементы боксов, изображение не меняется
+        if self.vector_overlay:
+            self.overlay.set_boxes(self.bboxes, self.scale_factor, (self.image_x, self.image_y))
+            self.overlay_hovered = None
+            # Боксы фокуса могли сдвинуться - затемнённые копии строятся заново
+            if self.focus_active():
+                self.update_focus()
+            return
+        # В плиточном режиме боксы рисуются на копии исходного кадра - новом источнике плиток
+        if self.tiled_mode:
+            self.update_image(self.document.annotated_frame())
+            return
+        # Пересчёт из пирамиды и отрисовка боксов в экранном размере
+        self.show_image(self.document.render(self.scale_factor))
+    
+    #================================================================
+    # Вспомогательная функция для обновления изображения на canvas.
+    # Преобразует массив в Tkinter-формат и отображает.
+    #================================================================
+    def update_image(self, frame):
+        # В плиточном режиме кадр становится новым источником плиток (новая версия)
+        if self.tiled_mode:
+            self.render_version += 1
+            self.tile_renderer.set_source((self.image_files[self.index], self.render_version),
+                                          frame, self.make_tile_variant, self.tile_variant())
+            self.render_tiles()
+            return
+        # Преобразование изображения в RGB и изменение размера с учётом масштаба
+        self.show_image(render_scaled(frame, self.scale_factor))
+    
+    # Вывод готового изображения PIL в метку
+    def show_image(self, img):
+        photo = self.work_photo
+        with profiler.stage("photo"):
+            if photo is not None and photo.width() == img.width and photo.height() == img.height:
+                # Обновление пикселей рабочего изображения Tkinter без создания нового
+                photo.paste(img)
+            else:
+                # Преобразование в формат Tkinter
+                photo = self.work_photo = ImageTk.PhotoImage(image=img)
+        self.tk_image = photo
+        # Установка нового изображения
+        with profiler.stage("configure"):
+            self.image_label.configure(image=photo)
+        self.image_label.image = photo
+        profiler.frame()
+        # Сброс подсветки: боксы на изображении изменились (затемнённые копии устарели)
+        self.hover_renderer.reset(photo, invalidate=True)
+        self.show_focus(self.hover_renderer)
+        self.redraw.forget("motion")
+    
+    # Остальные функции остаются без изменений для краткости
+    def update_transparency(self, value):
+        self.transparency = float(value)
+        # Пересборка подсветки с новой прозрачностью без перезагрузки кадра
+        if self.tiled_mode:
+            if self.tile_renderer.focus is not None:
+                rect = self.tile_renderer.focus[1]
+                self.tile_renderer.set_focus(self.tile_variant(rect is not None), rect)
+        elif self.active_hover().hovered is not None or self.active_hover().focused:
+            hover = self.active_hover()
+            hover.highlight(hover.hovered, hover.hovered_rect, self.transparency, self.render_dimmed)
+    
+    def update_position(self):
+        img_width, img_height = self.display_size()
+        self.canvas.coords(self.image_id, self.image_x, self.image_y)
+        self.canvas.coords(self.raster_id, self.image_x, self.image_y)
+        # Векторный слой сдвигается вместе с изображением
+        if self.vector_overlay:
+            self.overlay.set_origin((self.image_x, self.image_y))
+        self.canvas.configure(scrollregion=(self.image_x, self.image_y, 
+                                          self.image_x + img_width, 
+                                          self.image_y + img_height))
+        # Плитки сдвигаются, недостающие - дорисовываются
+        if self.tiled_mode:
+            self.render_tiles()
+        canvas_width = self.canvas.winfo_width() or 1024
+        canvas_height = self.canvas.winfo_height() or 768
+        center_x = self.image_x + canvas_width // 2
+        center_y = self.image_y + canvas_height // 2
+        self.relative_center_x = center_x / img_width if img_width > 0 else 0.5
+        self.relative_center_y = center_y / img_height if img_height > 0 else 0.5
+    
+    def update_sensitivity(self, value):
+        self.drag_sensitivity = float(value)
+    
+    def update_scale(self, value):
+        # Без показанного кадра масштаб только запоминается для первой загрузки
+        if self.tk_image is None and not self.tiled_mode:
+            self.scale_factor = float(value)
+            return
+        old_width, old_height = self.display_size()
+        old_center_x = self.image_x + old_width / 2
+        old_center_y = self.image_y + old_height / 2
+        self.scale_factor = float(value)
+        self.load_image()
+        new_width, new_height = self.display_size()
+        self.image_x = old_center_x - new_width / 2
+        self.image_y = old_center_y - new_height / 2
+        self.update_position()
+    
+    def on_mouse_wheel(self, event):
+        # Масштабировать нечего, пока кадр не показан
+        if self.tk_image is None and not self.tiled_mode:
+            return
+        old_width, old_height = self.display_size()
+        old_center_x = self.image_x + old_width / 2
+        old_center_y = self.image_y + old_height / 2
+        if event.delta > 0:
+            self.scale_factor += 0.1
+        else:
+            self.scale_factor -= 0.1
+        self.scale_factor = max(0.1, min(3.0, self.scale_factor))
+        self.scale_slider.set(self.scale_factor)
+        self.load_image()
+        new_width, new_height = self.display_size()
+        self.image_x = old_center_x - new_width / 2
+        self.image_y = old_center_y - new_height / 2
+        self.update_position()
+    
+    def next_image(self):
+        if self.index < len(self.image_files) - 1:
+            self.index += 1
+            self.prefetch_direction = 1
+            self.load_image()
+    
+    def prev_image(self):
+        if self.index > 0:
+            self.index -= 1
+            self.prefetch_direction = -1
+            self.load_image()
+    
+    def go_to_frame(self):
+        input_value = self.frame_entry.get().strip()
+        if not input_value:
+            return
+        # Поиск по индексу: номер кадра, "#число" в имени, время "ЧЧ:ММ:СС", имя или его часть
+        index = self.engine.current_frame_index().lookup(input_value)
+        if index is not None:
+            self.index = index
+            # Отмена предзагрузки вокруг прежней позиции
+            self.prefetcher.cancel()
+            self.prefetch_direction = 1
+            self.load_image()
+        elif input_value.isdigit():
+            messagebox.showerror("Ошибка", f"Номер кадра должен быть от 1 до {len(self.image_files)}")
+        else:
+            messagebox.showerror("Ошибка", "Кадр с таким именем, номером или временем не найден")
+        self.frame_entry.delete(0, tk.END)
+        self.show_completions([])
+    
+    # Переход к кадру index, выбранному в ленте миниатюр
+    def select_frame(self, index):
+        if index == self.index:
+            return
+        # Предзагрузка - в направлении перехода, задачи вокруг прежней позиции отменяются
+        self.prefetcher.cancel()
+        self.prefetch_direction = 1 if index > self.index else -1
+        self.index = index
+        self.load_image()
+
+    # Отложенное обновление подсказки после ввода символа (не на каждое нажатие)
+    def schedule_completion(self, event):
+        if event.keysym in ("Return", "Tab"):
+            return
+        if self.completion_job is not None:
+            self.master.after_cancel(self.completion_job)
+        self.completion_job = self.master.after(COMPLETION_DELAY_MS, self.update_completion)
+
+    # Обновление подсказки дополнения по введённому тексту
+    def update_completion(self):
+        self.completion_job = None
+        self.show_completions(self.engine.current_frame_index().complete(self.frame_entry.get(), COMPLETION_LIMIT))
+
+    # Показ первого варианта дополнения и числа остальных
+    def show_completions(self, completions):
+        self.completions = completions
+        if not completions:
+            self.completion_label.configure(text="")
+            return
+        more = f" (+{len(completions) - 1})" if len(completions) > 1 else ""
+        self.completion_label.configure(text=f"→ {self.image_files[completions[0]]}{more}")
+
+    # Подстановка первого варианта дополнения в поле ввода (клавиша Tab)
+    def accept_completion(self, event):
+        if self.completions:
             self.frame_entry.delete(0, tk.END)
+            self.frame_entry.insert(0, self.image_files[self.completions[0]])
+        return "break"
 
+
+#================================================================
+# Функция для просмотра аннотированных кадров. frames_dir - каталог
+# с кадрами или видеофайл (кадры читаются прямо из видео, аннотации
+# ищутся по именам вида <имя_видео>_<номер кадра>.txt). Проверяет существование
+# указанных директорий с кадрами и аннотациями, выводит информацию о них.
+# Если директории не существуют - прерывает выполнение с сообщением.
+# Создаёт окно с интерфейсом для просмотра и редактирования изображений.
+# Параметр cache_limit_mb задаёт лимит памяти кэша изображений в мегабайтах,
+# packed_annotations - необязательный путь к упакованному файлу аннотаций,
+# save_pyramids - сохранять ли пирамиды масштабов кадров на диск рядом с кадрами,
+# vector_overlay - выводить ли боксы элементами canvas поверх неизменного изображения,
+# listing_cache - сохранять ли список кадров каталога на диск для быстрого повторного открытия,
+# frames_fps - частота кадров каталога для перехода по времени,
+# perf_overlay - показать панель производительности при запуске
+# (F3 - показать/скрыть панель с замерами, Ctrl+F3 - выгрузить трассу),
+# thumbnail_dir - каталог кэша миниатюр ленты кадров (None - лента без миниатюр).
+#================================================================
+def view_annotated_frames(frames_dir, annotations_dir, cache_limit_mb=512, packed_annotations=None,
+                          save_pyramids=False, vector_overlay=False, listing_cache=False, frames_fps=None,
+                          perf_overlay=False, thumbnail_dir=DEFAULT_THUMBNAIL_DIR):
+    # Проверка отсутствия любой из директорий (содержимое каталогов не перечисляется:
+    # для больших каталогов это долго, список кадров строится в фоне)
+    if not os.path.exists(frames_dir) or not os.path.exists(annotations_dir):
+        # Вывод сообщения об ошибке, если какая-то директория отсутствует
+        log.error("Папки с кадрами или аннотациями не найдены: '%s', '%s'", frames_dir, annotations_dir)
+        # Выход из функции без выполнения дальнейших операций
+        return
+    
+    # Создание ядра просмотра: источник кадров, кэши, чтение и запись аннотаций
+    engine = ViewerEngine(frames_dir, annotations_dir, cache_limit_mb, packed_annotations, save_pyramids,
+                          listing_cache, frames_fps)
+    startup_profile.mark("engine")
     # Создание главного окна приложения Tkinter
     root = tk.Tk()
-    # Создание объекта класса ImageViewer с передачей главного окна и директорий
-    viewer = ImageViewer(root, frames_dir, annotations_dir)
+    startup_profile.mark("tk")
+    # Создание объекта класса ImageViewer с передачей главного окна и ядра просмотра
+    viewer = ImageViewer(root, engine, vector_overlay, perf_overlay,
+                         ThumbnailCache(thumbnail_dir) if thumbnail_dir else None)
     # Запуск основного цикла обработки событий Tkinter
     root.mainloop()
+    # Остановка фоновой предзагрузки кадров и построения миниатюр
+    viewer.prefetcher.shutdown()
+    viewer.filmstrip.close()
+    # Остановка фоновых потоков ядра и запись всех ожидающих правок аннотаций перед выходом
+    failed = engine.close()
+    # Вывод путей, которые не удалось записать
+    for path, error in failed.items():
+        log.error("Не удалось сохранить аннотации %s: %s", path, error)
     # Попытка закрытия окна после завершения работы
     try:
         # Закрытие главного окна
         root.destroy()
     # Обработка ошибки, если окно уже было закрыто
     except tk.TclError:
-        # Вывод сообщения, если окно уже уничтожено
-        print("Окно уже было уничтожено, пропускаем destroy")
+        # Сообщение, если окно уже уничтожено
+        log.debug("Окно уже было уничтожено, пропускаем destroy")
 
-# Установка пути к директории с кадрами
-frames_directory = r"D:\Указать путь к директории с кадрами"
-# Установка пути к директории с аннотациями
-annotations_directory = r"D:\Указать путь к директории с аннотациями"
-# Вызов функции просмотра аннотированных кадров с указанными директориями
-view_annotated_frames(frames_directory, annotations_directory)
+# Запуск просмотрщика; при импорте модуля (из другого интерфейса или замеров) окно не создаётся
+if __name__ == "__main__":
+    # Установка пути к директории с кадрами (или к видеофайлу .mp4/.avi)
+    frames_directory = r"D:\Указать путь к директории с кадрами"
+    # Установка пути к директории с аннотациями
+    annotations_directory = r"D:\Указать путь к директории с аннотациями"
+    # Установка лимита памяти кэша изображений в мегабайтах
+    cache_limit_megabytes = 512
+    # Путь к упакованному файлу аннотаций (None - читать .txt-файлы из annotations_directory).
+    # Создаётся командой: python packed_store.py pack <каталог_аннотаций> <файл.elaipak>
+    packed_annotations_path = None
+    # Сохранение пирамид масштабов кадров на диск (каталог .elai_pyramid рядом с кадрами)
+    save_pyramids_to_disk = False
+    # Вывод боксов векторным слоем canvas: правка бокса не перерисовывает изображение
+    vector_overlay_mode = True
+    # Сохранение списка кадров каталога на диск (файл .elai_listing.txt рядом с кадрами);
+    # список перечитывается, только если каталог изменился
+    listing_cache_enabled = False
+    # Частота кадров, из которых нарезан каталог (для перехода по времени "ЧЧ:ММ:СС");
+    # None - переход по времени только для видеофайлов
+    frames_fps = None
+    # Панель производительности (FPS, попадания в кэш, время этапов) при запуске; F3 - показать/скрыть
+    perf_overlay_enabled = False
+    # Каталог кэша миниатюр ленты кадров (общий для всех наборов кадров; None - лента без миниатюр)
+    thumbnail_cache_dir = DEFAULT_THUMBNAIL_DIR
+    # Уровень журнала ("DEBUG", "INFO", "WARNING", "ERROR") и файл журнала (None - только консоль)
+    log_level = "INFO"
+    log_file_path = None
+    # Отладочная трассировка геометрии (координаты мыши, подсвеченный бокс) в журнал "elai.geometry"
+    trace_geometry = False
+    # Каталог кадров и аннотаций можно передать в командной строке вместо путей выше
+    parser = argparse.ArgumentParser(description="Просмотр и редактирование размеченных кадров")
+    parser.add_argument("frames_dir", nargs="?", default=frames_directory,
+                        help="каталог с кадрами или видеофайл")
+    parser.add_argument("annotations_dir", nargs="?", default=annotations_directory,
+                        help="каталог с аннотациями")
+    parser.add_argument("--profile-startup", action="store_true",
+                        help="вывести время этапов запуска (импорт, окно, первый кадр, подробный кадр)")
+    args = parser.parse_args()
+    if args.profile_startup:
+        startup_profile.enable()
+    # Настройка журналирования: вывод в консоль и файл выполняется в отдельном потоке
+    setup_logging(log_level, log_file_path, trace_geometry)
+    # Вызов функции просмотра аннотированных кадров с указанными директориями
+    view_annotated_frames(args.frames_dir, args.annotations_dir, cache_limit_megabytes, packed_annotations_path,
+                          save_pyramids_to_disk, vector_overlay_mode, listing_cache_enabled, frames_fps,
+                          perf_overlay_enabled, thumbnail_cache_dir)
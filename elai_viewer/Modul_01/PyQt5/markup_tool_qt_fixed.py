@@ -5,9 +5,13 @@ from PyQt5.QtWidgets import (QMainWindow, QWidget, QVBoxLayout,
                                  QLineEdit, QToolBar)
 from PyQt5.QtCore import Qt, QPoint
 from PyQt5.QtGui import QImage, QPixmap, QPainter, QPen
-import numpy as np
 import os
-from PIL import Image
+import sys
+
+# Ядро просмотрщика (кадр, боксы, отрисовка) лежит в каталоге elai_viewer
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+from engine import FrameDocument
+from annotation_store import AnnotationStore
 
 class MarkupToolWindow(QMainWindow):
     def __init__(self):
@@ -16,10 +20,10 @@ class MarkupToolWindow(QMainWindow):
         self.setGeometry(100, 100, 1200, 800)
 
         # Инициализация переменных
-        self.image = None
+        # Текущий кадр с боксами (FrameDocument); координаты боксов - в пикселях изображения
+        self.document = None
         self.image_path = None
         self.drawing = False
-        self.annotations = []
         self.start_point = QPoint()
         self.end_point = QPoint()
         self.scale_factor = 1.0
@@ -155,78 +159,80 @@ class MarkupToolWindow(QMainWindow):
             return
 
         try:
-            # Используем PIL для загрузки изображения (лучше работает с кириллицей)
-            pil_image = Image.open(self.image_path)
-
-            # Конвертируем в RGB если необходимо
-            if pil_image.mode != 'RGB':
-                pil_image = pil_image.convert('RGB')
-
-            # Конвертируем PIL изображение в numpy array
-            self.image = np.array(pil_image)
-
-            if self.image is not None:
-                self.display_image()
-                self.statusBar().showMessage(f"Загружено изображение: {os.path.basename(self.image_path)}")
-                # Очищаем аннотации при загрузке нового изображения
-                self.annotations = []
-                self.update_annotations_list()
-            else:
-                QMessageBox.warning(self, "Ошибка",
-                                  "Не удалось загрузить изображение")
-                self.statusBar().showMessage("Ошибка загрузки изображения")
+            # Кадр читается ядром просмотрщика (пути с кириллицей поддерживаются)
+            self.set_document(FrameDocument.open(self.image_path))
+            self.statusBar().showMessage(f"Загружено изображение: {os.path.basename(self.image_path)}")
 
         except Exception as e:
             QMessageBox.critical(self, "Ошибка",
                                  f"Произошла ошибка при загрузке изображения:\n{str(e)}")
             self.statusBar().showMessage(f"Ошибка загрузки: {str(e)}")
 
+    def set_document(self, document):
+        # Новый кадр со своими аннотациями (пустыми для только что открытого изображения)
+        self.document = document
+        self.display_image()
+        self.update_annotations_list()
+        self.update()
+
     def display_image(self):
-        if self.image is not None:
+        if self.document is not None:
             try:
-                height, width, channel = self.image.shape
-                bytes_per_line = 3 * width
-
-                # Создаем QImage из numpy array
-                q_image = QImage(self.image.data, width, height,
-                               bytes_per_line, QImage.Format_RGB888)
-                pixmap = QPixmap.fromImage(q_image)
-
-                # Масштабирование изображения под размер label
+                width, height = self.document.size
                 label_size = self.image_label.size()
-                scaled_pixmap = pixmap.scaled(label_size,
-                                            Qt.KeepAspectRatio,
-                                            Qt.SmoothTransformation)
 
-                # Вычисляем коэффициент масштабирования
-                self.scale_factor = min(label_size.width() / width, 
+                # Коэффициент масштабирования под размер label
+                self.scale_factor = min(label_size.width() / width,
                                       label_size.height() / height)
 
-                self.image_label.setPixmap(scaled_pixmap)
+                # Кадр уменьшается ядром из пирамиды масштабов (боксы рисуются в paintEvent)
+                img = self.document.render(self.scale_factor, boxes=False)
+                q_image = QImage(img.tobytes(), img.width, img.height,
+                               3 * img.width, QImage.Format_RGB888)
+                self.image_label.setPixmap(QPixmap.fromImage(q_image.copy()))
 
             except Exception as e:
                 QMessageBox.critical(self, "Ошибка",
                                      f"Произошла ошибка при отображении изображения:\n{str(e)}")
                 self.statusBar().showMessage(f"Ошибка отображения: {str(e)}")
 
+    def image_origin(self):
+        # Левый верхний угол изображения в координатах окна (изображение выровнено по центру label)
+        pixmap = self.image_label.pixmap()
+        label_pos = self.image_label.pos()
+        if pixmap is None:
+            return label_pos
+        return QPoint(label_pos.x() + (self.image_label.width() - pixmap.width()) // 2,
+                      label_pos.y() + (self.image_label.height() - pixmap.height()) // 2)
+
+    def to_image_point(self, pos):
+        # Точка окна -> пиксель изображения (в пределах кадра)
+        origin = self.image_origin()
+        width, height = self.document.size
+        x = int((pos.x() - origin.x()) / self.scale_factor)
+        y = int((pos.y() - origin.y()) / self.scale_factor)
+        return min(max(x, 0), width - 1), min(max(y, 0), height - 1)
+
+    def to_window_point(self, x, y):
+        # Пиксель изображения -> точка окна
+        origin = self.image_origin()
+        return (origin.x() + int(x * self.scale_factor),
+                origin.y() + int(y * self.scale_factor))
+
     def mousePressEvent(self, event):
-        if (self.image is not None and 
+        if (self.document is not None and 
             event.button() == Qt.LeftButton and 
             self.image_label.geometry().contains(event.pos())):
 
             self.drawing = True
-            # Преобразуем координаты относительно image_label
-            relative_pos = event.pos() - self.image_label.pos()
-            self.start_point = relative_pos
+            self.start_point = event.pos()
             self.end_point = self.start_point
 
     def mouseMoveEvent(self, event):
         if (self.drawing and 
             self.image_label.geometry().contains(event.pos())):
 
-            # Преобразуем координаты относительно image_label
-            relative_pos = event.pos() - self.image_label.pos()
-            self.end_point = relative_pos
+            self.end_point = event.pos()
             self.update()
 
     def mouseReleaseEvent(self, event):
@@ -236,75 +242,67 @@ class MarkupToolWindow(QMainWindow):
 
             self.drawing = False
 
-            # Преобразуем координаты относительно image_label
-            relative_pos = event.pos() - self.image_label.pos()
+            end_point = event.pos()
 
             # Проверяем, что прямоугольник имеет минимальный размер
-            if (abs(relative_pos.x() - self.start_point.x()) > 5 and
-                abs(relative_pos.y() - self.start_point.y()) > 5):
-
-                # Добавление аннотации
-                annotation = {
-                    'class': self.class_input.text() or 'object',
-                    'start': self.start_point,
-                    'end': relative_pos
-                }
-                self.annotations.append(annotation)
+            if (abs(end_point.x() - self.start_point.x()) > 5 and
+                abs(end_point.y() - self.start_point.y()) > 5):
+
+                # Добавление аннотации в координатах изображения
+                x1, y1 = self.to_image_point(self.start_point)
+                x2, y2 = self.to_image_point(end_point)
+                class_name = self.class_input.text() or 'object'
+                self.document.add_box(class_name, min(x1, x2), min(y1, y2), max(x1, x2), max(y1, y2))
                 self.update_annotations_list()
-                self.statusBar().showMessage(f"Добавлена аннотация: {annotation['class']}")
+                self.statusBar().showMessage(f"Добавлена аннотация: {class_name}")
 
             self.update()
 
     def paintEvent(self, event):
         super().paintEvent(event)
-        if self.image is not None:
+        if self.document is not None:
             painter = QPainter(self)
             painter.setPen(QPen(Qt.red, 2, Qt.SolidLine))
 
-            # Получаем позицию image_label
-            label_pos = self.image_label.pos()
+            # Отрисовка существующих аннотаций (координаты изображения -> координаты окна)
+            for class_name, x1, y1, x2, y2 in self.document.store:
+                start_x, start_y = self.to_window_point(x1, y1)
+                end_x, end_y = self.to_window_point(x2, y2)
 
-            # Отрисовка существующих аннотаций
-            for anno in self.annotations:
-                start_x = label_pos.x() + anno['start'].x()
-                start_y = label_pos.y() + anno['start'].y()
-                end_x = label_pos.x() + anno['end'].x()
-                end_y = label_pos.y() + anno['end'].y()
-
-                painter.drawRect(start_x, start_y, 
+                painter.drawRect(start_x, start_y,
                                end_x - start_x, end_y - start_y)
 
                 # Рисуем подпись класса
                 painter.setPen(QPen(Qt.red, 1, Qt.SolidLine))
-                painter.drawText(start_x, start_y - 5, anno['class'])
+                painter.drawText(start_x, start_y - 5, class_name)
                 painter.setPen(QPen(Qt.red, 2, Qt.SolidLine))
 
             # Отрисовка текущего прямоугольника
             if self.drawing:
-                start_x = label_pos.x() + self.start_point.x()
-                start_y = label_pos.y() + self.start_point.y()
-                end_x = label_pos.x() + self.end_point.x()
-                end_y = label_pos.y() + self.end_point.y()
+                start_x = self.start_point.x()
+                start_y = self.start_point.y()
+                end_x = self.end_point.x()
+                end_y = self.end_point.y()
 
                 painter.setPen(QPen(Qt.blue, 2, Qt.DashLine))
-                painter.drawRect(start_x, start_y, 
+                painter.drawRect(start_x, start_y,
                                end_x - start_x, end_y - start_y)
 
     def update_annotations_list(self):
         self.anno_list.clear()
-        for i, anno in enumerate(self.annotations):
-            width = abs(anno['end'].x() - anno['start'].x())
-            height = abs(anno['end'].y() - anno['start'].y())
+        if self.document is None:
+            return
+        for i, (class_name, x1, y1, x2, y2) in enumerate(self.document.store):
             self.anno_list.addItem(
-                f"{i+1}. {anno['class']} "
-                f"[{width}x{height}] "
-                f"({anno['start'].x()}, {anno['start'].y()})")
+                f"{i+1}. {class_name} "
+                f"[{x2 - x1}x{y2 - y1}] "
+                f"({x1}, {y1})")
 
     def delete_selected(self):
         current_row = self.anno_list.currentRow()
         if current_row >= 0:
-            deleted_class = self.annotations[current_row]['class']
-            del self.annotations[current_row]
+            deleted_class = self.document.store.class_name(current_row)
+            self.document.delete_box(current_row)
             self.update_annotations_list()
             self.update()
             self.statusBar().showMessage(f"Удалена аннотация: {deleted_class}")
@@ -313,7 +311,7 @@ class MarkupToolWindow(QMainWindow):
                                   "Выберите аннотацию для удаления")
 
     def save_annotations(self):
-        if not self.annotations:
+        if self.document is None or not self.document.store:
             QMessageBox.warning(self, "Предупреждение",
                               "Нет аннотаций для сохранения")
             return
@@ -334,12 +332,9 @@ class MarkupToolWindow(QMainWindow):
 
         if file_name:
             try:
+                # Сохраняем в формате: class x1 y1 x2 y2 (пиксели изображения)
                 with open(file_name, 'w', encoding='utf-8') as f:
-                    for anno in self.annotations:
-                        # Сохраняем в формате: class x1 y1 x2 y2
-                        f.write(f"{anno['class']} "
-                               f"{anno['start'].x()} {anno['start'].y()} "
-                               f"{anno['end'].x()} {anno['end'].y()}\n")
+                    f.writelines(self.document.store.to_lines())
 
                 QMessageBox.information(self, "Успех",
                                       f"Аннотации сохранены в файл:\n{file_name}")
@@ -350,17 +345,17 @@ class MarkupToolWindow(QMainWindow):
                                    f"Не удалось сохранить аннотации:\n{str(e)}")
 
     def clear_annotations(self):
-        if not self.annotations:
+        if self.document is None or not self.document.store:
             QMessageBox.information(self, "Информация",
                                   "Нет аннотаций для очистки")
             return
 
         reply = QMessageBox.question(self, "Подтверждение",
-                                   f"Очистить все аннотации ({len(self.annotations)} шт.)?",
+                                   f"Очистить все аннотации ({len(self.document.store)} шт.)?",
                                    QMessageBox.Yes | QMessageBox.No)
 
         if reply == QMessageBox.Yes:
-            self.annotations = []
+            self.document.set_annotations(AnnotationStore())
             self.update_annotations_list()
             self.update()
             self.statusBar().showMessage("Все аннотации очищены")
@@ -379,7 +374,6 @@ class MarkupToolWindow(QMainWindow):
             "• Поддержка путей с кириллицей")
 
 if __name__ == "__main__":
-    import sys
     from PyQt5.QtWidgets import QApplication
 
     app = QApplication(sys.argv)
@@ -0,0 +1,122 @@
+# Импорт модуля взаимодействия с ОС, выполняет операции с файлами и папками
+import os
+# Импорт модуля разбора аргументов командной строки
+import argparse
+# Импорт модуля временных каталогов для синтетического кадра
+import tempfile
+# Импорт модуля времени для замеров
+import time
+# Импорт модуля отслеживания выделений памяти Python (NumPy и OpenCV выделяют массивы через него)
+import tracemalloc
+# Импорт библиотеки OpenCV для создания синтетического кадра и прежнего конвейера
+import cv2
+# Импорт библиотеки NumPy для синтетических данных
+import numpy as np
+# Импорт библиотеки PIL для прежнего конвейера (чтение и масштабирование)
+from PIL import Image
+
+# Импорт функций нового конвейера отрисовки
+from frame_io import CLASS_COLORS, read_frame, draw_annotations, render_zoomed, ScratchBuffers
+# Импорт пирамиды масштабов
+from pyramid import ImagePyramid
+# Импорт столбцового хранилища аннотаций
+from annotation_store import AnnotationStore
+
+#================================================================
+# Отчёт о выделениях памяти в конвейере отрисовки кадра: прежний
+# конвейер (PIL RGB -> BGR -> копия исходного -> копия на каждую
+# перерисовку -> BGR -> RGB -> PIL -> LANCZOS) и текущий (кадр в RGB,
+# пирамида, отрисовка в рабочих буферах, передача в PIL без копии).
+# Для загрузки и перерисовки выводятся среднее время, пик временной
+# памяти и объём памяти, выделенной за операцию и не освобождённой.
+# Учитываются массивы NumPy/OpenCV (tracemalloc); внутренние буферы
+# PIL и Tk в отчёт не попадают.
+#   python alloc_report.py --width 3840 --height 2160 --boxes 200 --scale 0.5
+#================================================================
+
+# Создание синтетического кадра JPEG и хранилища из boxes боксов
+def make_sample(directory, width, height, boxes, seed=0):
+    rng = np.random.default_rng(seed)
+    frame = cv2.GaussianBlur(rng.integers(0, 256, (height, width, 3), dtype=np.uint8), (15, 15), 0)
+    path = os.path.join(directory, "кадр.jpg")
+    cv2.imencode(".jpg", frame)[1].tofile(path)
+    store = AnnotationStore()
+    classes = list(CLASS_COLORS)
+    for i in range(boxes):
+        x1, y1 = int(rng.integers(0, width - 50)), int(rng.integers(0, height - 50))
+        store.append(classes[i % len(classes)], x1, y1, x1 + int(rng.integers(10, 200)), y1 + int(rng.integers(10, 200)))
+    return path, store
+
+#================================================================
+# Прежний конвейер (для сравнения): чтение через PIL с переводом в BGR,
+# копия исходного кадра, а на каждую перерисовку - копия, отрисовка в
+# исходном размере, перевод в RGB и масштабирование LANCZOS.
+#================================================================
+def legacy_load(path):
+    return cv2.cvtColor(np.array(Image.open(path)), cv2.COLOR_RGB2BGR).copy()
+
+def legacy_redraw(original, store, scale_factor):
+    frame = draw_annotations(original.copy(), store, CLASS_COLORS)
+    img = Image.fromarray(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+    return img.resize((int(img.width * scale_factor), int(img.height * scale_factor)), Image.Resampling.LANCZOS)
+
+# Текущий конвейер: кадр RGB и пирамида; перерисовка в рабочих буферах
+def current_load(path):
+    pyramid = ImagePyramid(read_frame(path, rgb=True))
+    pyramid.build()
+    return pyramid
+
+def current_redraw(pyramid, store, scale_factor, scratch):
+    return render_zoomed(pyramid, store, CLASS_COLORS, scale_factor, scratch=scratch)
+
+#================================================================
+# Функция замера операции: среднее время, пик временной памяти и
+# память, оставшаяся выделенной после операции (в МБ).
+#================================================================
+def measure(operation, runs):
+    operation()
+    times, peaks, retained = [], [], []
+    results = []
+    for _ in range(runs):
+        tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+        results.append(operation())
+        times.append(time.perf_counter() - start)
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        peaks.append(peak - before)
+        retained.append(current - before)
+        # Результат удерживается до конца замера, как изображение на экране
+        results.clear()
+    mb = 1024 * 1024
+    return np.mean(times) * 1000, np.mean(peaks) / mb, np.mean(retained) / mb
+
+# Построение отчёта для заданного размера кадра, числа боксов и масштаба
+def report(width, height, boxes, scale_factor, runs):
+    with tempfile.TemporaryDirectory() as directory:
+        path, store = make_sample(directory, width, height, boxes)
+        original = legacy_load(path)
+        pyramid = current_load(path)
+        scratch = ScratchBuffers()
+        rows = [
+            ("загрузка, прежний", measure(lambda: legacy_load(path), runs)),
+            ("загрузка, текущий", measure(lambda: current_load(path), runs)),
+            ("перерисовка, прежний", measure(lambda: legacy_redraw(original, store, scale_factor), runs)),
+            ("перерисовка, текущий", measure(lambda: current_redraw(pyramid, store, scale_factor, scratch), runs)),
+        ]
+    print(f"Кадр {width}x{height}, боксов: {boxes}, масштаб: {scale_factor}, замеров: {runs}")
+    print(f"{'операция':<24}{'время, мс':>12}{'пик, МБ':>12}{'осталось, МБ':>15}")
+    for name, (ms, peak, retained) in rows:
+        print(f"{name:<24}{ms:>12.1f}{peak:>12.1f}{retained:>15.1f}")
+    return rows
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Отчёт о выделениях памяти в конвейере отрисовки кадра")
+    parser.add_argument("--width", type=int, default=3840, help="ширина синтетического кадра")
+    parser.add_argument("--height", type=int, default=2160, help="высота синтетического кадра")
+    parser.add_argument("--boxes", type=int, default=200, help="число боксов")
+    parser.add_argument("--scale", type=float, default=0.5, help="масштаб показа")
+    parser.add_argument("--runs", type=int, default=5, help="число замеров каждой операции")
+    args = parser.parse_args()
+    report(args.width, args.height, args.boxes, args.scale, args.runs)
@@ -0,0 +1,235 @@
+# Импорт модуля взаимодействия с ОС, выполняет операции с файлами и папками
+import os
+# Импорт библиотеки NumPy для хранения координат боксов в массивах
+import numpy as np
+
+# Импорт журнала просмотрщика
+from logs import get_logger
+
+# Журнал модуля
+log = get_logger("annotations")
+
+#================================================================
+# Класс хранилища аннотаций кадра в столбцовом виде на NumPy.
+# Координаты боксов хранятся в массиве int32 формы (N, 4),
+# классы - в массиве идентификаторов int32 и общей таблице имён.
+# Для совместимости с прежним кодом элементы читаются как кортежи
+# (class_name, x1, y1, x2, y2), но все массовые операции
+# (поиск, обрезка, масштабирование, сдвиг) выполняются векторно.
+#================================================================
+class AnnotationStore:
+    # Инициализация пустого хранилища с начальной ёмкостью
+    def __init__(self, capacity=16):
+        # Массив координат с запасом ёмкости (используются первые _size строк)
+        self._coords = np.zeros((capacity, 4), dtype=np.int32)
+        # Массив идентификаторов классов с тем же запасом
+        self._class_ids = np.zeros(capacity, dtype=np.int32)
+        # Количество боксов в хранилище
+        self._size = 0
+        # Таблица имён классов: идентификатор -> имя
+        self.classes = []
+        # Обратная таблица: имя -> идентификатор
+        self.class_lookup = {}
+
+    #================================================================
+    # Функция создания хранилища из строк формата "class x1 y1 x2 y2".
+    # Некорректные строки пропускаются, как и при прежнем разборе.
+    #================================================================
+    @classmethod
+    def from_lines(cls, lines):
+        names = []
+        values = []
+        for line in lines:
+            # Разделение строки на части (класс и координаты)
+            parts = line.strip().split()
+            # Проверка, что строка содержит 5 элементов (класс и 4 координаты)
+            if len(parts) != 5:
+                continue
+            try:
+                values.append([float(v) for v in parts[1:]])
+            # Обработка ошибок при парсинге аннотации
+            except ValueError as e:
+                log.warning("Ошибка разбора аннотации: %s", e)
+                continue
+            names.append(parts[0])
+        return cls.from_columns(names, np.array(values, dtype=np.float64).reshape(-1, 4))
+
+    #================================================================
+    # Функция создания хранилища из списка имён классов и массива
+    # координат (N, 4). Координаты приводятся к int32 (как int() раньше).
+    #================================================================
+    @classmethod
+    def from_columns(cls, names, coords):
+        store = cls(capacity=max(16, len(names)))
+        store._size = len(names)
+        store._coords[:store._size] = np.trunc(coords).astype(np.int32)
+        store._class_ids[:store._size] = [store.intern(name) for name in names]
+        return store
+
+    # Создание хранилища из массивов идентификаторов классов (N,), координат (N, 4)
+    # и таблицы имён классов (массивы копируются)
+    @classmethod
+    def from_arrays(cls, class_ids, coords, classes):
+        store = cls(capacity=max(16, len(class_ids)))
+        store._size = len(class_ids)
+        store._coords[:store._size] = coords
+        store._class_ids[:store._size] = class_ids
+        store.classes = list(classes)
+        store.class_lookup = {name: i for i, name in enumerate(store.classes)}
+        return store
+
+    # Создание хранилища из списка кортежей (class_name, x1, y1, x2, y2)
+    @classmethod
+    def from_tuples(cls, bboxes):
+        names = [box[0] for box in bboxes]
+        coords = np.array([box[1:5] for box in bboxes], dtype=np.float64).reshape(-1, 4)
+        return cls.from_columns(names, coords)
+
+    # Чтение хранилища из текстового файла аннотаций (пустое, если файла нет)
+    @classmethod
+    def from_file(cls, annotation_path):
+        if not os.path.exists(annotation_path):
+            return cls()
+        with open(annotation_path, 'r') as f:
+            return cls.from_lines(f.readlines())
+
+    # Получение идентификатора класса (новое имя добавляется в таблицу)
+    def intern(self, class_name):
+        class_id = self.class_lookup.get(class_name)
+        if class_id is None:
+            class_id = len(self.classes)
+            self.classes.append(class_name)
+            self.class_lookup[class_name] = class_id
+        return class_id
+
+    # Массив координат (N, 4) - представление без копирования
+    @property
+    def coords(self):
+        return self._coords[:self._size]
+
+    # Массив идентификаторов классов (N,) - представление без копирования
+    @property
+    def class_ids(self):
+        return self._class_ids[:self._size]
+
+    # Количество боксов
+    def __len__(self):
+        return self._size
+
+    # Бокс по индексу в виде кортежа (class_name, x1, y1, x2, y2)
+    def __getitem__(self, index):
+        if not -self._size <= index < self._size:
+            raise IndexError("индекс бокса вне диапазона")
+        index %= self._size
+        x1, y1, x2, y2 = self._coords[index].tolist()
+        return self.classes[self._class_ids[index]], x1, y1, x2, y2
+
+    # Перебор боксов в виде кортежей (одно преобразование массивов в списки)
+    def __iter__(self):
+        classes = self.classes
+        for class_id, (x1, y1, x2, y2) in zip(self.class_ids.tolist(), self.coords.tolist()):
+            yield classes[class_id], x1, y1, x2, y2
+
+    # Имя класса бокса
+    def class_name(self, index):
+        return self.classes[self._class_ids[index]]
+
+    # Координаты бокса (x1, y1, x2, y2)
+    def box(self, index):
+        return tuple(self._coords[index].tolist())
+
+    # Увеличение ёмкости массивов вдвое при заполнении
+    def _grow(self):
+        capacity = max(16, len(self._coords) * 2)
+        coords = np.zeros((capacity, 4), dtype=np.int32)
+        class_ids = np.zeros(capacity, dtype=np.int32)
+        coords[:self._size] = self.coords
+        class_ids[:self._size] = self.class_ids
+        self._coords, self._class_ids = coords, class_ids
+
+    #================================================================
+    # Функция добавления бокса. Возвращает его индекс.
+    #================================================================
+    def append(self, class_name, x1, y1, x2, y2):
+        if self._size == len(self._coords):
+            self._grow()
+        index = self._size
+        self._coords[index] = (x1, y1, x2, y2)
+        self._class_ids[index] = self.intern(class_name)
+        self._size += 1
+        return index
+
+    # Изменение координат бокса на месте (без создания новых объектов)
+    def set_box(self, index, x1, y1, x2, y2):
+        self._coords[index] = (x1, y1, x2, y2)
+
+    # Изменение класса бокса
+    def set_class(self, index, class_name):
+        self._class_ids[index] = self.intern(class_name)
+
+    #================================================================
+    # Функция удаления бокса; следующие боксы сдвигаются на одну позицию.
+    #================================================================
+    def delete(self, index):
+        self._coords[index:self._size - 1] = self._coords[index + 1:self._size]
+        self._class_ids[index:self._size - 1] = self._class_ids[index + 1:self._size]
+        self._size -= 1
+
+    #================================================================
+    # Функция векторного поиска боксов, содержащих точку (x, y).
+    # Возвращает массив индексов в порядке хранения.
+    #================================================================
+    def contains(self, x, y):
+        c = self.coords
+        mask = (c[:, 0] <= x) & (x <= c[:, 2]) & (c[:, 1] <= y) & (y <= c[:, 3])
+        return np.flatnonzero(mask)
+
+    # Векторный поиск боксов, пересекающих область (x1, y1, x2, y2)
+    def intersecting(self, x1, y1, x2, y2):
+        c = self.coords
+        lo = np.minimum(c[:, :2], c[:, 2:])
+        hi = np.maximum(c[:, :2], c[:, 2:])
+        mask = (lo[:, 0] <= x2) & (hi[:, 0] >= x1) & (lo[:, 1] <= y2) & (hi[:, 1] >= y1)
+        return np.flatnonzero(mask)
+
+    # Обрезка всех боксов по границам изображения (на месте)
+    def clip(self, width, height):
+        c = self.coords
+        np.clip(c[:, 0::2], 0, width, out=c[:, 0::2])
+        np.clip(c[:, 1::2], 0, height, out=c[:, 1::2])
+
+    # Координаты всех боксов при масштабе scale_factor (новый массив int32)
+    def scaled(self, scale_factor):
+        return (self.coords * scale_factor).astype(np.int32)
+
+    # Массовый сдвиг выбранных боксов (indices - массив индексов или маска)
+    def translate(self, indices, dx, dy):
+        self._coords[:self._size][indices] += np.array([dx, dy, dx, dy], dtype=np.int32)
+
+    # Массовая смена класса выбранных боксов
+    def relabel(self, indices, class_name):
+        self._class_ids[:self._size][indices] = self.intern(class_name)
+
+    # Независимая копия хранилища (таблица классов копируется)
+    def copy(self):
+        store = AnnotationStore(capacity=max(16, self._size))
+        store._size = self._size
+        store._coords[:self._size] = self.coords
+        store._class_ids[:self._size] = self.class_ids
+        store.classes = list(self.classes)
+        store.class_lookup = dict(self.class_lookup)
+        return store
+
+    # Объём памяти массивов хранилища в байтах
+    @property
+    def nbytes(self):
+        return self._coords.nbytes + self._class_ids.nbytes
+
+    # Строки в текстовом формате "class x1 y1 x2 y2"
+    def to_lines(self):
+        return [f"{class_name} {x1} {y1} {x2} {y2}\n" for class_name, x1, y1, x2, y2 in self]
+
+    # Запись всех боксов в текстовый файл аннотаций
+    def save(self, annotation_path):
+        with open(annotation_path, 'w') as f:
+            f.writelines(self.to_lines())
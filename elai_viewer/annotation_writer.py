@@ -0,0 +1,176 @@
+# Импорт модуля взаимодействия с ОС, выполняет операции с файлами и папками
+import os
+# Импорт модуля для создания временных файлов рядом с файлом аннотации
+import tempfile
+# Импорт модуля потоков для фоновой записи
+import threading
+# Импорт модуля времени для отложенной (debounce) записи
+import time
+# Импорт модуля прав доступа к файлам
+import stat
+
+# Маска прав процесса (os.umask можно только установить, поэтому она
+# читается один раз при импорте, до запуска потоков записи)
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+#================================================================
+# Функция прав доступа для файла, заменяющего path: права прежнего
+# файла, а для нового - как у open() (0o666 без битов umask).
+# Временный файл mkstemp создаётся с правами 0600, и без этого после
+# первой записи файл аннотации становится недоступен остальным
+# пользователям общего каталога.
+#================================================================
+def replacement_mode(path):
+    try:
+        return stat.S_IMODE(os.stat(path).st_mode)
+    except FileNotFoundError:
+        return 0o666 & ~_UMASK
+
+# Установка прав mode открытому файлу fd (на платформах без fchmod права не меняются)
+def set_file_mode(fd, mode):
+    if hasattr(os, "fchmod"):
+        os.fchmod(fd, mode)
+
+#================================================================
+# Функция атомарной записи строк в файл: запись во временный файл
+# в том же каталоге с правами старого файла, сброс на диск и
+# переименование поверх старого. При сбое старый файл остаётся целым.
+#================================================================
+def atomic_write_lines(path, lines):
+    directory = os.path.dirname(path) or "."
+    fd, temp_path = tempfile.mkstemp(prefix=".elai_", suffix=".tmp", dir=directory)
+    try:
+        # Права заменяемого файла (а не 0600 временного)
+        set_file_mode(fd, replacement_mode(path))
+        with os.fdopen(fd, 'w') as f:
+            f.writelines(lines)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        # Удаление временного файла при ошибке записи
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+#================================================================
+# Класс отложенной фоновой записи аннотаций. Сохранения одного
+# кадра объединяются (записывается только последнее состояние),
+# запись откладывается на debounce_ms после последней правки и
+# выполняется атомарно в отдельном потоке, не блокируя интерфейс.
+# Ошибки записи накапливаются для отображения в интерфейсе.
+#================================================================
+class AnnotationWriter:
+    # Инициализация и запуск фонового потока записи
+    def __init__(self, debounce_ms=500):
+        # Задержка записи после последней правки, в секундах
+        self.debounce = debounce_ms / 1000.0
+        # Условная переменная для пробуждения потока записи
+        self.condition = threading.Condition()
+        # Ожидающие записи: путь -> (хранилище, время, когда пора писать)
+        self.pending = {}
+        # Кадры, запись которых выполняется прямо сейчас: путь -> хранилище
+        self.writing = {}
+        # Ошибки записи: путь -> текст ошибки
+        self.failed = {}
+        # Количество успешно записанных файлов
+        self.written = 0
+        # Признак остановки потока
+        self.stopping = False
+        # Запуск фонового потока записи
+        self.thread = threading.Thread(target=self._run, name="annotation-writer", daemon=True)
+        self.thread.start()
+
+    #================================================================
+    # Функция постановки кадра в очередь записи. Сохраняется копия
+    # хранилища, поэтому дальнейшие правки не влияют на записываемые данные.
+    #================================================================
+    def submit(self, path, store):
+        with self.condition:
+            self.pending[path] = (store.copy(), time.monotonic() + self.debounce)
+            # Повторная попытка записи снимает прежнюю ошибку
+            self.failed.pop(path, None)
+            self.condition.notify()
+
+    #================================================================
+    # Функция немедленной записи (без ожидания debounce) всех
+    # ожидающих кадров или только кадра path. Не блокирует вызов.
+    #================================================================
+    def flush(self, path=None):
+        with self.condition:
+            now = time.monotonic()
+            for key, (store, due) in list(self.pending.items()):
+                if path is None or key == path:
+                    self.pending[key] = (store, min(due, now))
+            self.condition.notify()
+
+    #================================================================
+    # Функция ожидания записи всех кадров (не дольше timeout секунд).
+    # Возвращает True, если очередь опустела.
+    #================================================================
+    def wait_idle(self, timeout=None):
+        self.flush()
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self.condition:
+            while self.pending or self.writing:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self.condition.wait(remaining)
+        return True
+
+    # Запись всех ожидающих кадров и остановка потока (при выходе из программы)
+    def close(self, timeout=None):
+        self.wait_idle(timeout)
+        with self.condition:
+            self.stopping = True
+            self.condition.notify_all()
+        self.thread.join(timeout)
+
+    # Ещё не записанное на диск состояние кадра (копия) или None
+    def get_pending(self, path):
+        with self.condition:
+            entry = self.pending.get(path)
+            store = entry[0] if entry is not None else self.writing.get(path)
+            return store.copy() if store is not None else None
+
+    # Количество ожидающих записи кадров и количество ошибок
+    def status(self):
+        with self.condition:
+            return len(self.pending) + len(self.writing), len(self.failed)
+
+    #================================================================
+    # Основной цикл фонового потока: ожидание наступления срока
+    # записи, извлечение готовых кадров и их запись вне блокировки.
+    #================================================================
+    def _run(self):
+        while True:
+            with self.condition:
+                while True:
+                    if self.stopping and not self.pending:
+                        return
+                    now = time.monotonic()
+                    due = [path for path, (_, when) in self.pending.items() if when <= now]
+                    if due:
+                        break
+                    # Сон до ближайшего срока записи или до новой правки
+                    timeout = min((when for _, when in self.pending.values()), default=None)
+                    self.condition.wait(None if timeout is None else max(0.0, timeout - now))
+                batch = [(path, self.pending.pop(path)[0]) for path in due]
+                self.writing.update(batch)
+            # Запись вне блокировки, чтобы интерфейс мог ставить новые правки
+            for path, store in batch:
+                try:
+                    atomic_write_lines(path, store.to_lines())
+                    error = None
+                except OSError as e:
+                    error = str(e)
+                with self.condition:
+                    self.writing.pop(path, None)
+                    if error is None:
+                        self.written += 1
+                    # Ошибка сохраняется, только если кадр не был поставлен в очередь заново
+                    elif path not in self.pending:
+                        self.failed[path] = error
+                    self.condition.notify_all()
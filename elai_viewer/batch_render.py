@@ -0,0 +1,210 @@
+# Импорт модуля взаимодействия с ОС, выполняет операции с файлами и папками
+import os
+# Импорт модуля разбора аргументов командной строки
+import argparse
+# Импорт модуля системных параметров (код завершения)
+import sys
+# Импорт очереди с двусторонним доступом для ограниченного окна задач
+from collections import deque
+# Импорт пула процессов для параллельной отрисовки кадров
+from concurrent.futures import ProcessPoolExecutor
+# Импорт библиотеки OpenCV для отрисовки, масштабирования и записи видео
+import cv2
+
+# Импорт функций чтения кадров и аннотаций и отрисовки боксов (без Tkinter)
+from frame_io import (CLASS_COLORS, read_frame, read_annotations, annotation_name_for,
+                      annotation_path_for, draw_annotations)
+# Импорт упакованного хранилища аннотаций
+from packed_store import PackedAnnotations
+# Импорт ключа естественной сортировки имён кадров (порядок как в просмотрщике)
+from frame_source import natural_key
+# Импорт журнала (ошибки отдельных кадров)
+from logs import get_logger
+
+log = get_logger("batch")
+
+#================================================================
+# Пакетная отрисовка размеченных кадров без графического интерфейса.
+# Кадры каталога (или их диапазон) отрисовываются с боксами в пуле
+# процессов и записываются в файлы изображений или в видео. В работе
+# одновременно находится не больше нескольких кадров на процесс,
+# поэтому расход памяти не растёт с числом кадров.
+#================================================================
+
+# Расширения файлов кадров (как в просмотрщике)
+FRAME_EXTENSIONS = ('.png', '.jpg', '.jpeg')
+
+# Состояние процесса-обработчика (задаётся один раз при запуске процесса)
+_worker = {}
+
+#================================================================
+# Функция получения списка кадров каталога в естественном порядке и выбора
+# диапазона: start и end - номера кадров с 1 (включительно), step - шаг.
+#================================================================
+def list_frames(frames_dir, start=1, end=None, step=1):
+    with os.scandir(frames_dir) as entries:
+        image_files = sorted((e.name for e in entries if e.name.endswith(FRAME_EXTENSIONS)), key=natural_key)
+    end = len(image_files) if end is None else min(end, len(image_files))
+    return image_files[max(1, start) - 1:end:step]
+
+# Инициализация процесса-обработчика: параметры отрисовки и открытие упакованных аннотаций
+def _init_worker(frames_dir, annotations_dir, packed_path, scale_factor, class_colors):
+    _worker["frames_dir"] = frames_dir
+    _worker["annotations_dir"] = annotations_dir
+    _worker["packed"] = PackedAnnotations(packed_path) if packed_path else None
+    _worker["scale_factor"] = scale_factor
+    _worker["class_colors"] = class_colors
+
+#================================================================
+# Функция отрисовки одного кадра с боксами (в процессе-обработчике).
+# Возвращает кадр BGR в выходном масштабе.
+#================================================================
+def render_frame(filename):
+    frame = read_frame(os.path.join(_worker["frames_dir"], filename))
+    # Аннотации: сначала упакованное хранилище, затем .txt-файл
+    store = None
+    if _worker["packed"] is not None:
+        store = _worker["packed"].get(annotation_name_for(filename))
+    if store is None:
+        store = read_annotations(annotation_path_for(_worker["annotations_dir"], filename))
+    scale_factor = _worker["scale_factor"]
+    # Уменьшение до отрисовки, чтобы рисовать на изображении выходного размера
+    if scale_factor != 1.0:
+        height, width = frame.shape[:2]
+        size = (max(1, int(width * scale_factor)), max(1, int(height * scale_factor)))
+        interpolation = cv2.INTER_AREA if scale_factor < 1.0 else cv2.INTER_LINEAR
+        frame = cv2.resize(frame, size, interpolation=interpolation)
+    return draw_annotations(frame, store, _worker["class_colors"], scale_factor)
+
+#================================================================
+# Функция отрисовки кадра и записи его в файл (в процессе-обработчике).
+# Имя файла сохраняет исходное расширение (a.png -> a.png.jpg), чтобы
+# кадры с одинаковой основой имени не перезаписывали друг друга.
+# Возвращает путь записанного файла - через процессы передаётся только имя.
+#================================================================
+def render_to_file(filename, output_dir, image_format):
+    frame = render_frame(filename)
+    output_path = os.path.join(output_dir, filename + "." + image_format)
+    ok, encoded = cv2.imencode("." + image_format, frame)
+    if not ok:
+        raise OSError(f"не удалось закодировать кадр {filename}")
+    encoded.tofile(output_path)
+    return output_path
+
+#================================================================
+# Функция потоковой обработки: задачи отправляются в пул ограниченным
+# окном (window штук), future выдаются по порядку; ошибку отдельного
+# кадра обрабатывает вызывающий, не прерывая остальные задачи.
+#================================================================
+def _stream(executor, function, items, window, *args):
+    pending = deque()
+    for item in items:
+        pending.append((item, executor.submit(function, item, *args)))
+        if len(pending) >= window:
+            yield pending.popleft()
+    while pending:
+        yield pending.popleft()
+
+# Результат задачи кадра или None, если кадр не отрисован (имя добавляется в failed)
+def _result(filename, future, failed):
+    try:
+        return future.result()
+    except Exception as e:
+        log.error("Кадр %s не отрисован: %s", filename, e)
+        failed.append(filename)
+        return None
+
+#================================================================
+# Функция пакетной отрисовки кадров в каталог изображений.
+# Возвращает число записанных файлов и список неотрисованных кадров.
+#================================================================
+def render_to_images(frames_dir, annotations_dir, output_dir, image_files, workers=None, scale_factor=1.0,
+                     image_format="jpg", packed_path=None, class_colors=None):
+    os.makedirs(output_dir, exist_ok=True)
+    workers = workers or os.cpu_count() or 1
+    count = 0
+    failed = []
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(frames_dir, annotations_dir, packed_path, scale_factor,
+                                       class_colors or CLASS_COLORS)) as executor:
+        for filename, future in _stream(executor, render_to_file, image_files, workers * 2,
+                                        output_dir, image_format):
+            output_path = _result(filename, future, failed)
+            if output_path is None:
+                continue
+            count += 1
+            print(f"[{count + len(failed)}/{len(image_files)}] {filename} -> {output_path}")
+    return count, failed
+
+#================================================================
+# Функция пакетной отрисовки кадров в видеофайл. Кадры отрисовываются
+# параллельно, а записываются в исходном порядке в главном процессе.
+# Кадры другого размера приводятся к размеру первого кадра.
+# Возвращает число записанных кадров и список неотрисованных кадров.
+#================================================================
+def render_to_video(frames_dir, annotations_dir, output_path, image_files, workers=None, scale_factor=1.0,
+                    fps=25.0, codec="mp4v", packed_path=None, class_colors=None):
+    workers = workers or os.cpu_count() or 1
+    writer = None
+    count = 0
+    failed = []
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(frames_dir, annotations_dir, packed_path, scale_factor,
+                                           class_colors or CLASS_COLORS)) as executor:
+            for filename, future in _stream(executor, render_frame, image_files, workers * 2):
+                frame = _result(filename, future, failed)
+                if frame is None:
+                    continue
+                height, width = frame.shape[:2]
+                if writer is None:
+                    size = (width, height)
+                    writer = cv2.VideoWriter(output_path, cv2.VideoWriter_fourcc(*codec), fps, size)
+                    if not writer.isOpened():
+                        raise OSError(f"не удалось открыть видео для записи: {output_path}")
+                if (width, height) != size:
+                    frame = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+                writer.write(frame)
+                count += 1
+                print(f"[{count + len(failed)}/{len(image_files)}] {filename}")
+    finally:
+        if writer is not None:
+            writer.release()
+    return count, failed
+
+#================================================================
+# Командная строка:
+#   python batch_render.py <каталог_кадров> <каталог_аннотаций> --out <каталог>
+#   python batch_render.py <каталог_кадров> <каталог_аннотаций> --video <файл.mp4>
+# Диапазон кадров задаётся --start/--end (номера с 1) и --step.
+#================================================================
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Пакетная отрисовка размеченных кадров без интерфейса")
+    parser.add_argument("frames_dir", help="каталог с кадрами")
+    parser.add_argument("annotations_dir", help="каталог с аннотациями .txt")
+    output = parser.add_mutually_exclusive_group(required=True)
+    output.add_argument("--out", help="каталог для изображений с боксами")
+    output.add_argument("--video", help="путь к выходному видеофайлу")
+    parser.add_argument("--packed", help="упакованный файл аннотаций (.elaipak)")
+    parser.add_argument("--start", type=int, default=1, help="номер первого кадра (с 1)")
+    parser.add_argument("--end", type=int, default=None, help="номер последнего кадра (включительно)")
+    parser.add_argument("--step", type=int, default=1, help="шаг по кадрам")
+    parser.add_argument("--scale", type=float, default=1.0, help="масштаб выходных кадров")
+    parser.add_argument("--workers", type=int, default=None, help="число процессов (по умолчанию - число ядер)")
+    parser.add_argument("--format", default="jpg", choices=("jpg", "png"), help="формат изображений")
+    parser.add_argument("--fps", type=float, default=25.0, help="частота кадров видео")
+    parser.add_argument("--codec", default="mp4v", help="FourCC-код видеокодека")
+    args = parser.parse_args()
+    image_files = list_frames(args.frames_dir, args.start, args.end, args.step)
+    if args.out:
+        count, failed = render_to_images(args.frames_dir, args.annotations_dir, args.out, image_files,
+                                         args.workers, args.scale, args.format, args.packed)
+        print(f"Отрисовано кадров: {count} -> {args.out}")
+    else:
+        count, failed = render_to_video(args.frames_dir, args.annotations_dir, args.video, image_files,
+                                        args.workers, args.scale, args.fps, args.codec, args.packed)
+        print(f"Записано кадров: {count} -> {args.video}")
+    # Ненулевой код завершения, если хотя бы один кадр не отрисован
+    if failed:
+        print(f"Не отрисовано кадров: {len(failed)}: {', '.join(failed)}")
+        sys.exit(1)
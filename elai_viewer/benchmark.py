@@ -0,0 +1,304 @@
+# Импорт модуля взаимодействия с ОС, выполняет операции с файлами и папками
+import os
+# Импорт модуля системных параметров (пути импорта, версия Python)
+import sys
+# Импорт модуля разбора аргументов командной строки
+import argparse
+# Импорт модуля JSON для сохранения и сравнения результатов
+import json
+# Импорт модуля сведений о платформе для описания окружения
+import platform
+# Импорт модуля запуска процессов для определения коммита git
+import subprocess
+# Импорт модуля временных каталогов для синтетических кадров
+import tempfile
+# Импорт модуля времени для замеров
+import time
+# Импорт модуля отслеживания выделений памяти Python (NumPy и OpenCV выделяют массивы через него)
+import tracemalloc
+# Импорт библиотеки OpenCV для создания синтетических кадров
+import cv2
+# Импорт библиотеки NumPy для синтетических данных и процентилей
+import numpy as np
+
+# Импорт функций конвейера отрисовки просмотрщика
+from frame_io import CLASS_COLORS, read_frame, render_zoomed, render_scaled, ScratchBuffers
+# Импорт пирамиды масштабов
+from pyramid import ImagePyramid
+# Импорт кадра с аннотациями ядра просмотрщика (вывод в PyQt-инструменте)
+from engine import FrameDocument
+# Импорт столбцового хранилища аннотаций
+from annotation_store import AnnotationStore
+# Импорт пространственного индекса боксов (поиск бокса под курсором)
+from spatial_index import BoxGridIndex
+# Импорт реестра декодеров (замер декодеров отключается ради повторяемости)
+from decoders import registry
+
+# Размеры синтетических кадров по названиям
+FRAME_SIZES = {"HD": (1920, 1080), "4K": (3840, 2160), "8K": (7680, 4320)}
+# Каталог PyQt-инструмента разметки (MarkupToolWindow)
+QT_TOOL_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Modul_01", "PyQt5")
+
+#================================================================
+# Набор замеров горячих путей просмотрщика без окна: для каждого
+# размера кадра (HD/4K/8K) и числа боксов (10-5000) выполняются те же
+# вызовы, что делают функции Markup_001.py:
+#   parse   - разбор файла аннотаций (read_frame_annotations);
+#   load    - чтение кадра и пирамида масштабов (load_image);
+#   redraw  - отрисовка кадра с боксами в экранном размере (redraw_image);
+#   motion  - поиск бокса и маркера под курсором (on_mouse_motion);
+#   dim     - затемнённая копия для первой подсветки (render_dimmed);
+#   focus   - то же в режиме фокуса: все боксы кадра остаются незатемнёнными;
+#   update  - масштабирование готового кадра (update_image).
+# Если доступен дисплей, замеряется и вывод в Tk (tk_show), а при
+# установленном PyQt5 - MarkupToolWindow.display_image и paintEvent
+# (платформа Qt "offscreen"). Для каждой операции выводятся процентили
+# задержки и пик временной памяти; результаты сохраняются в JSON и
+# сравниваются с прежним запуском (--compare).
+#   python benchmark.py --sizes HD,4K --boxes 10,1000 --output bench.json
+#   python benchmark.py --compare bench.json
+#================================================================
+
+# Создание синтетического кадра JPEG, файла аннотаций и хранилища из boxes боксов
+def make_case(directory, width, height, boxes, seed=0):
+    rng = np.random.default_rng(seed)
+    frame = cv2.GaussianBlur(rng.integers(0, 256, (height, width, 3), dtype=np.uint8), (15, 15), 0)
+    frame_path = os.path.join(directory, f"кадр_{width}x{height}.jpg")
+    cv2.imencode(".jpg", frame)[1].tofile(frame_path)
+    store = AnnotationStore()
+    classes = list(CLASS_COLORS)
+    for i in range(boxes):
+        x1, y1 = int(rng.integers(0, width - 50)), int(rng.integers(0, height - 50))
+        store.append(classes[i % len(classes)], x1, y1,
+                     min(width, x1 + int(rng.integers(10, 200))), min(height, y1 + int(rng.integers(10, 200))))
+    annotation_path = os.path.join(directory, f"кадр_{width}x{height}_{boxes}.txt")
+    store.save(annotation_path)
+    return frame_path, annotation_path, store
+
+#================================================================
+# Функция замера операции: runs замеров времени после прогрева и
+# отдельный прогон под tracemalloc для пика временной памяти (чтобы
+# учёт выделений не искажал время). Возвращает словарь с процентилями
+# задержки в мс и пиком памяти в МБ.
+#================================================================
+def measure(operation, runs):
+    operation()
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        operation()
+        times.append((time.perf_counter() - start) * 1000)
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = operation()
+    peak = tracemalloc.get_traced_memory()[1] - before
+    tracemalloc.stop()
+    del result
+    p50, p90, p99 = np.percentile(times, [50, 90, 99])
+    return {"runs": runs, "mean_ms": float(np.mean(times)), "p50_ms": float(p50), "p90_ms": float(p90),
+            "p99_ms": float(p99), "max_ms": float(np.max(times)), "peak_mb": peak / (1024 * 1024)}
+
+# Точки курсора для замера движения мыши: половина внутри боксов, половина случайно
+def motion_points(store, width, height, count=256, seed=1):
+    rng = np.random.default_rng(seed)
+    points = rng.uniform(0, 1, (count, 2)) * (width, height)
+    if len(store):
+        coords = store.coords[rng.integers(0, len(store), count // 2)]
+        points[:count // 2, 0] = (coords[:, 0] + coords[:, 2]) / 2
+        points[:count // 2, 1] = (coords[:, 1] + coords[:, 3]) / 2
+    return points.tolist()
+
+#================================================================
+# Функция замеров одного сочетания размера кадра и числа боксов.
+# Возвращает словарь операция -> результат measure.
+#================================================================
+def bench_case(frame_path, annotation_path, store, scale_factor, runs, tk_root=None, qt_window=None):
+    scratch = ScratchBuffers()
+    frame = read_frame(frame_path, rgb=True)
+    height, width = frame.shape[:2]
+    pyramid = ImagePyramid(frame)
+    pyramid.build()
+    box_index = BoxGridIndex()
+    box_index.build(store.coords)
+    points = motion_points(store, width, height)
+
+    # Одно событие движения - запрос к индексу в исходных координатах (как в on_mouse_motion)
+    def motion():
+        for x, y in points:
+            box_index.handle_at(x, y)
+
+    def load():
+        loaded = ImagePyramid(read_frame(frame_path, rgb=True))
+        loaded.build()
+        return loaded
+
+    results = {
+        "parse": measure(lambda: AnnotationStore.from_file(annotation_path), runs),
+        "load": measure(load, runs),
+        "redraw": measure(lambda: render_zoomed(pyramid, store, CLASS_COLORS, scale_factor, scratch=scratch), runs),
+        "motion": measure(motion, runs),
+        "dim": measure(lambda: render_zoomed(pyramid, store, CLASS_COLORS, scale_factor, 0.5, scratch=scratch), runs),
+        "focus": measure(lambda: render_zoomed(pyramid, store, CLASS_COLORS, scale_factor, 0.5, scratch=scratch,
+                                               focus=store.coords), runs),
+        "update": measure(lambda: render_scaled(frame, scale_factor), runs),
+    }
+    # Время motion - на одно событие, а не на весь набор точек
+    for key in ("mean_ms", "p50_ms", "p90_ms", "p99_ms", "max_ms"):
+        results["motion"][key] /= len(points)
+    if tk_root is not None:
+        results["tk_show"] = bench_tk(tk_root, pyramid, store, scale_factor, scratch, runs)
+    if qt_window is not None:
+        results.update(bench_qt(qt_window, frame, store, runs))
+    return results
+
+#================================================================
+# Функция замера вывода в Tk (как show_image): перенос готового
+# изображения в рабочий PhotoImage без создания нового.
+#================================================================
+def bench_tk(tk_root, pyramid, store, scale_factor, scratch, runs):
+    from PIL import ImageTk
+    img = render_zoomed(pyramid, store, CLASS_COLORS, scale_factor, scratch=scratch)
+    photo = ImageTk.PhotoImage(image=img, master=tk_root)
+
+    def show():
+        photo.paste(render_zoomed(pyramid, store, CLASS_COLORS, scale_factor, scratch=scratch))
+        tk_root.update_idletasks()
+    return measure(show, runs)
+
+#================================================================
+# Функция замера PyQt-инструмента: display_image (масштабирование
+# кадра под метку) и paintEvent (отрисовка аннотаций), вызываемый
+# синхронно через repaint(). Аннотации переводятся в координаты метки.
+#================================================================
+def bench_qt(window, frame, store, runs):
+    window.set_document(FrameDocument(ImagePyramid(np.ascontiguousarray(frame)), store.copy()))
+    return {"qt_display": measure(window.display_image, runs),
+            "qt_paint": measure(window.repaint, runs)}
+
+# Окно Tk для замера вывода (None, если нет дисплея)
+def open_tk():
+    try:
+        import tkinter as tk
+        root = tk.Tk()
+    except Exception as e:
+        print(f"Замер Tk пропущен: {e}")
+        return None
+    root.withdraw()
+    return root
+
+# Окно PyQt-инструмента на платформе "offscreen" (None, если PyQt5 не установлен)
+def open_qt():
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    try:
+        from PyQt5.QtWidgets import QApplication
+        sys.path.insert(0, QT_TOOL_DIR)
+        from markup_tool_qt_fixed import MarkupToolWindow
+    except ImportError as e:
+        print(f"Замер PyQt пропущен: {e}")
+        return None
+    app = QApplication.instance() or QApplication(sys.argv[:1])
+    window = MarkupToolWindow()
+    window.show()
+    app.processEvents()
+    # Ссылка на приложение сохраняется, чтобы оно жило вместе с окном
+    window.benchmark_app = app
+    return window
+
+# Описание окружения: коммит git, версии Python и библиотек, платформа
+def environment():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {"commit": commit, "python": platform.python_version(), "numpy": np.__version__,
+            "opencv": cv2.__version__, "platform": platform.platform(), "cpu_count": os.cpu_count(),
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S")}
+
+# Вывод таблицы результатов
+def print_results(results):
+    print(f"{'случай':<12}{'операция':<12}{'p50, мс':>10}{'p90, мс':>10}{'p99, мс':>10}{'пик, МБ':>10}")
+    for case, operations in results.items():
+        for name, r in operations.items():
+            print(f"{case:<12}{name:<12}{r['p50_ms']:>10.3f}{r['p90_ms']:>10.3f}{r['p99_ms']:>10.3f}"
+                  f"{r['peak_mb']:>10.1f}")
+
+#================================================================
+# Функция сравнения с прежними результатами: отношение медиан и
+# пиков памяти для общих случаев. Замедление или рост памяти больше
+# threshold раз отмечается как регрессия; замедления меньше min_ms
+# (шум коротких операций) не учитываются. Возвращает число регрессий.
+#================================================================
+def compare(previous, current, threshold, min_ms=0.05):
+    print(f"Сравнение с {previous['environment'].get('commit')} -> {current['environment'].get('commit')}")
+    print(f"{'случай':<12}{'операция':<12}{'p50 было':>10}{'p50 стало':>11}{'x':>7}{'пик x':>8}")
+    regressions = 0
+    for case, operations in current["results"].items():
+        for name, r in operations.items():
+            old = previous["results"].get(case, {}).get(name)
+            if old is None:
+                continue
+            ratio = r["p50_ms"] / old["p50_ms"] if old["p50_ms"] > 0 else float("inf")
+            memory_ratio = r["peak_mb"] / old["peak_mb"] if old["peak_mb"] > 0.1 else 1.0
+            regressed = (ratio > threshold and r["p50_ms"] - old["p50_ms"] > min_ms) or memory_ratio > threshold
+            regressions += regressed
+            print(f"{case:<12}{name:<12}{old['p50_ms']:>10.3f}{r['p50_ms']:>11.3f}{ratio:>7.2f}"
+                  f"{memory_ratio:>8.2f}{'  регрессия' if regressed else ''}")
+    return regressions
+
+# Запуск всех замеров; возвращает результаты вместе с описанием окружения и параметров
+def run(sizes, box_counts, scale_factor, runs, use_tk=True, use_qt=True):
+    # Декодер выбирается без фонового замера, чтобы поток замера не мешал измерениям
+    registry.benchmark = False
+    tk_root = open_tk() if use_tk else None
+    qt_window = open_qt() if use_qt else None
+    results = {}
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            for size in sizes:
+                width, height = FRAME_SIZES[size]
+                for boxes in box_counts:
+                    frame_path, annotation_path, store = make_case(directory, width, height, boxes)
+                    case = f"{size}/{boxes}"
+                    print(f"Замер {case}...")
+                    results[case] = bench_case(frame_path, annotation_path, store, scale_factor, runs,
+                                               tk_root, qt_window)
+    finally:
+        if tk_root is not None:
+            tk_root.destroy()
+        if qt_window is not None:
+            qt_window.close()
+    return {"environment": environment(),
+            "config": {"sizes": sizes, "boxes": box_counts, "scale": scale_factor, "runs": runs},
+            "results": results}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Замеры горячих путей просмотрщика на синтетических кадрах")
+    parser.add_argument("--sizes", default="HD,4K,8K", help="размеры кадров через запятую: HD, 4K, 8K")
+    parser.add_argument("--boxes", default="10,100,1000,5000", help="числа боксов через запятую")
+    parser.add_argument("--scale", type=float, default=0.5, help="масштаб показа")
+    parser.add_argument("--runs", type=int, default=20, help="число замеров каждой операции")
+    parser.add_argument("--output", help="файл JSON для сохранения результатов")
+    parser.add_argument("--compare", help="файл JSON прежнего запуска для сравнения")
+    parser.add_argument("--threshold", type=float, default=1.2,
+                        help="во сколько раз замедление или рост памяти считается регрессией")
+    parser.add_argument("--min-ms", type=float, default=0.05, help="наименьшее замедление медианы в мс для регрессии")
+    parser.add_argument("--no-tk", action="store_true", help="не замерять вывод в Tk")
+    parser.add_argument("--no-qt", action="store_true", help="не замерять PyQt-инструмент")
+    args = parser.parse_args()
+    sizes = [size.strip() for size in args.sizes.split(",")]
+    unknown = [size for size in sizes if size not in FRAME_SIZES]
+    if unknown:
+        parser.error(f"неизвестные размеры кадров: {', '.join(unknown)}")
+    box_counts = [int(count) for count in args.boxes.split(",")]
+    report = run(sizes, box_counts, args.scale, args.runs, not args.no_tk, not args.no_qt)
+    print_results(report["results"])
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"Результаты сохранены: {args.output}")
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            previous = json.load(f)
+        if compare(previous, report, args.threshold, args.min_ms):
+            sys.exit(1)
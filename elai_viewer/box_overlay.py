@@ -0,0 +1,166 @@
+# Импорт цвета бокса по умолчанию
+from frame_io import DEFAULT_BOX_COLOR
+
+# Половина стороны квадратного маркера угла бокса в экранных пикселях
+HANDLE_HALF_SIZE = 4
+
+#================================================================
+# Функция перевода цвета OpenCV (B, G, R) в строку цвета Tk "#rrggbb".
+#================================================================
+def tk_color(bgr):
+    b, g, r = bgr
+    return f"#{r:02x}{g:02x}{b:02x}"
+
+#================================================================
+# Класс векторного слоя боксов поверх изображения на canvas.
+# Боксы, подписи классов и маркеры углов - элементы tk.Canvas,
+# поэтому правка бокса меняет только координаты его элементов,
+# а растровое изображение под ними не перерисовывается.
+# Элементы хранятся в списке в порядке боксов хранилища; элементы
+# каждого класса помечены тегом класса, поэтому скрытие класса -
+# одна смена состояния элементов тега без пересоздания слоя.
+#================================================================
+class BoxOverlay:
+    # Тег canvas для всех элементов слоя
+    TAG = "overlay"
+    # Префикс тегов классов боксов
+    CLASS_TAG_PREFIX = "overlay_class:"
+    # Тег маркеров углов подсвеченного бокса
+    HANDLE_TAG = "overlay_handle"
+    # Тег рамки создаваемого бокса
+    PREVIEW_TAG = "overlay_preview"
+
+    # Инициализация с canvas, словарём цветов классов (BGR) и множеством скрытых классов
+    def __init__(self, canvas, class_colors, hidden_classes=None):
+        # Canvas Tkinter, на котором размещаются элементы
+        self.canvas = canvas
+        # Словарь цветов классов (как для cv2.rectangle)
+        self.class_colors = class_colors
+        # Скрытые классы (общее множество; после его изменения вызывается set_class_visible)
+        self.hidden_classes = hidden_classes if hidden_classes is not None else set()
+        # Элементы боксов: [id прямоугольника, id подписи] в порядке хранилища
+        self.items = []
+        # Масштаб и положение левого верхнего угла изображения на canvas
+        self.scale_factor = 1.0
+        self.origin = (0, 0)
+
+    #================================================================
+    # Функция построения слоя для всех боксов хранилища (при смене
+    # кадра или масштаба). Прежние элементы удаляются.
+    #================================================================
+    def set_boxes(self, store, scale_factor, origin):
+        self.clear()
+        self.scale_factor = scale_factor
+        self.origin = origin
+        for index, (class_name, x1, y1, x2, y2) in enumerate(store):
+            self.insert(index, class_name, (x1, y1, x2, y2))
+
+    # Удаление всех элементов слоя
+    def clear(self):
+        self.canvas.delete(self.TAG)
+        self.items = []
+
+    #================================================================
+    # Функция добавления элементов бокса на позицию index
+    # (box - координаты в пикселях исходного изображения).
+    #================================================================
+    def insert(self, index, class_name, box):
+        x1, y1, x2, y2 = self._to_canvas(box)
+        color = tk_color(self.class_colors.get(class_name, DEFAULT_BOX_COLOR))
+        width, font_px, text_offset = self._style()
+        tags = (self.TAG, self._class_tag(class_name))
+        state = "hidden" if class_name in self.hidden_classes else "normal"
+        rect = self.canvas.create_rectangle(x1, y1, x2, y2, outline=color, width=width, tags=tags, state=state)
+        text = self.canvas.create_text(x1, y1 - text_offset, text=class_name, anchor="sw", fill=color,
+                                       font=("Helvetica", -font_px), tags=tags, state=state)
+        self.items.insert(index, [rect, text])
+
+    # Изменение координат бокса: перемещаются только его прямоугольник и подпись
+    def update_box(self, index, box):
+        x1, y1, x2, y2 = self._to_canvas(box)
+        rect, text = self.items[index]
+        self.canvas.coords(rect, x1, y1, x2, y2)
+        self.canvas.coords(text, x1, y1 - self._style()[2])
+
+    # Изменение класса бокса: подпись и цвет
+    def set_class(self, index, class_name):
+        rect, text = self.items[index]
+        color = tk_color(self.class_colors.get(class_name, DEFAULT_BOX_COLOR))
+        state = "hidden" if class_name in self.hidden_classes else "normal"
+        self.canvas.itemconfigure(rect, outline=color, state=state)
+        self.canvas.itemconfigure(text, text=class_name, fill=color, state=state)
+        # Перенос элементов под тег нового класса
+        for item in (rect, text):
+            for tag in self.canvas.gettags(item):
+                if tag.startswith(self.CLASS_TAG_PREFIX):
+                    self.canvas.dtag(item, tag)
+            self.canvas.addtag_withtag(self._class_tag(class_name), item)
+
+    # Показ или скрытие элементов всех боксов класса class_name
+    def set_class_visible(self, class_name, visible):
+        self.canvas.itemconfigure(self._class_tag(class_name), state="normal" if visible else "hidden")
+
+    # Удаление элементов бокса; следующие боксы сдвигаются, как в хранилище
+    def remove(self, index):
+        for item in self.items.pop(index):
+            self.canvas.delete(item)
+
+    # Сдвиг всего слоя при перемещении изображения на canvas
+    def set_origin(self, origin):
+        dx, dy = origin[0] - self.origin[0], origin[1] - self.origin[1]
+        if dx or dy:
+            self.canvas.move(self.TAG, dx, dy)
+        self.origin = origin
+
+    #================================================================
+    # Функция показа маркеров углов бокса rect (экранные координаты
+    # относительно изображения) или их скрытия (rect = None).
+    #================================================================
+    def show_handles(self, rect):
+        self.canvas.delete(self.HANDLE_TAG)
+        if rect is None:
+            return
+        x1, y1, x2, y2 = rect
+        h = HANDLE_HALF_SIZE
+        for x, y in ((x1, y1), (x2, y1), (x1, y2), (x2, y2)):
+            x += self.origin[0]
+            y += self.origin[1]
+            self.canvas.create_rectangle(x - h, y - h, x + h, y + h, outline="white", fill="black",
+                                         tags=(self.TAG, self.HANDLE_TAG))
+
+    #================================================================
+    # Функция показа рамки создаваемого бокса (box - координаты
+    # исходного изображения) или её скрытия (box = None).
+    #================================================================
+    def preview(self, box):
+        items = self.canvas.find_withtag(self.PREVIEW_TAG)
+        if box is None:
+            self.canvas.delete(self.PREVIEW_TAG)
+            return
+        x1, y1, x2, y2 = self._to_canvas(box)
+        if items:
+            self.canvas.coords(items[0], x1, y1, x2, y2)
+        else:
+            self.canvas.create_rectangle(x1, y1, x2, y2, outline=tk_color(DEFAULT_BOX_COLOR),
+                                         width=self._style()[0], tags=(self.TAG, self.PREVIEW_TAG))
+
+    # Подъём слоя над изображением (после создания новых элементов-плиток)
+    def raise_(self):
+        self.canvas.tag_raise(self.TAG)
+
+    # Тег элементов боксов класса (имена классов не содержат пробелов - это разделитель файла аннотаций)
+    def _class_tag(self, class_name):
+        return self.CLASS_TAG_PREFIX + class_name
+
+    # Перевод бокса из координат исходного изображения в координаты canvas
+    def _to_canvas(self, box):
+        s = self.scale_factor
+        ox, oy = self.origin
+        x1, y1, x2, y2 = box
+        return int(x1 * s) + ox, int(y1 * s) + oy, int(x2 * s) + ox, int(y2 * s) + oy
+
+    # Толщина линии, размер шрифта и отступ подписи при текущем масштабе
+    # (как у cv2.rectangle/putText в исходном размере после масштабирования)
+    def _style(self):
+        s = self.scale_factor
+        return max(1, int(round(2 * s))), max(6, int(round(12 * s))), int(round(10 * s))
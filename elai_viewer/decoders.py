@@ -0,0 +1,193 @@
+# Импорт модуля взаимодействия с ОС для работы с путями
+import os
+# Импорт модуля математических функций для выбора коэффициента уменьшения
+import math
+# Импорт модуля времени для замеров скорости декодеров
+import time
+# Импорт модуля потоков для фонового замера скорости декодеров
+import threading
+# Импорт библиотеки NumPy для чтения файла в буфер (работает с кириллицей в путях)
+import numpy as np
+
+# Импорт профилировщика горячих путей (замер декодирования)
+from perf import profiler
+# Импорт отложенной загрузки тяжёлых модулей (OpenCV, PIL загружаются при первом использовании)
+from lazy_import import lazy_import
+# Импорт журнала просмотрщика
+from logs import get_logger
+
+# Журнал модуля
+log = get_logger("decoders")
+
+# Библиотека OpenCV для декодирования и приведения размера
+cv2 = lazy_import("cv2")
+# Библиотека PIL для чтения размера из заголовка и уменьшенного декодирования JPEG
+Image = lazy_import("PIL.Image")
+
+# Расширения файлов JPEG (для них возможно уменьшенное декодирование по DCT)
+JPEG_EXTENSIONS = ('.jpg', '.jpeg')
+# Максимальное уменьшение при декодировании JPEG (1/8 - предел масштабирования DCT)
+MAX_REDUCTION = 8
+# Имена флагов OpenCV для уменьшенного декодирования (значения берутся из cv2 при декодировании)
+CV2_REDUCED_FLAGS = {1: "IMREAD_COLOR", 2: "IMREAD_REDUCED_COLOR_2",
+                     4: "IMREAD_REDUCED_COLOR_4", 8: "IMREAD_REDUCED_COLOR_8"}
+
+#================================================================
+# Декодеры кадров. Каждый декодер - функция decode(path, reduction, rgb),
+# возвращающая кадр H x W x 3 в порядке каналов RGB (rgb=True, порядок
+# для показа) или BGR (для OpenCV), уменьшенный примерно в reduction
+# раз (1, 2, 4, 8). Точный размер приводится реестром к W // reduction
+# x H // reduction - как у уровня пирамиды масштабов. Перестановка
+# каналов, если она нужна, выполняется на месте, без нового массива.
+#================================================================
+
+# Декодирование OpenCV из буфера файла (np.fromfile работает с кириллицей в путях)
+def decode_cv2(path, reduction, rgb=False):
+    image = cv2.imdecode(np.fromfile(path, dtype=np.uint8), getattr(cv2, CV2_REDUCED_FLAGS[reduction]))
+    if image is None:
+        raise OSError(f"не удалось декодировать изображение: {path}")
+    return cv2.cvtColor(image, cv2.COLOR_BGR2RGB, dst=image) if rgb else image
+
+# Декодирование PIL; для JPEG draft() включает уменьшенное декодирование по DCT
+def decode_pil(path, reduction, rgb=False):
+    with Image.open(path) as img:
+        if reduction > 1:
+            img.draft("RGB", (img.width // reduction, img.height // reduction))
+        image = np.array(img.convert("RGB"))
+    return image if rgb else cv2.cvtColor(image, cv2.COLOR_RGB2BGR, dst=image)
+
+# Декодер libjpeg-turbo (PyTurboJPEG), если библиотека установлена
+def _make_turbojpeg():
+    try:
+        from turbojpeg import TurboJPEG, TJPF_BGR, TJPF_RGB
+        jpeg = TurboJPEG()
+    # Нет модуля или не найдена разделяемая библиотека libturbojpeg
+    except (ImportError, OSError, RuntimeError):
+        return None
+
+    def decode_turbojpeg(path, reduction, rgb=False):
+        with open(path, "rb") as f:
+            data = f.read()
+        return jpeg.decode(data, pixel_format=TJPF_RGB if rgb else TJPF_BGR, scaling_factor=(1, reduction))
+    return decode_turbojpeg
+
+#================================================================
+# Функция выбора уменьшения при декодировании для масштаба показа.
+# При масштабе меньше 0.5 кадр декодируется уменьшенным в 2, 4 или 8
+# раз (не сильнее, чем нужно для масштаба), но так, чтобы меньшая
+# сторона осталась не меньше min_side.
+#================================================================
+def reduction_for_scale(scale_factor, size, min_side=1):
+    if scale_factor >= 0.5:
+        return 1
+    reduction = min(MAX_REDUCTION, 2 ** int(math.floor(math.log2(1.0 / scale_factor) + 1e-9)))
+    while reduction > 1 and min(size) // reduction < min_side:
+        reduction //= 2
+    return reduction
+
+# Размер изображения (ширина, высота) из заголовка файла без декодирования
+def image_size(path):
+    with Image.open(path) as img:
+        return img.size
+
+#================================================================
+# Класс реестра декодеров. Для каждого типа файлов (расширение и
+# полное/уменьшенное декодирование) выбирается самый быстрый декодер:
+# по первому файлу такого типа в фоновом потоке замеряются все
+# подходящие декодеры, до окончания замера работает первый из них.
+#================================================================
+class DecoderRegistry:
+    # Инициализация; benchmark - выбирать декодер замером, rounds - число замеров
+    def __init__(self, benchmark=True, rounds=3):
+        # Декодеры: имя -> (функция, расширения или None - любые)
+        self.decoders = {}
+        # Выбранный декодер: (расширение, уменьшенное ли) -> имя
+        self.choice = {}
+        # Типы файлов, для которых замер уже запущен
+        self.measured = set()
+        self.benchmark = benchmark
+        self.rounds = rounds
+        self.lock = threading.Lock()
+
+    # Регистрация декодера; extensions - поддерживаемые расширения (None - любые)
+    def register(self, name, decode, extensions=None):
+        self.decoders[name] = (decode, extensions)
+
+    # Имена декодеров, поддерживающих расширение ext (в порядке регистрации)
+    def candidates(self, ext):
+        return [name for name, (_, extensions) in self.decoders.items()
+                if extensions is None or ext in extensions]
+
+    #================================================================
+    # Функция декодирования кадра path с уменьшением reduction.
+    # size - размер исходного изображения (нужен при reduction > 1,
+    # иначе читается из заголовка). Возвращает кадр RGB (rgb=True) или BGR.
+    #================================================================
+    def decode(self, path, reduction=1, size=None, rgb=False):
+        ext = os.path.splitext(path)[1].lower()
+        key = (ext, reduction > 1)
+        with self.lock:
+            name = self.choice.get(key)
+            start_benchmark = name is None and self.benchmark and key not in self.measured
+            if start_benchmark:
+                self.measured.add(key)
+        if name is None:
+            name = self.candidates(ext)[0]
+        if start_benchmark:
+            threading.Thread(target=self._measure, args=(key, path, reduction, rgb), name="decoder-benchmark",
+                             daemon=True).start()
+        with profiler.stage("decode"):
+            image = self.decoders[name][0](path, reduction, rgb)
+        if reduction > 1:
+            width, height = size or image_size(path)
+            image = fit_to_size(image, (width // reduction, height // reduction))
+        return image
+
+    # Замер скорости подходящих декодеров на файле path и выбор самого быстрого
+    def _measure(self, key, path, reduction, rgb):
+        timings = {}
+        for name in self.candidates(key[0]):
+            decode = self.decoders[name][0]
+            try:
+                best = float("inf")
+                for _ in range(self.rounds):
+                    start = time.perf_counter()
+                    decode(path, reduction, rgb)
+                    best = min(best, time.perf_counter() - start)
+                timings[name] = best
+            # Декодер не справился с файлом - он не участвует в выборе
+            except Exception:
+                continue
+        if not timings:
+            return
+        name = min(timings, key=timings.get)
+        with self.lock:
+            self.choice[key] = name
+        log.info("Декодер для %s%s: %s (%.1f мс)", key[0], " (уменьшение)" if key[1] else "", name,
+                 timings[name] * 1000)
+
+#================================================================
+# Функция приведения уменьшенного кадра к точному размеру size
+# (ширина, высота). Уменьшенное декодирование округляет размер вверх -
+# лишний пиксель обрезается; если декодер не уменьшил кадр (не JPEG),
+# кадр уменьшается с усреднением.
+#================================================================
+def fit_to_size(image, size):
+    width, height = size
+    if image.shape[1] == width and image.shape[0] == height:
+        return image
+    if 0 <= image.shape[1] - width <= 1 and 0 <= image.shape[0] - height <= 1:
+        return np.ascontiguousarray(image[:height, :width])
+    return cv2.resize(image, (width, height), interpolation=cv2.INTER_AREA)
+
+# Общий реестр декодеров: OpenCV (по умолчанию), PIL и libjpeg-turbo, если установлен
+registry = DecoderRegistry()
+registry.register("cv2", decode_cv2)
+registry.register("pil", decode_pil)
+_turbojpeg = _make_turbojpeg()
+if _turbojpeg is not None:
+    registry.register("turbojpeg", _turbojpeg, JPEG_EXTENSIONS)
+
+# Декодирование кадра через общий реестр
+def decode_frame(path, reduction=1, size=None, rgb=False):
+    return registry.decode(path, reduction, size, rgb)
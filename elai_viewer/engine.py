@@ -0,0 +1,445 @@
+# Импорт модуля потоков для фонового построения индекса поиска кадров
+import threading
+# Импорт пула потоков для фонового построения пирамид масштабов
+from concurrent.futures import ThreadPoolExecutor
+# Импорт библиотеки NumPy для отбора боксов фокуса
+import numpy as np
+
+# Импорт двухуровневого LRU-кэша изображений с ограничением по памяти
+from image_cache import ImageCache
+# Импорт функций чтения аннотаций и отрисовки кадров
+from frame_io import (CLASS_COLORS, read_frame, read_annotations, annotation_name_for, annotation_path_for,
+                      draw_annotations, render_zoomed, dim_frame, dim_outside, focus_mask, display_color,
+                      DEFAULT_BOX_COLOR, ScratchBuffers)
+# Импорт пространственного индекса боксов для быстрого поиска под курсором
+from spatial_index import BoxGridIndex
+# Импорт столбцового хранилища аннотаций на NumPy
+from annotation_store import AnnotationStore
+# Импорт упакованного хранилища аннотаций (один файл, отображённый в память)
+from packed_store import PackedAnnotations
+# Импорт отложенной фоновой записи аннотаций
+from annotation_writer import AnnotationWriter
+# Импорт пирамиды масштабов кадра для быстрого масштабирования
+from pyramid import ImagePyramid, pyramid_cache_prefix
+# Импорт источников кадров (каталог изображений или видеофайл)
+from frame_source import open_frame_source
+# Импорт индекса поиска кадров по номеру, имени и времени
+from frame_index import FrameIndex
+# Импорт отложенной загрузки тяжёлых модулей
+from lazy_import import lazy_import
+
+# Библиотека OpenCV для рамки создаваемого бокса на кадре исходного размера
+cv2 = lazy_import("cv2")
+
+#================================================================
+# Ядро просмотрщика без графического интерфейса. Не импортирует Tk и
+# Qt, поэтому используется из любого интерфейса (ImageViewer на Tk,
+# MarkupToolWindow на PyQt), из фоновых процессов и замеров.
+#   FrameDocument - один кадр: пирамида масштабов, боксы и их
+#     пространственный индекс, правка боксов и отрисовка;
+#   ViewerEngine - просмотр каталога кадров или видео: источник
+#     кадров, список и поиск кадров, кэши, чтение и фоновая запись
+#     аннотаций, текущий кадр (FrameDocument).
+# Координаты боксов - в пикселях исходного кадра; масштаб показа
+# передаётся в функции отрисовки. Кадры хранятся в RGB.
+#================================================================
+
+#================================================================
+# Класс одного кадра с аннотациями. pyramid - пирамида масштабов кадра
+# (RGB), store - хранилище боксов (AnnotationStore), scratch - рабочие
+# буферы отрисовки (общие для кадров одного окна, чтобы не выделять
+# новые при смене кадра), hidden_classes - множество имён скрытых
+# классов (общее с ядром: изменяется на месте, кадр только перерисовывается).
+#================================================================
+class FrameDocument:
+    def __init__(self, pyramid, store=None, class_colors=None, scratch=None, hidden_classes=None):
+        # Пирамида масштабов кадра
+        self.pyramid = pyramid
+        # Цвета классов (BGR; на RGB-кадрах рисуются переставленными)
+        self.class_colors = class_colors if class_colors is not None else dict(CLASS_COLORS)
+        # Скрытые классы: их боксы не рисуются и не находятся под курсором
+        self.hidden_classes = hidden_classes if hidden_classes is not None else set()
+        # Пространственный индекс боксов
+        self.box_index = BoxGridIndex()
+        # Хранилище боксов (индекс строится в set_annotations)
+        self.set_annotations(store if store is not None else AnnotationStore())
+        # Рабочие буферы отрисовки экранного изображения (только главный поток)
+        self.scratch = scratch if scratch is not None else ScratchBuffers()
+
+    # Открытие кадра-изображения и (если указан и существует) файла его аннотаций
+    @classmethod
+    def open(cls, image_path, annotation_path=None, class_colors=None):
+        store = read_annotations(annotation_path) if annotation_path else None
+        return cls(ImagePyramid(read_frame(image_path, rgb=True)), store, class_colors)
+
+    # Замена боксов кадра с перестроением пространственного индекса
+    def set_annotations(self, store):
+        self.store = store
+        self.box_index.build(store.coords)
+
+    # Размер исходного кадра (ширина, высота)
+    @property
+    def size(self):
+        return self.pyramid.size
+
+    # Исходный кадр (RGB, только для чтения); после уменьшенного декодирования загружается при обращении
+    @property
+    def original_frame(self):
+        return self.pyramid.level(0)
+
+    #================================================================
+    # Поиск бокса и маркера редактирования в точке (x, y) исходного кадра.
+    # Возвращает (индекс, режим, угол, край) или None; боксы скрытых классов пропускаются.
+    #================================================================
+    def hit(self, x, y):
+        if not self.hidden_classes:
+            return self.box_index.handle_at(x, y)
+        return self.box_index.handle_at(x, y, exclude=lambda index: self.store.class_name(index)
+                                        in self.hidden_classes)
+
+    # Добавление бокса; возвращает его индекс
+    def add_box(self, class_name, x1, y1, x2, y2):
+        index = self.store.append(class_name, x1, y1, x2, y2)
+        self.box_index.insert(index, (x1, y1, x2, y2))
+        return index
+
+    # Изменение координат бокса; возвращает False, если координаты не изменились
+    def set_box(self, index, x1, y1, x2, y2):
+        if (x1, y1, x2, y2) == self.store.box(index):
+            return False
+        self.store.set_box(index, x1, y1, x2, y2)
+        self.box_index.update(index, (x1, y1, x2, y2))
+        return True
+
+    # Удаление бокса
+    def delete_box(self, index):
+        self.store.delete(index)
+        self.box_index.remove(index)
+
+    # Изменение класса бокса
+    def set_class(self, index, class_name):
+        self.store.set_class(index, class_name)
+
+    #================================================================
+    # Функция отрисовки кадра в масштабе scale_factor для показа:
+    # пересчёт из пирамиды, затемнение dim_alpha (кроме боксов focus,
+    # см. focus_rects), боксы (boxes=False - без боксов, например для
+    # векторного слоя) и рамка preview_box; coarse=True - черновой вид
+    # без загрузки исходного кадра.
+    # Возвращает PIL Image, ссылающийся на рабочие буферы документа
+    # (действителен до следующей отрисовки; только главный поток).
+    #================================================================
+    def render(self, scale_factor, dim_alpha=None, boxes=True, preview_box=None, coarse=False, focus=None):
+        return render_zoomed(self.pyramid, self.store if boxes else None, self.class_colors, scale_factor,
+                             dim_alpha, scratch=self.scratch, preview_box=preview_box, coarse=coarse,
+                             focus=focus, hidden=self.hidden_classes)
+
+    # Есть ли в памяти подробный уровень кадра для масштаба scale_factor
+    # (False - кадр декодирован уменьшенным, показ будет черновым)
+    def detailed_for(self, scale_factor):
+        return self.pyramid.detailed_for(scale_factor)
+
+    # Кадр исходного размера (RGB) с боксами и рамкой preview_box - источник плиток
+    def annotated_frame(self, boxes=True, preview_box=None):
+        frame = self.original_frame.copy()
+        if boxes:
+            draw_annotations(frame, self.store, self.class_colors, rgb=True, hidden=self.hidden_classes)
+        if preview_box is not None:
+            x1, y1, x2, y2 = preview_box
+            cv2.rectangle(frame, (x1, y1), (x2, y2), display_color(DEFAULT_BOX_COLOR), 2)
+        return frame
+
+    #================================================================
+    # Функция построения прямоугольников фокуса: боксы с индексами
+    # indices и все боксы классов class_names (кроме скрытых классов).
+    # Возвращает массив координат (N, 4) в пикселях исходного
+    # изображения; отбор по классам выполняется над массивом
+    # идентификаторов классов.
+    #================================================================
+    def focus_rects(self, indices=(), class_names=()):
+        selected = np.zeros(len(self.store), dtype=bool)
+        class_ids = self.class_ids(class_names)
+        if class_ids:
+            selected |= np.isin(self.store.class_ids, class_ids)
+        indices = [i for i in indices if 0 <= i < len(self.store)]
+        selected[indices] = True
+        hidden_ids = self.class_ids(self.hidden_classes)
+        if hidden_ids:
+            selected &= ~np.isin(self.store.class_ids, hidden_ids)
+        return self.store.coords[selected]
+
+    # Идентификаторы классов хранилища по именам (имена, которых нет в кадре, пропускаются)
+    def class_ids(self, class_names):
+        return [self.store.class_lookup[name] for name in class_names if name in self.store.class_lookup]
+
+    # Затемнённый кадр исходного размера (RGB) с боксами поверх затемнения (boxes=False - без боксов);
+    # focus - прямоугольники (N, 4), остающиеся незатемнёнными (см. focus_rects)
+    def dimmed_frame(self, transparency, boxes=True, focus=None):
+        if focus is None:
+            # Затемнение исходного кадра одной операцией
+            frame = dim_frame(self.original_frame, transparency)
+        else:
+            # Затемнение копии кадра вне боксов фокуса по маске
+            frame = self.original_frame.copy()
+            dim_outside(frame, focus_mask(frame.shape[:2], focus), transparency)
+        # Отрисовка всех боксов поверх затемнения
+        if not boxes:
+            return frame
+        return draw_annotations(frame, self.store, self.class_colors, rgb=True, hidden=self.hidden_classes)
+
+#================================================================
+# Класс ядра просмотра размеченных кадров. frames_dir - каталог с
+# кадрами или видеофайл, annotations_dir - каталог аннотаций;
+# остальные параметры - как у view_annotated_frames. Каталог кадров
+# сканируется в фоне: интерфейс периодически вызывает poll().
+#================================================================
+class ViewerEngine:
+    def __init__(self, frames_dir, annotations_dir, cache_limit_mb=512, packed_annotations=None,
+                 save_pyramids=False, listing_cache=False, frames_fps=None, class_colors=None):
+        # Путь к директории с кадрами (или к видеофайлу)
+        self.frames_dir = frames_dir
+        # Путь к директории с аннотациями
+        self.annotations_dir = annotations_dir
+        # Открытие упакованного хранилища аннотаций, если оно указано
+        self.packed = PackedAnnotations(packed_annotations) if packed_annotations else None
+        # Открытие источника кадров: каталог изображений .png, .jpg, .jpeg или видеофайл.
+        # Каталог сканируется в фоне, список кадров пополняется в poll
+        self.source = open_frame_source(frames_dir, listing_cache, frames_fps)
+        # Список имён кадров источника в естественном порядке (на старте может быть неполным)
+        self.image_files = self.source.names
+        # Индекс поиска кадров (строится в фоне по полному списку кадров)
+        self.frame_index = None
+        # Индекс текущего кадра
+        self.index = 0
+        # Цвета классов (BGR; на RGB-кадрах рисуются переставленными)
+        self.class_colors = class_colors if class_colors is not None else dict(CLASS_COLORS)
+        # Скрытые классы (общие для всех кадров; изменяются на месте через set_class_visible)
+        self.hidden_classes = set()
+        # Кэш изображений: исходные кадры, пирамиды, масштабированные изображения и аннотации
+        self.image_cache = ImageCache(memory_limit_mb=cache_limit_mb)
+        # Сохранение пирамид масштабов на диск рядом с кадрами
+        self.save_pyramids = save_pyramids
+        # Фоновый поток построения пирамид масштабов текущего кадра
+        self.pyramid_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="pyramid")
+        # Задачи потока пирамид (для отмены при закрытии)
+        self.pyramid_futures = set()
+        # Фоновая запись аннотаций (объединение правок, атомарная запись)
+        self.writer = AnnotationWriter()
+        # Рабочие буферы отрисовки экранного изображения, общие для всех кадров
+        self.scratch = ScratchBuffers()
+        # Текущий кадр (None - ещё не загружен)
+        self.document = None
+        # Имя загруженного кадра (для сброса очереди записи при смене кадра)
+        self.loaded_filename = None
+
+    # Количество известных кадров
+    def __len__(self):
+        return len(self.image_files)
+
+    # Имя текущего кадра
+    @property
+    def filename(self):
+        return self.image_files[self.index]
+
+    # Завершено ли сканирование списка кадров
+    @property
+    def complete(self):
+        return self.source.complete
+
+    # Путь к файлу кадра name (None - кадр не файл, например кадр видео)
+    def frame_path(self, name):
+        return self.source.path(name)
+
+    #================================================================
+    # Функция опроса фонового сканирования каталога кадров. Забирает
+    # новую версию списка и сохраняет позицию загруженного кадра (новые
+    # кадры могут оказаться перед ним). Возвращает True, если список изменился.
+    #================================================================
+    def poll(self):
+        if not self.source.poll():
+            return False
+        self.image_files = self.source.names
+        if self.loaded_filename is not None:
+            index = self.source.index_of(self.loaded_filename)
+            if index is not None:
+                self.index = index
+        return True
+
+    # Запуск фонового построения индекса поиска по текущему (полному) списку кадров
+    def build_frame_index(self):
+        names, fps = self.image_files, self.source.fps
+
+        def build():
+            self.frame_index = FrameIndex(names, fps)
+        threading.Thread(target=build, name="frame-index", daemon=True).start()
+
+    # Индекс поиска для текущего списка кадров (пока он строится - поиск перебором)
+    def current_frame_index(self):
+        index = self.frame_index
+        if index is not None and index.names is self.image_files:
+            return index
+        return FrameIndex(self.image_files, self.source.fps, indexed=False)
+
+    #================================================================
+    # Функция загрузки текущего кадра для показа в масштабе scale_factor:
+    # пирамида из кэша или декодирование (при масштабе меньше 0.5 -
+    # уменьшенное), аннотации из кэша или из файла. Делает загруженный
+    # кадр текущим документом и возвращает его. Ошибку чтения кадра
+    # пробрасывает вызывающему коду. preview_reduction > 1 - ещё не
+    # декодированный кадр читается уменьшенным не меньше чем в столько
+    # раз (быстрый черновой показ); подробный кадр загружает load_detail.
+    #================================================================
+    def load(self, scale_factor, preview_reduction=1):
+        filename = self.filename
+        # При смене кадра ожидающие правки записываются без задержки
+        if filename != self.loaded_filename:
+            self.writer.flush()
+            self.loaded_filename = filename
+        # Пирамида масштабов кадра из кэша; исходный кадр - её уровень 0
+        pyramid = self.image_cache.get_pyramid(filename)
+        if pyramid is None:
+            # Поиск декодированного исходного кадра в кэше
+            frame = self.image_cache.get_original(filename)
+            if frame is not None:
+                pyramid = self.make_pyramid(filename, frame)
+            else:
+                pyramid = self.load_pyramid(filename, min(scale_factor, 1.0 / preview_reduction))
+                # Сохранение исходного кадра в кэш, если он декодирован целиком
+                if pyramid.base_level == 0:
+                    self.image_cache.put_original(filename, pyramid.levels[0])
+            # При первом показе уровни пирамиды строятся в фоне
+            self.image_cache.put_pyramid(filename, pyramid)
+            self.submit_pyramid(pyramid.build)
+        # Разобранные аннотации из кэша (копия хранилища для редактирования) или из файла
+        store = self.image_cache.get_annotations(filename)
+        if store is None:
+            store = self.read_frame_annotations(filename)
+            self.image_cache.put_annotations(filename, store)
+        self.document = FrameDocument(pyramid, store, self.class_colors, self.scratch, self.hidden_classes)
+        return self.document
+
+    #================================================================
+    # Функция фоновой загрузки подробного кадра после чернового показа:
+    # исходный кадр документа декодируется в потоке пирамид. Возвращает
+    # future; по его завершении исходный кадр сохраняется в кэш
+    # (put_detail) и кадр показывается полностью.
+    #================================================================
+    def load_detail(self, document):
+        return self.submit_pyramid(document.pyramid.level, 0)
+
+    # Постановка задачи в поток пирамид с учётом для отмены при закрытии
+    def submit_pyramid(self, fn, *args):
+        future = self.pyramid_executor.submit(fn, *args)
+        self.pyramid_futures.add(future)
+        future.add_done_callback(self.pyramid_futures.discard)
+        return future
+
+    # Сохранение загруженного подробного кадра в кэш (главный поток)
+    def put_detail(self, filename, document):
+        if document.pyramid.levels[0] is not None:
+            self.image_cache.put_original(filename, document.pyramid.levels[0])
+
+    #================================================================
+    # Функция создания пирамиды масштабов кадра. При включённом
+    # сохранении уровни читаются с диска и записываются рядом с кадрами.
+    # Вызывается и из фоновых потоков предзагрузки.
+    #================================================================
+    def make_pyramid(self, filename, frame, base_level=0, size=None):
+        # Исходный кадр пирамиды из уменьшенного декодирования читается только по запросу
+        load_full = lambda: self.source.read(filename)
+        if not self.save_pyramids:
+            return ImagePyramid(frame, base_level=base_level, size=size, load_full=load_full)
+        return ImagePyramid(frame, pyramid_cache_prefix(self.source.cache_dir, filename),
+                            self.source.mtime(filename), base_level, size, load_full)
+
+    #================================================================
+    # Функция чтения кадра в пирамиду масштабов для показа в масштабе
+    # scale_factor: при масштабе меньше 0.5 кадр декодируется уменьшенным
+    # в 2-8 раз и становится уровнем пирамиды с этим уменьшением.
+    # Вызывается и из фоновых потоков предзагрузки (кэш не трогает).
+    #================================================================
+    def load_pyramid(self, filename, scale_factor):
+        frame, reduction, size = self.source.read_reduced(filename, scale_factor, ImagePyramid.MIN_SIDE)
+        return self.make_pyramid(filename, frame, reduction.bit_length() - 1, size)
+
+    #================================================================
+    # Функция чтения аннотаций кадра. Сначала ищет кадр в упакованном
+    # хранилище (без обращения к файловой системе), затем - в .txt-файле.
+    # Ещё не записанные правки берутся из очереди фоновой записи.
+    # Вызывается и из фоновых потоков предзагрузки.
+    #================================================================
+    def read_frame_annotations(self, filename):
+        annotation_path = annotation_path_for(self.annotations_dir, filename)
+        store = self.writer.get_pending(annotation_path)
+        if store is not None:
+            return store
+        if self.packed is not None:
+            store = self.packed.get(annotation_name_for(filename))
+            if store is not None:
+                return store
+        return read_annotations(annotation_path)
+
+    # Снимок скрытых классов - часть ключа кэша изображений с боксами
+    @property
+    def class_filter(self):
+        return frozenset(self.hidden_classes)
+
+    #================================================================
+    # Функция показа или скрытия класса class_name во всех кадрах.
+    # Кадры не перечитываются: изображения с прежним набором скрытых
+    # классов остаются в кэше под своим ключом, новое изображение
+    # собирается из пирамиды и боксов из памяти.
+    #================================================================
+    def set_class_visible(self, class_name, visible):
+        if visible:
+            self.hidden_classes.discard(class_name)
+        else:
+            self.hidden_classes.add(class_name)
+
+    # Известные классы: классы с заданным цветом и классы боксов текущего кадра (в порядке появления)
+    def known_classes(self):
+        names = list(self.class_colors)
+        if self.document is not None:
+            names += [name for name in self.document.store.classes if name not in self.class_colors]
+        return names
+
+    # Сброс кэшированных изображений текущего кадра с устаревшими боксами
+    def invalidate_renders(self):
+        self.image_cache.invalidate_renders(self.filename)
+
+    #================================================================
+    # Функция сохранения боксов текущего кадра: постановка файла
+    # аннотации в очередь фоновой записи, обновление упакованного
+    # хранилища и кэша аннотаций, сброс изображений с прежними боксами.
+    #================================================================
+    def save_annotations(self):
+        filename = self.filename
+        store = self.document.store
+        # Постановка файла аннотации в очередь фоновой записи (атомарно, без блокировки интерфейса)
+        self.writer.submit(annotation_path_for(self.annotations_dir, filename), store)
+        # Обновление кадра в упакованном хранилище (в файл - при закрытии)
+        if self.packed is not None:
+            self.packed.put(annotation_name_for(filename), store)
+        self.image_cache.put_annotations(filename, store)
+        self.image_cache.invalidate_renders(filename)
+
+    #================================================================
+    # Функция завершения работы: остановка фоновых потоков, закрытие
+    # источника кадров, запись ожидающих правок. Возвращает словарь
+    # путь -> ошибка для аннотаций, которые не удалось записать.
+    #================================================================
+    def close(self):
+        # Остановка фонового построения пирамид
+        # (ожидающие задачи отменяются явно: cancel_futures требует Python 3.9)
+        for future in list(self.pyramid_futures):
+            future.cancel()
+        self.pyramid_executor.shutdown(wait=False)
+        # Закрытие источника кадров (остановка чтения видео вперёд)
+        self.source.close()
+        # Запись всех ожидающих правок аннотаций перед выходом
+        self.writer.close()
+        # Запись правок в упакованное хранилище аннотаций и его закрытие
+        if self.packed is not None:
+            self.packed.flush()
+            self.packed.close()
+        return dict(self.writer.failed)
@@ -0,0 +1,193 @@
+# Импорт библиотеки Tkinter для ленты миниатюр
+import tkinter as tk
+
+# Импорт LRU-кэша с ограничением по памяти (изображения миниатюр Tk)
+from image_cache import LRUCache
+# Импорт размера миниатюр
+from thumbnails import THUMBNAIL_SIDE
+# Импорт журнала просмотрщика
+from logs import get_logger
+# Импорт отложенной загрузки тяжёлых модулей (PIL загружается при первой миниатюре)
+from lazy_import import lazy_import
+
+# Журнал модуля
+log = get_logger("filmstrip")
+# Библиотека PIL для чтения файлов миниатюр JPEG и передачи их в Tk
+Image = lazy_import("PIL.Image")
+ImageTk = lazy_import("PIL.ImageTk")
+
+#================================================================
+# Класс ленты миниатюр кадров под областью изображения. Лента
+# виртуальная: canvas прокручивается на всю длину списка кадров, но
+# элементы (миниатюра и номер) создаются только для видимых ячеек и
+# удаляются, когда ячейка уходит из вида, поэтому лента на сотни
+# тысяч кадров стоит столько же, сколько на десяток. Миниатюры видимых
+# ячеек берутся из памяти, из кэша на диске или строятся в пуле
+# процессов (ThumbnailCache); готовые миниатюры забираются опросом
+# через after(). Щелчок по ячейке вызывает on_select(индекс кадра).
+#================================================================
+class Filmstrip:
+    # Отступ вокруг миниатюры и высота подписи в пикселях
+    PADDING = 6
+    LABEL_HEIGHT = 14
+
+    # frame_path(имя) - путь к файлу кадра (None - кадр не файл, например кадр видео)
+    def __init__(self, master, parent, thumbnails, frame_path, on_select, poll_interval_ms=50,
+                 memory_limit_mb=32):
+        self.master = master
+        self.thumbnails = thumbnails
+        self.frame_path = frame_path
+        self.on_select = on_select
+        self.poll_interval_ms = poll_interval_ms
+        # Размер ячейки ленты
+        self.cell_width = THUMBNAIL_SIDE + 2 * self.PADDING
+        self.cell_height = THUMBNAIL_SIDE + self.LABEL_HEIGHT + 2 * self.PADDING
+        # Canvas ленты с горизонтальной прокруткой
+        self.canvas = tk.Canvas(parent, height=self.cell_height, bg="#202020", highlightthickness=0,
+                                xscrollincrement=self.cell_width)
+        self.scrollbar = tk.Scrollbar(parent, orient=tk.HORIZONTAL, command=self.scroll)
+        self.canvas.configure(xscrollcommand=self.scrollbar.set)
+        self.scrollbar.pack(side=tk.BOTTOM, fill=tk.X)
+        self.canvas.pack(side=tk.TOP, fill=tk.X)
+        # Рамка текущего кадра
+        self.current_id = self.canvas.create_rectangle(0, 0, 0, 0, outline="#FFD700", width=2, state="hidden")
+        # Список имён кадров и индекс текущего кадра
+        self.names = []
+        self.current = None
+        # Созданные ячейки: индекс кадра -> (элемент миниатюры, элемент подписи)
+        self.cells = {}
+        # Пути к файлам кадров видимых ячеек -> индекс (для раздачи готовых миниатюр)
+        self.visible_paths = {}
+        # Изображения Tk миниатюр: путь к файлу кадра -> PhotoImage
+        self.photos = LRUCache(memory_limit_mb * 1024 * 1024, name="thumbnails")
+        # Миниатюры созданных ячеек: индекс -> PhotoImage (вытеснение из кэша не стирает видимую миниатюру)
+        self.cell_photos = {}
+        # Идентификатор запланированного опроса построенных миниатюр
+        self.poll_id = None
+        self.canvas.bind("<Configure>", lambda event: self.refresh())
+        self.canvas.bind("<Button-1>", self.on_click)
+        self.canvas.bind("<MouseWheel>", self.on_mouse_wheel)
+
+    # Замена списка кадров (фоновое сканирование нашло новые кадры)
+    def set_names(self, names):
+        self.names = names
+        # Номера ячеек сдвигаются - все ячейки пересоздаются
+        for image_id, text_id in self.cells.values():
+            self.canvas.delete(image_id, text_id)
+        self.cells.clear()
+        self.cell_photos.clear()
+        self.canvas.configure(scrollregion=(0, 0, len(names) * self.cell_width, self.cell_height))
+        self.refresh()
+
+    #================================================================
+    # Функция выделения текущего кадра index: рамка вокруг ячейки и
+    # прокрутка, если ячейка вне видимой области (она ставится в центр).
+    #================================================================
+    def set_current(self, index):
+        self.current = index
+        x = index * self.cell_width
+        self.canvas.coords(self.current_id, x + 1, 1, x + self.cell_width - 1, self.cell_height - 1)
+        self.canvas.itemconfigure(self.current_id, state="normal")
+        first, last = self.visible_range()
+        if not first <= index < last and self.names:
+            width = self.canvas.winfo_width()
+            left = max(0, x - (width - self.cell_width) / 2)
+            self.canvas.xview_moveto(left / (len(self.names) * self.cell_width))
+        self.refresh()
+
+    # Диапазон индексов видимых ячеек [first, last)
+    def visible_range(self):
+        left = self.canvas.canvasx(0)
+        width = self.canvas.winfo_width()
+        first = max(0, int(left // self.cell_width))
+        last = min(len(self.names), int((left + width) // self.cell_width) + 1)
+        return first, last
+
+    #================================================================
+    # Функция обновления видимых ячеек: удаление ушедших из вида,
+    # создание появившихся, запрос их миниатюр и отмена построения
+    # миниатюр ячеек, которые больше не видны.
+    #================================================================
+    def refresh(self):
+        first, last = self.visible_range()
+        for index in [i for i in self.cells if not first <= i < last]:
+            self.canvas.delete(*self.cells.pop(index))
+            self.cell_photos.pop(index, None)
+        self.visible_paths = {}
+        for index in range(first, last):
+            path = self.frame_path(self.names[index])
+            if path is not None:
+                self.visible_paths[path] = index
+            if index not in self.cells:
+                self.cells[index] = self.create_cell(index, path)
+        self.canvas.tag_raise(self.current_id)
+        if self.thumbnails is not None:
+            self.thumbnails.cancel_except(self.visible_paths)
+            if self.thumbnails.pending and self.poll_id is None:
+                self.poll_id = self.master.after(self.poll_interval_ms, self._poll)
+
+    # Создание элементов ячейки index: миниатюра (если уже есть) и номер кадра
+    def create_cell(self, index, path):
+        x = index * self.cell_width + self.cell_width // 2
+        image_id = self.canvas.create_image(x, self.PADDING + THUMBNAIL_SIDE // 2, anchor="center")
+        text_id = self.canvas.create_text(x, self.cell_height - self.PADDING - self.LABEL_HEIGHT // 2,
+                                          text=str(index + 1), fill="#C0C0C0", font=("TkDefaultFont", 8))
+        if path is not None and self.thumbnails is not None:
+            photo = self.photos.get(path)
+            if photo is None:
+                thumbnail = self.thumbnails.request(path)
+                if thumbnail is not None:
+                    photo = self.load_photo(path, thumbnail)
+            if photo is not None:
+                self.canvas.itemconfigure(image_id, image=photo)
+                self.cell_photos[index] = photo
+        return image_id, text_id
+
+    # Чтение файла миниатюры в изображение Tk и сохранение в памяти
+    def load_photo(self, path, thumbnail):
+        try:
+            with Image.open(thumbnail) as img:
+                photo = ImageTk.PhotoImage(img, master=self.canvas)
+        except OSError as e:
+            log.warning("Ошибка чтения миниатюры %s: %s", thumbnail, e)
+            return None
+        self.photos.put(path, photo)
+        return photo
+
+    # Опрос построенных миниатюр и вывод их в видимые ячейки
+    def _poll(self):
+        self.poll_id = None
+        for path, thumbnail in self.thumbnails.done():
+            index = self.visible_paths.get(path)
+            photo = self.load_photo(path, thumbnail)
+            if index is not None and index in self.cells and photo is not None:
+                self.canvas.itemconfigure(self.cells[index][0], image=photo)
+                self.cell_photos[index] = photo
+        if self.thumbnails.pending:
+            self.poll_id = self.master.after(self.poll_interval_ms, self._poll)
+
+    # Прокрутка полосой прокрутки
+    def scroll(self, *args):
+        self.canvas.xview(*args)
+        self.refresh()
+
+    # Прокрутка колесом мыши
+    def on_mouse_wheel(self, event):
+        self.scroll("scroll", -1 if event.delta > 0 else 1, "units")
+
+    # Переход к кадру по щелчку на ячейке
+    def on_click(self, event):
+        index = int(self.canvas.canvasx(event.x) // self.cell_width)
+        if 0 <= index < len(self.names):
+            self.on_select(index)
+
+    # Остановка опроса и пула построения миниатюр
+    def close(self):
+        if self.poll_id is not None:
+            try:
+                self.master.after_cancel(self.poll_id)
+            except tk.TclError:
+                pass
+            self.poll_id = None
+        if self.thumbnails is not None:
+            self.thumbnails.close()
@@ -0,0 +1,242 @@
+# Импорт модуля регулярных выражений для разбора номеров кадров и меток времени
+import re
+# Импорт модуля двоичного поиска для поиска по префиксу
+import bisect
+# Импорт библиотеки NumPy для построения и хранения списков позиций n-грамм
+import numpy as np
+
+# Длина n-грамм индекса подстрок
+NGRAM = 3
+# Номер кадра по числу в имени: "#123"
+FRAME_NUMBER_PATTERN = re.compile(r"^#\s*(\d+)$")
+# Метка времени: "ММ:СС", "ЧЧ:ММ:СС", с необязательными долями секунды ("1:02:03.5")
+TIMESTAMP_PATTERN = re.compile(r"^(?:(\d+):)?(\d{1,2}):(\d{1,2}(?:\.\d+)?)$")
+# Последнее число в имени кадра
+LAST_NUMBER = re.compile(r"(\d+)(?!.*\d)")
+
+#================================================================
+# Класс индекса поиска кадров по вводу пользователя. Строится один
+# раз для полного списка имён кадров (в фоновом потоке) и отвечает
+# без перебора всего списка:
+#   - точное имя - словарь имя -> позиция;
+#   - префикс - двоичный поиск в отсортированных именах в нижнем регистре;
+#   - подстрока - пересечение списков позиций n-грамм запроса
+#     с проверкой найденных кандидатов;
+#   - "#N" - кадр, последнее число в имени которого равно N
+#     (без учёта ведущих нулей: "#123" находит frame_000123.jpg);
+#   - "ЧЧ:ММ:СС" - кадр по времени от начала при известной частоте кадров.
+# Позиции - номера в списке names (с 0). При indexed=False структуры
+# не строятся и поиск идёт перебором (пока полный индекс строится в фоне).
+#================================================================
+class FrameIndex:
+    # Построение индекса по списку имён кадров; fps - частота кадров (None - неизвестна)
+    def __init__(self, names, fps=None, indexed=True):
+        # Список имён кадров, по которому построен индекс
+        self.names = names
+        # Частота кадров для перехода по времени
+        self.fps = fps
+        # Построены ли структуры индекса
+        self.indexed = indexed
+        # Имена в нижнем регистре (в порядке кадров)
+        self.lowered = [name.lower() for name in names] if indexed else None
+        if not indexed:
+            return
+        # Точное имя -> позиция; имя в нижнем регистре -> первая позиция
+        self.exact = {name: i for i, name in enumerate(names)}
+        self.exact_lower = {}
+        for i, name in enumerate(self.lowered):
+            self.exact_lower.setdefault(name, i)
+        # Имена в нижнем регистре по алфавиту и их позиции (для поиска по префиксу)
+        order = sorted(range(len(names)), key=self.lowered.__getitem__)
+        self.sorted_names = [self.lowered[i] for i in order]
+        self.sorted_positions = np.array(order, dtype=np.int32)
+        # Последнее число в имени -> первая позиция
+        self.numbers = {}
+        for i, name in enumerate(self.lowered):
+            match = LAST_NUMBER.search(name)
+            if match:
+                self.numbers.setdefault(int(match.group(1)), i)
+        self._build_ngrams()
+
+    #================================================================
+    # Функция построения индекса n-грамм без циклов Python по именам.
+    # Символы имён заменяются номерами в алфавите имён, n-грамма - число
+    # в системе счисления с основанием размера алфавита. Пары (n-грамма,
+    # позиция) упаковываются в одно int64 и сортируются: получаются
+    # возрастающие списки позиций каждой n-граммы подряд в одном массиве.
+    #================================================================
+    def _build_ngrams(self):
+        # Алфавит имён: символ -> номер с 1 (0 - заполнение коротких имён)
+        self.alphabet = {char: code for code, char in enumerate(sorted(set("".join(self.lowered))), 1)}
+        self.gram_base = base = len(self.alphabet) + 1
+        # Слишком большой алфавит: коды n-грамм не помещаются в 31 бит - подстроки ищутся перебором
+        if base ** NGRAM >= 2 ** 31:
+            self.gram_codes = None
+            return
+        keys = []
+        if self.lowered and max(map(len, self.lowered)) >= NGRAM:
+            # Матрица кодов символов: имя - строка, дополненная нулями
+            chars = np.array(self.lowered).view(np.uint32).reshape(len(self.lowered), -1)
+            lookup = np.zeros(max(map(ord, self.alphabet)) + 1, dtype=np.int64)
+            lookup[[ord(char) for char in self.alphabet]] = list(self.alphabet.values())
+            codes = lookup[chars]
+            positions = np.arange(len(self.lowered), dtype=np.int64)
+            for j in range(codes.shape[1] - NGRAM + 1):
+                window = codes[:, j:j + NGRAM]
+                valid = window[:, -1] != 0
+                gram = window[valid, 0]
+                for t in range(1, NGRAM):
+                    gram = gram * base + window[valid, t]
+                keys.append((gram << 32) | positions[valid])
+        # Сортировка и удаление повторов n-граммы в одном имени
+        keys = np.concatenate(keys) if keys else np.zeros(0, dtype=np.int64)
+        keys.sort()
+        keys = keys[np.concatenate(([True], keys[1:] != keys[:-1]))] if len(keys) else keys
+        grams = keys >> 32
+        # Позиции имён подряд по n-граммам и начала списков каждой n-граммы
+        self.gram_positions = (keys & 0xFFFFFFFF).astype(np.int32)
+        self.gram_starts = np.flatnonzero(np.concatenate(([True], grams[1:] != grams[:-1]))) if len(grams) else grams
+        self.gram_codes = grams[self.gram_starts]
+
+    # Возрастающий массив позиций имён, содержащих n-грамму gram (None - ни одного)
+    def _postings(self, gram):
+        codes = [self.alphabet.get(char) for char in gram]
+        if None in codes:
+            return None
+        code = 0
+        for char_code in codes:
+            code = code * self.gram_base + char_code
+        k = np.searchsorted(self.gram_codes, code)
+        if k >= len(self.gram_codes) or self.gram_codes[k] != code:
+            return None
+        end = self.gram_starts[k + 1] if k + 1 < len(self.gram_starts) else len(self.gram_positions)
+        return self.gram_positions[self.gram_starts[k]:end]
+
+    # Количество кадров в индексе
+    def __len__(self):
+        return len(self.names)
+
+    #================================================================
+    # Функция поиска кадра по вводу пользователя. Возвращает позицию
+    # кадра или None. Число - номер кадра по порядку (с 1), затем
+    # "#N" и метка времени, затем точное имя и первый по порядку
+    # кадр, имя которого содержит введённую строку (без учёта регистра).
+    #================================================================
+    def lookup(self, text):
+        text = text.strip()
+        if not text:
+            return None
+        if text.isdigit():
+            number = int(text)
+            return number - 1 if 1 <= number <= len(self.names) else None
+        match = FRAME_NUMBER_PATTERN.match(text)
+        if match:
+            return self._find_number(int(match.group(1)))
+        match = TIMESTAMP_PATTERN.match(text)
+        if match and self.fps:
+            return self.position_for_time(match)
+        if not self.indexed:
+            return self._scan_name(text)
+        if text in self.exact:
+            return self.exact[text]
+        query = text.lower()
+        if query in self.exact_lower:
+            return self.exact_lower[query]
+        found = self.find(query, 1)
+        return found[0] if found else None
+
+    # Позиция первого кадра, последнее число в имени которого равно number
+    def _find_number(self, number):
+        if self.indexed:
+            return self.numbers.get(number)
+        for i, name in enumerate(self.names):
+            match = LAST_NUMBER.search(name)
+            if match and int(match.group(1)) == number:
+                return i
+        return None
+
+    # Поиск перебором: точное имя, затем первое имя с подстрокой без учёта регистра
+    def _scan_name(self, text):
+        if text in self.names:
+            return self.names.index(text)
+        query = text.lower()
+        first = None
+        for i, name in enumerate(self.names):
+            lowered = name.lower()
+            if lowered == query:
+                return i
+            if first is None and query in lowered:
+                first = i
+        return first
+
+    # Позиция кадра по разобранной метке времени (ближайший кадр, не дальше последнего)
+    def position_for_time(self, match):
+        hours, minutes, seconds = match.groups()
+        total = int(hours or 0) * 3600 + int(minutes) * 60 + float(seconds)
+        return min(int(round(total * self.fps)), len(self.names) - 1) if self.names else None
+
+    #================================================================
+    # Функция поиска первых limit кадров (в порядке кадров), имя
+    # которых содержит query (в нижнем регистре).
+    #================================================================
+    def find(self, query, limit):
+        if len(query) < NGRAM or self.gram_codes is None:
+            # Короткий запрос (или нет индекса n-грамм): перебор до первых limit совпадений
+            found = []
+            for i, name in enumerate(self.lowered):
+                if query in name:
+                    found.append(i)
+                    if len(found) >= limit:
+                        break
+            return found
+        candidates = self._candidates(query)
+        found = []
+        for i in candidates:
+            if query in self.lowered[i]:
+                found.append(int(i))
+                if len(found) >= limit:
+                    break
+        return found
+
+    #================================================================
+    # Функция отбора кандидатов для подстроки: позиции самой редкой
+    # n-граммы запроса, из которых двоичным поиском оставляются те,
+    # что есть в списках остальных n-грамм (от коротких к длинным).
+    #================================================================
+    def _candidates(self, query):
+        grams = {query[j:j + NGRAM] for j in range(len(query) - NGRAM + 1)}
+        lists = []
+        for gram in grams:
+            positions = self._postings(gram)
+            if positions is None:
+                return ()
+            lists.append(positions)
+        lists.sort(key=len)
+        candidates = lists[0]
+        for positions in lists[1:]:
+            if len(candidates) == 0:
+                break
+            found = np.minimum(np.searchsorted(positions, candidates), len(positions) - 1)
+            candidates = candidates[positions[found] == candidates]
+        return candidates
+
+    #================================================================
+    # Функция вариантов дополнения ввода: сначала имена, начинающиеся
+    # с text (по алфавиту), затем остальные имена, содержащие text
+    # (в порядке кадров). Возвращает до limit позиций.
+    #================================================================
+    def complete(self, text, limit=10):
+        query = text.strip().lower()
+        if not query or not self.indexed:
+            return []
+        start = bisect.bisect_left(self.sorted_names, query)
+        end = bisect.bisect_left(self.sorted_names, query + "\U0010ffff", start)
+        found = [int(i) for i in self.sorted_positions[start:min(end, start + limit)]]
+        if len(found) < limit:
+            prefixed = set(found)
+            for i in self.find(query, limit + len(found)):
+                if i not in prefixed:
+                    found.append(i)
+                    if len(found) >= limit:
+                        break
+        return found
@@ -0,0 +1,236 @@
+# Импорт модуля взаимодействия с ОС, выполняет операции с файлами и папками
+import os
+# Импорт библиотеки NumPy для работы с массивами
+import numpy as np
+# Импорт столбцового хранилища аннотаций на NumPy
+from annotation_store import AnnotationStore
+# Импорт декодирования кадров через реестр декодеров
+from decoders import decode_frame
+# Импорт профилировщика горячих путей (замеры этапов отрисовки)
+from perf import profiler
+# Импорт отложенной загрузки тяжёлых модулей (OpenCV, PIL загружаются при первом использовании)
+from lazy_import import lazy_import
+
+# Библиотека OpenCV для обработки изображений
+cv2 = lazy_import("cv2")
+# Класс Image из библиотеки PIL для открытия и масштабирования изображений
+Image = lazy_import("PIL.Image")
+
+# Цвет бокса по умолчанию для классов, отсутствующих в словаре цветов (BGR)
+DEFAULT_BOX_COLOR = (0, 255, 0)
+# Цвета классов по умолчанию (BGR)
+CLASS_COLORS = {"person": (0, 255, 0), "table": (255, 0, 0), "chair": (0, 0, 255)}
+# Число строк полосы при затемнении вне боксов фокуса (dim_outside)
+DIM_BAND_ROWS = 64
+
+#================================================================
+# Функции чтения кадров и аннотаций, отрисовки боксов и масштабирования.
+# Не обращаются к Tkinter, поэтому безопасно вызываются из фоновых потоков.
+# Просмотрщик хранит кадры в порядке каналов RGB (порядок для показа):
+# цвета классов задаются в BGR, как для OpenCV, и при отрисовке на
+# RGB-кадре (rgb=True) переставляются в кортеже цвета, а не в кадре.
+# Пакетная отрисовка работает с кадрами BGR (rgb=False).
+#================================================================
+
+#================================================================
+# Функция чтения кадра с диска. Декодирует файл самым быстрым для его
+# типа декодером (работает с кириллицей в путях) и возвращает массив
+# в формате RGB (rgb=True) или BGR для OpenCV; reduction > 1 - кадр,
+# уменьшенный в reduction раз (size - исходный размер, если известен).
+# При ошибке чтения пробрасывает исключение вызывающему коду.
+#================================================================
+def read_frame(image_path, reduction=1, size=None, rgb=False):
+    return decode_frame(image_path, reduction, size, rgb)
+
+# Цвет для отрисовки на кадре: цвета задаются в BGR, на RGB-кадре порядок обратный
+def display_color(bgr, rgb=True):
+    return tuple(bgr[::-1]) if rgb else tuple(bgr)
+
+#================================================================
+# Функция получения имени файла аннотации для кадра
+# (замена расширения .jpg на .txt).
+#================================================================
+def annotation_name_for(image_filename):
+    return image_filename.replace('.jpg', '.txt')
+
+# Полный путь к файлу аннотации кадра в каталоге аннотаций
+def annotation_path_for(annotations_dir, image_filename):
+    return os.path.join(annotations_dir, annotation_name_for(image_filename))
+
+#================================================================
+# Функция чтения аннотаций кадра в столбцовое хранилище
+# AnnotationStore; при отсутствии файла хранилище пустое.
+#================================================================
+def read_annotations(annotation_path):
+    return AnnotationStore.from_file(annotation_path)
+
+#================================================================
+# Функция отрисовки боксов и подписей классов на кадре (на месте).
+# Цвет определяется один раз на класс по таблице классов хранилища.
+# При scale_factor != 1 кадр уже масштабирован: координаты, толщина
+# линий и размер подписей пересчитываются, чтобы вид совпадал с
+# отрисовкой в исходном размере и последующим масштабированием.
+# hidden - имена скрытых классов: их боксы отбираются по массиву
+# идентификаторов классов и не рисуются.
+#================================================================
+@profiler.traced("annotate")
+def draw_annotations(frame, store, class_colors, scale_factor=1.0, rgb=False, hidden=()):
+    # Цвета и подписи для всех классов хранилища (в порядке каналов кадра)
+    colors = [display_color(class_colors.get(name, DEFAULT_BOX_COLOR), rgb) for name in store.classes]
+    classes = store.classes
+    class_ids = store.class_ids
+    coords = store.coords if scale_factor == 1.0 else store.scaled(scale_factor)
+    # Отбор боксов видимых классов одной операцией
+    hidden_ids = [store.class_lookup[name] for name in hidden if name in store.class_lookup]
+    if hidden_ids:
+        visible = ~np.isin(class_ids, hidden_ids)
+        class_ids, coords = class_ids[visible], coords[visible]
+    thickness = max(1, int(round(2 * scale_factor)))
+    font_scale = 0.5 * scale_factor
+    text_offset = int(round(10 * scale_factor))
+    for class_id, (x1, y1, x2, y2) in zip(class_ids.tolist(), coords.tolist()):
+        color = colors[class_id]
+        class_name = classes[class_id]
+        # Рисование прямоугольника бокса
+        cv2.rectangle(frame, (x1, y1), (x2, y2), color, thickness)
+        # Добавление текста с классом над боксом
+        cv2.putText(frame, f"{class_name}", (x1, y1 - text_offset),
+                    cv2.FONT_HERSHEY_SIMPLEX, font_scale, color, thickness)
+    return frame
+
+#================================================================
+# Функция затемнения кадра: frame * (1 - alpha) + серый * alpha.
+# Выполняется одной операцией OpenCV без полноразмерного слоя-наложения;
+# out - массив для результата (может совпадать с frame).
+#================================================================
+def dim_frame(frame, alpha, gray=100, out=None):
+    return cv2.convertScaleAbs(frame, dst=out, alpha=1.0 - alpha, beta=gray * alpha)
+
+#================================================================
+# Функция построения маски фокуса: True - затемняемые пиксели (вне
+# боксов rects), False - пиксели боксов фокуса. Маска (высота, ширина)
+# собирается срезами NumPy по каждому боксу в массиве out (рабочий
+# буфер bool той же формы), без временных массивов размера кадра.
+# rects - массив (N, 4) или последовательность (x1, y1, x2, y2) в
+# пикселях кадра; выходящие за кадр части боксов отбрасываются.
+#================================================================
+def focus_mask(shape, rects, out=None):
+    mask = np.empty(shape, dtype=bool) if out is None else out
+    mask.fill(True)
+    height, width = shape
+    # Обрезка всех боксов по кадру одной операцией, затем по срезу на бокс
+    rects = np.asarray(rects).reshape(-1, 4)
+    rects = np.clip(rects, 0, [width, height, width, height]).astype(np.intp).tolist()
+    for x1, y1, x2, y2 in rects:
+        mask[y1:y2, x1:x2] = False
+    return mask
+
+#================================================================
+# Функция затемнения кадра вне боксов фокуса (на месте): там, где
+# mask (маска focus_mask), frame = (frame * k + gray * (256 - k)) >> 8,
+# где k = (1 - alpha) * 256. Целочисленное умножение со сдвигом
+# вычисляется один раз для всех 256 значений байта (таблица), кадр
+# проходится полосами по DIM_BAND_ROWS строк: таблица применяется к
+# полосе в небольшом буфере, и затемнённые пиксели копируются в кадр
+# по маске. Память не зависит от размера кадра (маска с каналами
+# через where= в NumPy оказалась в 20 раз медленнее).
+#================================================================
+def dim_outside(frame, mask, alpha, gray=100):
+    k = int(round((1.0 - alpha) * 256))
+    table = ((np.arange(256, dtype=np.uint16) * k + gray * (256 - k)) >> 8).astype(np.uint8)
+    # Маска bool как uint8 (0/1) без копирования - маска копирования OpenCV
+    mask = mask.view(np.uint8)
+    work = np.empty((min(DIM_BAND_ROWS, frame.shape[0]),) + frame.shape[1:], dtype=np.uint8)
+    for top in range(0, frame.shape[0], DIM_BAND_ROWS):
+        band = frame[top:top + DIM_BAND_ROWS]
+        buffer = work[:band.shape[0]]
+        cv2.LUT(band, table, dst=buffer)
+        cv2.copyTo(buffer, mask[top:top + DIM_BAND_ROWS], band)
+    return frame
+
+#================================================================
+# Класс рабочих буферов отрисовки, переиспользуемых между перерисовками
+# (новый массив выделяется только при смене размера изображения).
+# Изображение, отданное в PIL без копирования, ссылается на буфер,
+# поэтому его нужно передать в Tk до следующей отрисовки, а сами
+# буферы использовать только в одном (главном) потоке.
+#================================================================
+class ScratchBuffers:
+    def __init__(self):
+        # Буферы: имя -> массив (uint8, маски - bool)
+        self.buffers = {}
+
+    # Буфер name формы shape (прежний, если форма и тип совпадают)
+    def get(self, name, shape, dtype=np.uint8):
+        buffer = self.buffers.get(name)
+        if buffer is None or buffer.shape != shape or buffer.dtype != dtype:
+            buffer = np.empty(shape, dtype=dtype)
+            self.buffers[name] = buffer
+        return buffer
+
+#================================================================
+# Функция передачи RGB-кадра в PIL. С буферами scratch кадр дополняется
+# каналом прозрачности в буфер RGBA, который PIL использует без
+# копирования (формат RGB в PIL хранится по 4 байта на пиксель и всегда
+# копируется); без буферов - обычное копирование в изображение PIL.
+#================================================================
+@profiler.traced("colour")
+def to_display_image(frame, scratch=None):
+    if scratch is None:
+        return Image.fromarray(frame)
+    height, width = frame.shape[:2]
+    rgba = cv2.cvtColor(frame, cv2.COLOR_RGB2RGBA, dst=scratch.get("rgba", (height, width, 4)))
+    return Image.frombuffer("RGBA", (width, height), rgba, "raw", "RGBA", 0, 1)
+
+#================================================================
+# Функция быстрой подготовки кадра к отображению из пирамиды масштабов
+# исходного кадра (RGB): пересчёт из ближайшего уровня, необязательное
+# затемнение, отрисовка боксов в экранных координатах (если store
+# не None) и рамки создаваемого бокса preview_box (координаты исходного
+# изображения). Все операции выполняются над изображением экранного
+# размера на месте; с буферами scratch (только главный поток) новых
+# массивов не создаётся, а результат передаётся в PIL без копирования.
+# coarse=True - черновой вид из уменьшенного декодирования (см. ImagePyramid.resample);
+# focus - боксы (N, 4) в координатах исходного изображения, остающиеся
+# при затемнении незатемнёнными (None - затемняется весь кадр);
+# hidden - имена классов, боксы которых не рисуются.
+# Возвращает объект PIL Image.
+#================================================================
+def render_zoomed(pyramid, store, class_colors, scale_factor, dim_alpha=None, scratch=None, preview_box=None,
+                  coarse=False, focus=None, hidden=()):
+    out = None
+    if scratch is not None:
+        width, height = pyramid.size
+        out = scratch.get("frame", (max(1, int(height * scale_factor)), max(1, int(width * scale_factor)), 3))
+    with profiler.stage("resize"):
+        frame = pyramid.resample(scale_factor, out, coarse)
+    if dim_alpha is not None:
+        with profiler.stage("dim"):
+            if focus is None:
+                dim_frame(frame, dim_alpha, out=frame)
+            else:
+                # Боксы фокуса в экранных пикселях (как при отрисовке боксов) остаются незатемнёнными
+                rects = (np.asarray(focus).reshape(-1, 4) * scale_factor).astype(np.int32)
+                mask = None if scratch is None else scratch.get("focus", frame.shape[:2], bool)
+                dim_outside(frame, focus_mask(frame.shape[:2], rects, mask), dim_alpha)
+    if store is not None:
+        draw_annotations(frame, store, class_colors, scale_factor, rgb=True, hidden=hidden)
+    if preview_box is not None:
+        x1, y1, x2, y2 = (int(v * scale_factor) for v in preview_box)
+        cv2.rectangle(frame, (x1, y1), (x2, y2), display_color(DEFAULT_BOX_COLOR),
+                      max(1, int(round(2 * scale_factor))))
+    return to_display_image(frame, scratch)
+
+#================================================================
+# Функция подготовки кадра RGB к отображению: масштабирование LANCZOS.
+# Возвращает объект PIL Image.
+#================================================================
+@profiler.traced("resize")
+def render_scaled(frame, scale_factor):
+    # Кадр уже в порядке каналов для отображения
+    img = Image.fromarray(frame)
+    # Вычисление нового размера с учётом масштаба
+    new_width = int(img.width * scale_factor)
+    new_height = int(img.height * scale_factor)
+    # Изменение размера с использованием алгоритма LANCZOS
+    return img.resize((new_width, new_height), Image.Resampling.LANCZOS)
@@ -0,0 +1,449 @@
+# Импорт модуля взаимодействия с ОС, выполняет операции с файлами и папками
+import os
+# Импорт модуля регулярных выражений для естественной сортировки имён
+import re
+# Импорт модуля слияния отсортированных последовательностей
+import heapq
+# Импорт модуля двоичного поиска по отсортированному списку
+import bisect
+# Импорт модуля потоков для фонового сканирования каталога и чтения видео вперёд
+import threading
+
+# Импорт функции чтения кадра-изображения
+from frame_io import read_frame
+# Импорт выбора уменьшения при декодировании и чтения размера из заголовка
+from decoders import reduction_for_scale, image_size
+# Импорт LRU-кэша с ограничением по памяти (кольцевой буфер декодированных кадров)
+from image_cache import LRUCache
+# Импорт журнала просмотрщика
+from logs import get_logger
+# Импорт отложенной загрузки тяжёлых модулей (OpenCV, PIL загружаются при первом использовании)
+from lazy_import import lazy_import
+
+# Журнал модуля
+log = get_logger("frames")
+# Библиотека OpenCV для декодирования видео
+cv2 = lazy_import("cv2")
+
+# Расширения файлов кадров-изображений
+FRAME_EXTENSIONS = ('.png', '.jpg', '.jpeg')
+# Расширения видеофайлов, открываемых через cv2.VideoCapture
+VIDEO_EXTENSIONS = ('.mp4', '.avi', '.mov', '.mkv', '.webm')
+# Имя файла кэша списка кадров в каталоге кадров
+LISTING_CACHE_NAME = ".elai_listing.txt"
+# Сигнатура файла кэша списка кадров
+LISTING_CACHE_MAGIC = "ELAILIST1"
+
+#================================================================
+# Источники кадров для просмотрщика. Источник даёт список имён кадров
+# (names) и читает кадр по имени в формате RGB (порядок каналов для
+# показа, см. frame_io). Имя кадра определяет
+# и имя файла аннотации (annotation_name_for), поэтому у видео кадры
+# получают имена вида <имя_видео>_<номер кадра>.jpg.
+# Список кадров может заполняться постепенно: poll() (в главном потоке)
+# забирает новую версию списка, complete - признак конца заполнения.
+#================================================================
+
+# Разбиение имени на текстовые и числовые части
+_DIGITS = re.compile(r"(\d+)")
+
+#================================================================
+# Функция ключа естественной сортировки: числа в имени сравниваются
+# как числа ("frame_2" < "frame_10"), текст - без учёта регистра.
+#================================================================
+def natural_key(name):
+    parts = _DIGITS.split(name.lower())
+    parts[1::2] = [int(p) for p in parts[1::2]]
+    return tuple(parts)
+
+#================================================================
+# Функция открытия источника кадров: каталог изображений или видеофайл.
+# listing_cache - сохранять ли список кадров каталога на диск, fps - частота
+# кадров каталога (у видео берётся из контейнера).
+#================================================================
+def open_frame_source(path, listing_cache=False, fps=None, **video_options):
+    if os.path.isdir(path):
+        return DirectoryFrameSource(path, listing_cache, fps)
+    return VideoFrameSource(path, **video_options)
+
+#================================================================
+# Класс источника кадров из каталога файлов изображений.
+# Каталог перебирается os.scandir в фоновом потоке, список кадров
+# (в естественном порядке) публикуется частями растущего размера,
+# поэтому первый кадр можно показать сразу. Слияние частей тоже
+# выполняется в фоне - главный поток только подменяет список.
+# При listing_cache список сохраняется в файл в каталоге кадров и
+# используется повторно, пока не изменится время изменения каталога.
+#================================================================
+class DirectoryFrameSource:
+    # Размер первой публикуемой части списка
+    FIRST_BATCH = 256
+
+    # Инициализация и запуск сканирования (или чтение списка из кэша)
+    def __init__(self, frames_dir, listing_cache=False, fps=None):
+        # Путь к каталогу с кадрами
+        self.frames_dir = frames_dir
+        # Частота кадров, из которых нарезан каталог (None - неизвестна)
+        self.fps = fps
+        # Каталог для служебных файлов (пирамиды масштабов)
+        self.cache_dir = frames_dir
+        # Путь к файлу кэша списка кадров (None - без кэша)
+        self.listing_path = os.path.join(frames_dir, LISTING_CACHE_NAME) if listing_cache else None
+        # Отсортированный список файлов изображений и ключи естественной сортировки
+        self.names = []
+        self.keys = []
+        # Признак завершения сканирования
+        self.complete = False
+        # Последняя опубликованная фоновым потоком версия (keys, names, complete)
+        self._published = None
+        self._lock = threading.Lock()
+        # Время изменения каталога на момент начала сканирования
+        self._dir_mtime = os.stat(frames_dir).st_mtime_ns
+        cached = self._read_listing_cache()
+        if cached is not None:
+            self.names = cached
+            self.keys = [natural_key(name) for name in cached]
+            self.complete = True
+            return
+        self._thread = threading.Thread(target=self._scan, name="frame-scan", daemon=True)
+        self._thread.start()
+
+    # Количество кадров
+    def __len__(self):
+        return len(self.names)
+
+    #================================================================
+    # Функция получения новой версии списка кадров (в главном потоке).
+    # Возвращает True, если список изменился.
+    #================================================================
+    def poll(self):
+        with self._lock:
+            published, self._published = self._published, None
+        if published is None:
+            return False
+        self.keys, self.names, self.complete = published
+        return True
+
+    # Позиция кадра name в текущем списке (None - кадра нет)
+    def index_of(self, name):
+        key = natural_key(name)
+        index = bisect.bisect_left(self.keys, key)
+        # Одинаковый ключ возможен у разных имён ("A1" и "a01")
+        while index < len(self.names) and self.keys[index] == key:
+            if self.names[index] == name:
+                return index
+            index += 1
+        return None
+
+    # Путь к файлу кадра по имени
+    def path(self, name):
+        return os.path.join(self.frames_dir, name)
+
+    # Чтение кадра по имени файла (RGB); при ошибке пробрасывает исключение
+    def read(self, name):
+        return read_frame(os.path.join(self.frames_dir, name), rgb=True)
+
+    #================================================================
+    # Функция чтения кадра для показа в масштабе scale_factor: при
+    # масштабе меньше 0.5 кадр декодируется уменьшенным (меньшая
+    # сторона не меньше min_side). Возвращает кадр RGB, коэффициент
+    # уменьшения и исходный размер (ширина, высота).
+    #================================================================
+    def read_reduced(self, name, scale_factor, min_side=1):
+        path = os.path.join(self.frames_dir, name)
+        if scale_factor >= 0.5:
+            frame = read_frame(path, rgb=True)
+            return frame, 1, (frame.shape[1], frame.shape[0])
+        size = image_size(path)
+        reduction = reduction_for_scale(scale_factor, size, min_side)
+        return read_frame(path, reduction, size, rgb=True), reduction, size
+
+    # Время изменения файла кадра (для проверки актуальности кэшей на диске)
+    def mtime(self, name):
+        return os.path.getmtime(os.path.join(self.frames_dir, name))
+
+    # Освобождение ресурсов (у каталога их нет; фоновое сканирование - поток-демон)
+    def close(self):
+        pass
+
+    #================================================================
+    # Основной цикл фонового сканирования: перебор каталога через
+    # os.scandir, сортировка каждой части и слияние с уже найденными.
+    #================================================================
+    def _scan(self):
+        keys, names = [], []
+        batch = []
+        limit = self.FIRST_BATCH
+        try:
+            with os.scandir(self.frames_dir) as entries:
+                for entry in entries:
+                    if entry.name.endswith(FRAME_EXTENSIONS):
+                        batch.append((natural_key(entry.name), entry.name))
+                    # Публикация части; следующая часть вдвое больше
+                    if len(batch) >= limit:
+                        keys, names = self._merge(keys, names, batch)
+                        self._publish(keys, names, False)
+                        batch = []
+                        limit *= 2
+        # Ошибка чтения каталога: публикуется то, что успели найти
+        except OSError as e:
+            log.error("Ошибка сканирования каталога кадров %s: %s", self.frames_dir, e)
+        keys, names = self._merge(keys, names, batch)
+        self._publish(keys, names, True)
+        self._write_listing_cache(names)
+
+    # Слияние отсортированного списка с новой частью (новые списки, старые не меняются)
+    @staticmethod
+    def _merge(keys, names, batch):
+        batch.sort()
+        merged = list(heapq.merge(zip(keys, names), batch))
+        return [key for key, _ in merged], [name for _, name in merged]
+
+    # Публикация версии списка для главного потока
+    def _publish(self, keys, names, complete):
+        with self._lock:
+            self._published = (keys, names, complete)
+
+    # Чтение списка кадров из кэша (None, если кэша нет или каталог изменился)
+    def _read_listing_cache(self):
+        if self.listing_path is None:
+            return None
+        try:
+            with open(self.listing_path, "r", encoding="utf-8") as f:
+                if f.readline() != self._listing_header(self._dir_mtime):
+                    return None
+                return f.read().splitlines()
+        except OSError:
+            return None
+
+    #================================================================
+    # Функция записи списка кадров в кэш (ошибка записи не мешает работе).
+    # Создание файла кэша само меняет время изменения каталога, поэтому
+    # в заголовок (фиксированной длины) записывается время после
+    # переименования файла - запись в существующий файл его не меняет.
+    #================================================================
+    def _write_listing_cache(self, names):
+        if self.listing_path is None:
+            return
+        try:
+            # Каталог изменился во время сканирования - список может быть неполным
+            if os.stat(self.frames_dir).st_mtime_ns != self._dir_mtime:
+                return
+            temp_path = self.listing_path + ".tmp"
+            with open(temp_path, "w", encoding="utf-8") as f:
+                f.write(self._listing_header(0))
+                f.write("\n".join(names))
+            os.replace(temp_path, self.listing_path)
+            with open(self.listing_path, "r+", encoding="utf-8") as f:
+                f.write(self._listing_header(os.stat(self.frames_dir).st_mtime_ns))
+        except OSError as e:
+            log.warning("Не удалось сохранить список кадров %s: %s", self.listing_path, e)
+
+    # Заголовок файла кэша: сигнатура и время изменения каталога (фиксированной длины)
+    @staticmethod
+    def _listing_header(dir_mtime):
+        return f"{LISTING_CACHE_MAGIC} {dir_mtime:020d}\n"
+
+#================================================================
+# Класс источника кадров из видеофайла через cv2.VideoCapture.
+# - Кольцевой буфер: последние декодированные кадры хранятся в LRU-кэше
+#   с лимитом памяти buffer_mb.
+# - Чтение вперёд: после запроса кадра i фоновый поток декодирует
+#   кадры i+1 .. i+readahead последовательно (без перемотки).
+# - Индекс перемотки: при последовательном чтении через каждые
+#   seek_interval кадров запоминается метка времени кадра; дальний
+#   переход перематывает к ближайшей запомненной точке не дальше
+#   цели и докодирует кадры до нужного. Короткие переходы вперёд
+#   (до max_skip кадров) выполняются без перемотки.
+# Доступ к VideoCapture защищён блокировкой - читать можно из любых потоков.
+#================================================================
+class VideoFrameSource:
+    # Инициализация: открытие видео и построение списка имён кадров
+    def __init__(self, video_path, buffer_mb=256, readahead=8, seek_interval=50, max_skip=100):
+        # Путь к видеофайлу
+        self.video_path = video_path
+        # Каталог для служебных файлов (пирамиды масштабов) - рядом с видео
+        self.cache_dir = os.path.dirname(os.path.abspath(video_path))
+        # Открытие видео
+        self.capture = cv2.VideoCapture(video_path)
+        if not self.capture.isOpened():
+            raise OSError(f"не удалось открыть видео: {video_path}")
+        # Количество кадров и частота кадров по данным контейнера
+        count = int(self.capture.get(cv2.CAP_PROP_FRAME_COUNT))
+        self.fps = self.capture.get(cv2.CAP_PROP_FPS) or None
+        # Имена кадров: <имя видео>_<номер кадра с 0>.jpg
+        stem = os.path.splitext(os.path.basename(video_path))[0]
+        self.names = [f"{stem}_{i:06d}.jpg" for i in range(count)]
+        # Номер кадра по имени
+        self.frame_numbers = {name: i for i, name in enumerate(self.names)}
+        # Список кадров известен сразу
+        self.complete = True
+        # Кольцевой буфер декодированных кадров: номер -> кадр RGB (только для чтения)
+        self.buffer = LRUCache(buffer_mb * 1024 * 1024, name="video")
+        # Число кадров, читаемых вперёд после запроса
+        self.readahead = readahead
+        # Шаг точек индекса перемотки в кадрах
+        self.seek_interval = seek_interval
+        # Максимальный переход вперёд без перемотки
+        self.max_skip = max_skip
+        # Индекс перемотки: номер кадра -> метка времени в миллисекундах
+        self.seek_index = {0: 0.0}
+        # Номер кадра, который будет прочитан следующим
+        self.position = 0
+        # Блокировка VideoCapture, буфера и индекса
+        self.lock = threading.Condition()
+        # Граница чтения вперёд (не включительно)
+        self.readahead_end = 0
+        # Признак закрытия источника
+        self.closed = False
+        # Фоновый поток чтения вперёд
+        self.thread = threading.Thread(target=self._run_readahead, name="video-readahead", daemon=True)
+        self.thread.start()
+
+    # Количество кадров
+    def __len__(self):
+        return len(self.names)
+
+    # Список кадров видео не меняется
+    def poll(self):
+        return False
+
+    # Позиция кадра name (None - кадра нет)
+    def index_of(self, name):
+        return self.frame_numbers.get(name)
+
+    # Кадр видео не является отдельным файлом
+    def path(self, name):
+        return None
+
+    # Чтение кадра для показа: видео декодируется только целиком (уменьшения нет)
+    def read_reduced(self, name, scale_factor, min_side=1):
+        frame = self.read(name)
+        return frame, 1, (frame.shape[1], frame.shape[0])
+
+    #================================================================
+    # Функция чтения кадра по имени (RGB). Кадр берётся из буфера или
+    # декодируется; затем запускается чтение следующих кадров вперёд.
+    # Кадр возвращается без копирования: массивы буфера защищены от
+    # записи, отрисовка идёт в копиях и уменьшенных изображениях.
+    #================================================================
+    def read(self, name):
+        index = self.frame_numbers.get(name)
+        if index is None:
+            raise KeyError(f"кадр {name} не найден в видео {self.video_path}")
+        with self.lock:
+            frame = self.buffer.get(index)
+            if frame is None:
+                frame = self._decode(index)
+            elif index + 1 < len(self.names) and not self._near(index + 1):
+                # Кадр из буфера, но позиция далеко - перемотка к следующему,
+                # иначе чтение вперёд декодировало бы все кадры от старой позиции
+                try:
+                    self._move_to(index + 1)
+                except OSError:
+                    # Перемотка не удалась - чтение вперёд не запускается
+                    return frame
+            # Чтение вперёд от запрошенного кадра
+            self.readahead_end = min(len(self.names), index + 1 + self.readahead)
+            self.lock.notify_all()
+        return frame
+
+    # Время изменения видеофайла (общее для всех кадров)
+    def mtime(self, name):
+        return os.path.getmtime(self.video_path)
+
+    # Остановка чтения вперёд и закрытие видео
+    def close(self):
+        with self.lock:
+            self.closed = True
+            self.lock.notify_all()
+        self.thread.join(1.0)
+        with self.lock:
+            self.capture.release()
+
+    #================================================================
+    # Функция декодирования кадра index (вызывается под блокировкой).
+    # Выбирает между последовательным чтением и перемоткой.
+    #================================================================
+    def _decode(self, index):
+        self._move_to(index)
+        frame = self._read_next()
+        if frame is None:
+            raise OSError(f"не удалось прочитать кадр {index} видео {self.video_path}")
+        return frame
+
+    # Кадр index достижим последовательным чтением от текущей позиции
+    def _near(self, index):
+        return self.position <= index <= self.position + self.max_skip
+
+    #================================================================
+    # Функция установки позиции на кадр index (под блокировкой):
+    # перемотка, если кадр далеко, и пропуск кадров до нужного без
+    # полного декодирования (grab без retrieve).
+    #================================================================
+    def _move_to(self, index):
+        if not self._near(index):
+            self._seek(index)
+        while self.position < index:
+            if not self.capture.grab():
+                raise OSError(f"не удалось прочитать кадр {self.position} видео {self.video_path}")
+            self._advance()
+
+    #================================================================
+    # Функция перемотки перед чтением кадра index. Если известная точка
+    # индекса близко (не дальше max_skip кадров) - перемотка к ней по
+    # метке времени, дальше кадры докодируются; иначе - перемотка
+    # контейнера прямо к номеру кадра.
+    #================================================================
+    def _seek(self, index):
+        start = max(i for i in self.seek_index if i <= index)
+        if index - start > self.max_skip:
+            self.capture.set(cv2.CAP_PROP_POS_FRAMES, index)
+            self.position = index
+            return
+        self.capture.set(cv2.CAP_PROP_POS_MSEC, self.seek_index[start])
+        self.position = int(round(self.capture.get(cv2.CAP_PROP_POS_FRAMES)))
+        # Контейнер перемотал не туда - точная перемотка по номеру кадра
+        if self.position != start:
+            self.capture.set(cv2.CAP_PROP_POS_FRAMES, start)
+            self.position = start
+
+    # Чтение следующего кадра с сохранением в буфер (под блокировкой)
+    def _read_next(self):
+        ok, frame = self.capture.read()
+        if not ok:
+            return None
+        # Перестановка каналов на месте и защита кадра буфера от изменения
+        cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, dst=frame)
+        frame.flags.writeable = False
+        self.buffer.put(self.position, frame)
+        self._advance()
+        return frame
+
+    # Переход к следующему кадру с пополнением индекса перемотки
+    def _advance(self):
+        self.position += 1
+        if self.position % self.seek_interval == 0 and self.position not in self.seek_index:
+            self.seek_index[self.position] = self.capture.get(cv2.CAP_PROP_POS_MSEC)
+
+    #================================================================
+    # Основной цикл чтения вперёд: последовательное декодирование
+    # кадров от текущей позиции до границы readahead_end. Блокировка
+    # отпускается между кадрами, чтобы запросы интерфейса не ждали.
+    #================================================================
+    def _run_readahead(self):
+        while True:
+            with self.lock:
+                while not self.closed and not (self.position < self.readahead_end):
+                    self.lock.wait()
+                if self.closed:
+                    return
+                # Кадр уже в буфере - достаточно пропустить его
+                if self.position in self.buffer:
+                    if self.capture.grab():
+                        self._advance()
+                    else:
+                        self.readahead_end = self.position
+                elif self._read_next() is None:
+                    # Конец видео или ошибка чтения - чтение вперёд прекращается
+                    self.readahead_end = self.position
@@ -0,0 +1,146 @@
+# Импорт библиотеки Tkinter для создания рабочего изображения подсветки
+import tkinter as tk
+
+#================================================================
+# Класс инкрементальной подсветки бокса при наведении.
+# Хранит обычное изображение кадра (base) и заранее затемнённые
+# копии для каждого значения прозрачности. При смене подсвеченного
+# бокса копирует средствами Tk только изменившиеся области:
+# восстанавливает затемнение на месте старого бокса и переносит
+# незатемнённые пиксели нового. Если бокс не изменился - ничего не делает.
+# В режиме фокуса (set_focused) затемнённые копии оставляют набор
+# боксов незатемнённым, а бокс под курсором открывается поверх них.
+#================================================================
+class HoverRenderer:
+    # Максимальное число затемнённых копий в кэше (по значениям прозрачности)
+    MAX_DIMMED = 3
+
+    # Инициализация с меткой, в которой отображается изображение. show(image) -
+    # необязательная функция вывода изображения (например, в элемент canvas)
+    def __init__(self, label, show=None):
+        # Метка Tkinter, показывающая изображение кадра (или виджет-владелец изображений)
+        self.label = label
+        # Функция вывода изображения (None - установка в метку)
+        self.show = show
+        # Изображение, показанное последним
+        self.shown = None
+        # Обычное (незатемнённое) изображение кадра с боксами
+        self.base = None
+        # Затемнённые копии: прозрачность -> PhotoImage
+        self.dimmed = {}
+        # Рабочее изображение, в котором собирается подсветка
+        self.display = None
+        # Индекс подсвеченного бокса (None - подсветки нет)
+        self.hovered = None
+        # Область подсвеченного бокса в координатах отображаемого изображения
+        self.hovered_rect = None
+        # Прозрачность, с которой собрано рабочее изображение
+        self.shown_transparency = None
+        # Режим фокуса: затемнение вне набора боксов показывается постоянно
+        self.focused = False
+
+    #================================================================
+    # Функция сброса подсветки (при загрузке кадра или перерисовке).
+    # Вызывается, когда на экране уже показано изображение base.
+    # Затемнённые копии сохраняются, если изображение кадра не изменилось
+    # (invalidate=True - изображение то же, но его пиксели обновлены).
+    #================================================================
+    def reset(self, base=None, invalidate=False):
+        if invalidate or base is not self.base:
+            self.dimmed = {}
+        self.base = base
+        self.shown = base
+        self.hovered = None
+        self.hovered_rect = None
+        self.shown_transparency = None
+
+    #================================================================
+    # Функция подсветки бокса index с областью rect (x1, y1, x2, y2 в
+    # пикселях отображаемого изображения). make_dimmed(transparency)
+    # возвращает затемнённое изображение кадра того же размера (в режиме
+    # фокуса - с незатемнёнными боксами фокуса). В режиме фокуса
+    # затемнённое изображение остаётся на экране и без бокса под курсором.
+    # Возвращает True, если изображение на экране изменилось.
+    #================================================================
+    def highlight(self, index, rect, transparency, make_dimmed):
+        if self.base is None:
+            return False
+        # Курсор вне боксов и фокуса нет - возврат обычного изображения
+        if index is None and not self.focused:
+            if self.shown is self.base:
+                return False
+            self._show(self.base)
+            self.hovered = None
+            self.hovered_rect = None
+            return True
+        # Подсветка не изменилась - никакой работы
+        if self.shown is self.display and index == self.hovered and transparency == self.shown_transparency:
+            return False
+        # Получение затемнённой копии для текущей прозрачности
+        dimmed = self._get_dimmed(transparency, make_dimmed)
+        width, height = self.base.width(), self.base.height()
+        # Подсветка только начинается или сменилась прозрачность - копируется весь затемнённый кадр
+        full = self.shown is not self.display or transparency != self.shown_transparency
+        # Создание рабочего изображения нужного размера
+        if self.display is None or self.display.width() != width or self.display.height() != height:
+            self.display = tk.PhotoImage(master=self.label, width=width, height=height)
+            full = True
+        if full:
+            self._copy(dimmed, (0, 0, width, height))
+        # Иначе восстанавливается затемнение только на месте прежнего бокса
+        elif self.hovered_rect is not None:
+            self._copy(dimmed, self.hovered_rect)
+        # Перенос незатемнённой области нового бокса
+        if index is not None:
+            self._copy(self.base, rect)
+        # Показ рабочего изображения, если на экране было обычное
+        if self.shown is not self.display:
+            self._show(self.display)
+        self.hovered = index
+        self.hovered_rect = rect if index is not None else None
+        self.shown_transparency = transparency
+        return True
+
+    #================================================================
+    # Функция включения режима фокуса (focused=True) или его смены:
+    # затемнённые копии строятся заново (набор боксов фокуса изменился),
+    # следующий вызов highlight пересобирает рабочее изображение целиком.
+    #================================================================
+    def set_focused(self, focused):
+        self.focused = focused
+        self.dimmed = {}
+        self.shown_transparency = None
+
+    # Получение (или построение) затемнённой копии для прозрачности
+    def _get_dimmed(self, transparency, make_dimmed):
+        dimmed = self.dimmed.get(transparency)
+        if dimmed is None:
+            # Ограничение числа хранимых копий: удаляется самая старая
+            if len(self.dimmed) >= self.MAX_DIMMED:
+                del self.dimmed[next(iter(self.dimmed))]
+            dimmed = make_dimmed(transparency)
+            self.dimmed[transparency] = dimmed
+        return dimmed
+
+    # Копирование области source в рабочее изображение средствами Tk (без Python-циклов)
+    def _copy(self, source, rect):
+        x1, y1, x2, y2 = self._clip(rect)
+        if x2 <= x1 or y2 <= y1:
+            return
+        self.display.tk.call(str(self.display), "copy", str(source),
+                             "-from", x1, y1, x2, y2, "-to", x1, y1)
+
+    # Ограничение области размерами изображения
+    def _clip(self, rect):
+        width, height = self.base.width(), self.base.height()
+        x1, y1, x2, y2 = rect
+        return max(0, x1), max(0, y1), min(width, x2), min(height, y2)
+
+    # Установка изображения в метку с сохранением ссылки от сборщика мусора
+    def _show(self, image):
+        self.shown = image
+        if self.show is not None:
+            self.show(image)
+            return
+        self.label.configure(image=image)
+        self.label.image = image
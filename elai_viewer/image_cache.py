@@ -0,0 +1,249 @@
+# Импорт упорядоченного словаря для хранения порядка использования записей (LRU)
+from collections import OrderedDict
+
+#================================================================
+# Функция оценки объёма памяти, занимаемого значением в кэше.
+# Для массивов NumPy используется nbytes, для изображений PIL и
+# PhotoImage - ширина * высота * 4 байта (RGBA-буфер Tk).
+#================================================================
+def estimate_size(value):
+    # Массивы NumPy сами знают свой размер в байтах
+    nbytes = getattr(value, "nbytes", None)
+    if nbytes is not None:
+        return int(nbytes)
+    # Кортежи и списки оцениваются как сумма элементов
+    if isinstance(value, (tuple, list)):
+        return sum(estimate_size(item) for item in value)
+    # Получение ширины и высоты (у PhotoImage это методы, у PIL - атрибуты)
+    width = getattr(value, "width", None)
+    height = getattr(value, "height", None)
+    if callable(width):
+        width, height = width(), height()
+    # Оценка размера растрового буфера изображения
+    if width is not None and height is not None:
+        return int(width) * int(height) * 4
+    # Для прочих объектов размер считается пренебрежимо малым
+    return 0
+
+#================================================================
+# Класс LRU-кэша с ограничением по объёму памяти в байтах.
+# При превышении лимита вытесняются давно не использованные записи.
+# Ведёт счётчики попаданий, промахов и вытеснений.
+#================================================================
+class LRUCache:
+    # Инициализация кэша с лимитом памяти в байтах
+    def __init__(self, limit_bytes, name="cache"):
+        # Имя кэша для вывода статистики
+        self.name = name
+        # Максимальный суммарный объём записей в байтах
+        self.limit_bytes = int(limit_bytes)
+        # Текущий суммарный объём записей в байтах
+        self.current_bytes = 0
+        # Хранилище записей: ключ -> (значение, размер), порядок = порядок использования
+        self._entries = OrderedDict()
+        # Счётчики попаданий, промахов и вытеснений
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    # Количество записей в кэше
+    def __len__(self):
+        return len(self._entries)
+
+    # Проверка наличия ключа без изменения порядка и счётчиков
+    def __contains__(self, key):
+        return key in self._entries
+
+    #================================================================
+    # Функция получения значения из кэша. При попадании запись
+    # становится самой свежей. Возвращает default при промахе.
+    #================================================================
+    def get(self, key, default=None):
+        entry = self._entries.get(key)
+        # Промах: записи нет в кэше
+        if entry is None:
+            self.misses += 1
+            return default
+        # Попадание: перемещение записи в конец очереди (самая свежая)
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[0]
+
+    #================================================================
+    # Функция добавления значения в кэш. Если размер не указан,
+    # он оценивается автоматически. Значения крупнее всего лимита
+    # не кэшируются. Возвращает True, если значение сохранено.
+    #================================================================
+    def put(self, key, value, size=None):
+        if size is None:
+            size = estimate_size(value)
+        # Удаление старой записи с тем же ключом
+        self.discard(key)
+        # Значение не помещается в кэш даже пустой - не сохраняем
+        if size > self.limit_bytes:
+            return False
+        # Добавление записи в конец очереди
+        self._entries[key] = (value, size)
+        self.current_bytes += size
+        # Вытеснение старых записей до соблюдения лимита
+        self._evict()
+        return True
+
+    # Удаление записи по ключу (если она есть)
+    def discard(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.current_bytes -= entry[1]
+
+    # Удаление всех записей, ключи которых удовлетворяют условию
+    def discard_where(self, predicate):
+        for key in [k for k in self._entries if predicate(k)]:
+            self.discard(key)
+
+    # Полная очистка кэша (счётчики сохраняются)
+    def clear(self):
+        self._entries.clear()
+        self.current_bytes = 0
+
+    # Изменение лимита памяти с немедленным вытеснением лишнего
+    def set_limit(self, limit_bytes):
+        self.limit_bytes = int(limit_bytes)
+        self._evict()
+
+    # Вытеснение самых старых записей, пока объём превышает лимит
+    def _evict(self):
+        while self.current_bytes > self.limit_bytes and self._entries:
+            _, (_, size) = self._entries.popitem(last=False)
+            self.current_bytes -= size
+            self.evictions += 1
+
+    # Доля попаданий среди всех обращений (0.0, если обращений не было)
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    # Словарь со статистикой кэша
+    def stats(self):
+        return {
+            "name": self.name,
+            "entries": len(self._entries),
+            "bytes": self.current_bytes,
+            "limit_bytes": self.limit_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hit_rate(),
+        }
+
+#================================================================
+# Класс двухуровневого кэша изображений просмотрщика.
+# Уровень originals хранит декодированные исходные кадры (по имени файла),
+# уровень renders - готовые масштабированные изображения (по имени и масштабу).
+# Общий лимит памяти задаётся в мегабайтах и делится между уровнями.
+# Разобранные аннотации кадров хранятся в отдельном небольшом LRU.
+#================================================================
+class ImageCache:
+    # Инициализация кэша с общим лимитом памяти и долей для исходных кадров
+    def __init__(self, memory_limit_mb=512, originals_share=0.5):
+        # Доля лимита, отводимая под исходные кадры
+        self.originals_share = originals_share
+        # Уровень декодированных исходных кадров
+        self.originals = LRUCache(0, name="originals")
+        # Уровень масштабированных изображений для отображения
+        self.renders = LRUCache(0, name="renders")
+        # Пирамиды масштабов исходных кадров (уровни 1/2, 1/4, ... для быстрого масштабирования)
+        self.pyramids = LRUCache(0, name="pyramids")
+        # Разобранные аннотации кадров (списки боксов, лимит по числу кадров)
+        self.annotations = LRUCache(4096, name="annotations")
+        # Распределение лимита памяти между уровнями
+        self.set_memory_limit(memory_limit_mb)
+
+    # Изменение общего лимита памяти в мегабайтах
+    def set_memory_limit(self, memory_limit_mb):
+        self.memory_limit_mb = memory_limit_mb
+        limit_bytes = int(memory_limit_mb * 1024 * 1024)
+        originals_bytes = int(limit_bytes * self.originals_share)
+        # Уровни пирамиды занимают не больше трети исходного кадра - под них четверть доли исходных кадров
+        pyramids_bytes = originals_bytes // 4
+        self.originals.set_limit(originals_bytes - pyramids_bytes)
+        self.pyramids.set_limit(pyramids_bytes)
+        self.renders.set_limit(limit_bytes - originals_bytes)
+
+    # Нормализация масштаба для ключа (0.1 + 0.2 != 0.3 у float)
+    @staticmethod
+    def _scale_key(scale_factor):
+        return round(scale_factor, 2)
+
+    # Получение исходного кадра по имени файла
+    def get_original(self, filename):
+        return self.originals.get(filename)
+
+    # Сохранение исходного кадра
+    def put_original(self, filename, frame):
+        return self.originals.put(filename, frame)
+
+    # Получение пирамиды масштабов кадра по имени файла
+    def get_pyramid(self, filename):
+        return self.pyramids.get(filename)
+
+    # Сохранение пирамиды масштабов (размер - верхняя оценка всех уровней, кроме исходного)
+    def put_pyramid(self, filename, pyramid):
+        return self.pyramids.put(filename, pyramid, size=pyramid.footprint)
+
+    # Ключ масштабированного изображения; plain - изображение без боксов
+    # (для векторного слоя боксов), оно не зависит от правок аннотаций;
+    # hidden - множество (frozenset) скрытых классов изображения с боксами
+    def _render_key(self, filename, scale_factor, plain, hidden=frozenset()):
+        if plain:
+            return filename, self._scale_key(scale_factor), "plain"
+        if hidden:
+            return filename, self._scale_key(scale_factor), hidden
+        return filename, self._scale_key(scale_factor)
+
+    # Получение масштабированного изображения по имени файла и масштабу
+    def get_render(self, filename, scale_factor, plain=False, hidden=frozenset()):
+        return self.renders.get(self._render_key(filename, scale_factor, plain, hidden))
+
+    # Проверка наличия масштабированного изображения без изменения статистики
+    def has_render(self, filename, scale_factor, plain=False, hidden=frozenset()):
+        return self._render_key(filename, scale_factor, plain, hidden) in self.renders
+
+    # Сохранение масштабированного изображения
+    def put_render(self, filename, scale_factor, image, plain=False, hidden=frozenset()):
+        return self.renders.put(self._render_key(filename, scale_factor, plain, hidden), image)
+
+    # Получение хранилища боксов кадра (копия, чтобы правки не портили кэш)
+    def get_annotations(self, filename):
+        store = self.annotations.get(filename)
+        return store.copy() if store is not None else None
+
+    # Сохранение копии хранилища боксов кадра (каждый кадр считается одной единицей лимита)
+    def put_annotations(self, filename, store):
+        return self.annotations.put(filename, store.copy(), size=1)
+
+    # Сброс масштабированных изображений кадра с боксами (например, после правки боксов)
+    def invalidate_renders(self, filename):
+        self.renders.discard_where(lambda key: key[0] == filename and key[-1] != "plain")
+
+    # Полный сброс кадра из всех уровней
+    def invalidate(self, filename):
+        self.originals.discard(filename)
+        self.pyramids.discard(filename)
+        self.annotations.discard(filename)
+        self.renders.discard_where(lambda key: key[0] == filename)
+
+    # Очистка обоих уровней
+    def clear(self):
+        self.originals.clear()
+        self.pyramids.clear()
+        self.renders.clear()
+        self.annotations.clear()
+
+    # Суммарный объём памяти обоих уровней в байтах
+    def total_bytes(self):
+        return self.originals.current_bytes + self.pyramids.current_bytes + self.renders.current_bytes
+
+    # Статистика уровней кэша
+    def stats(self):
+        return {"originals": self.originals.stats(), "pyramids": self.pyramids.stats(),
+                "renders": self.renders.stats()}
@@ -0,0 +1,35 @@
+# Импорт модуля импорта по имени
+import importlib
+
+#================================================================
+# Класс модуля с отложенным импортом. Заменяет тяжёлый модуль
+# (cv2, PIL.Image, PIL.ImageTk) в глобальных именах модуля: сам модуль
+# импортируется при первом обращении к любому его атрибуту, поэтому
+# программы, которым он не нужен (например, работа только с
+# аннотациями), запускаются без его загрузки. Полученный атрибут
+# сохраняется в объекте - повторные обращения идут без перехвата.
+#================================================================
+class LazyModule:
+    def __init__(self, name):
+        self.__dict__["_lazy_name"] = name
+
+    # Загрузка модуля при первом обращении к атрибуту, которого ещё нет в объекте
+    def __getattr__(self, attr):
+        value = getattr(self.module(), attr)
+        self.__dict__[attr] = value
+        return value
+
+    # Импорт (или уже импортированный) модуль
+    def module(self):
+        return importlib.import_module(self._lazy_name)
+
+    # Был ли модуль уже импортирован (без его загрузки)
+    def loaded(self):
+        return self._lazy_name in importlib.sys.modules
+
+    def __repr__(self):
+        return f"<отложенный модуль {self._lazy_name}>"
+
+# Модуль name с импортом при первом использовании
+def lazy_import(name):
+    return LazyModule(name)
@@ -0,0 +1,120 @@
+# Импорт модуля журналирования стандартной библиотеки (уровни, обработчики)
+import logging
+# Импорт обработчиков очереди и файла с ротацией
+import logging.handlers
+# Импорт модуля очередей для передачи записей в поток вывода
+import queue
+# Импорт модуля системных параметров (стандартный вывод)
+import sys
+# Импорт модуля потоков для блокировки счётчиков ограничения частоты
+import threading
+# Импорт модуля времени для окон ограничения частоты
+import time
+# Импорт модуля завершения программы: очередь выводится до конца при выходе
+import atexit
+
+# Имя корневого журнала просмотрщика
+ROOT_LOGGER = "elai"
+# Журнал отладочной трассировки геометрии (координаты мыши, подсветка боксов)
+GEOMETRY_LOGGER = "elai.geometry"
+# Формат записи журнала
+LOG_FORMAT = "%(asctime)s %(levelname)-7s %(name)s: %(message)s"
+
+#================================================================
+# Журналирование просмотрщика. Модули получают журнал get_logger(имя)
+# (дочерний для "elai") и пишут в него вместо print. setup_logging
+# настраивает уровень, вывод в консоль и необязательный файл: записи
+# ставятся в очередь, а вывод в консоль и на диск выполняет отдельный
+# поток, поэтому обработчики событий Tk не ждут ввода-вывода. Частота
+# записей ограничивается для каждого места вызова (файл и строка):
+# не больше rate_limit записей за rate_interval секунд, о пропущенных
+# сообщает следующая прошедшая запись. Трассировка геометрии (журнал
+# "elai.geometry", уровень DEBUG) включается только явно (trace_geometry).
+# До вызова setup_logging записи уровня WARNING и выше выводятся
+# стандартным обработчиком logging в stderr.
+#================================================================
+
+# Получение журнала модуля name (дочерний журнал "elai")
+def get_logger(name):
+    return logging.getLogger(f"{ROOT_LOGGER}.{name}")
+
+#================================================================
+# Класс фильтра, ограничивающего частоту записей каждого места вызова.
+# Пропущенные записи считаются; первая прошедшая после них запись
+# получает пометку с их числом.
+#================================================================
+class RateLimitFilter(logging.Filter):
+    def __init__(self, rate_limit=10, rate_interval=1.0):
+        super().__init__()
+        # Наибольшее число записей места вызова за окно
+        self.rate_limit = rate_limit
+        # Длительность окна в секундах
+        self.rate_interval = rate_interval
+        # Место вызова (файл, строка) -> [начало окна, записей в окне, пропущено]
+        self.sites = {}
+        self.lock = threading.Lock()
+
+    def filter(self, record):
+        key = (record.pathname, record.lineno)
+        now = time.monotonic()
+        with self.lock:
+            site = self.sites.get(key)
+            if site is None:
+                site = self.sites[key] = [now, 0, 0]
+            if now - site[0] >= self.rate_interval:
+                site[0] = now
+                site[1] = 0
+            if site[1] >= self.rate_limit:
+                site[2] += 1
+                return False
+            site[1] += 1
+            suppressed, site[2] = site[2], 0
+        if suppressed:
+            record.msg = f"{record.msg} (пропущено похожих сообщений: {suppressed})"
+        return True
+
+# Поток вывода записей из очереди (None - журналирование не настроено)
+_listener = None
+
+#================================================================
+# Функция настройки журналирования просмотрщика. level - уровень
+# журналов "elai" ("DEBUG", "INFO", ...), log_file - путь к файлу
+# журнала с ротацией (None - только консоль), trace_geometry - включить
+# отладочную трассировку геометрии. Повторный вызов заменяет настройку.
+#================================================================
+def setup_logging(level="INFO", log_file=None, trace_geometry=False, rate_limit=10, rate_interval=1.0):
+    global _listener
+    shutdown_logging()
+    formatter = logging.Formatter(LOG_FORMAT)
+    handlers = [logging.StreamHandler(sys.stdout)]
+    if log_file:
+        handlers.append(logging.handlers.RotatingFileHandler(log_file, maxBytes=10 * 1024 * 1024, backupCount=3,
+                                                             encoding="utf-8"))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+    records = queue.SimpleQueue()
+    queue_handler = logging.handlers.QueueHandler(records)
+    queue_handler.addFilter(RateLimitFilter(rate_limit, rate_interval))
+    root = logging.getLogger(ROOT_LOGGER)
+    root.handlers = [queue_handler]
+    root.setLevel(level)
+    # Записи не передаются корневому журналу logging (вывод только через очередь)
+    root.propagate = False
+    logging.getLogger(GEOMETRY_LOGGER).setLevel(logging.DEBUG if trace_geometry else logging.INFO)
+    _listener = logging.handlers.QueueListener(records, *handlers)
+    _listener.start()
+
+# Остановка потока вывода: оставшиеся в очереди записи выводятся до конца
+def shutdown_logging():
+    global _listener
+    if _listener is None:
+        return
+    _listener.stop()
+    for handler in _listener.handlers:
+        handler.close()
+    _listener = None
+    root = logging.getLogger(ROOT_LOGGER)
+    root.handlers = []
+    root.propagate = True
+
+atexit.register(shutdown_logging)
@@ -0,0 +1,220 @@
+# Импорт модуля взаимодействия с ОС, выполняет операции с файлами и папками
+import os
+# Импорт модуля для создания временного файла рядом с упакованным файлом
+import tempfile
+# Импорт модуля для упаковки заголовка файла в двоичный вид
+import struct
+# Импорт модуля разбора аргументов командной строки (импорт/экспорт)
+import argparse
+# Импорт библиотеки NumPy для отображения файла в память и работы с записями
+import numpy as np
+
+# Импорт столбцового хранилища аннотаций на NumPy
+from annotation_store import AnnotationStore
+# Импорт прав доступа для файла, заменяющего прежний (как при записи .txt)
+from annotation_writer import replacement_mode, set_file_mode
+
+#================================================================
+# Упакованное хранилище аннотаций проекта: один двоичный файл вместо
+# тысяч мелких .txt. Структура файла (little-endian):
+#   заголовок   - сигнатура, версия, число кадров/классов/записей и смещения разделов;
+#   имена кадров - имена .txt-файлов в UTF-8 через перевод строки;
+#   классы      - имена классов в UTF-8 через перевод строки;
+#   смещения    - uint64[кадров + 1], номер первой записи каждого кадра;
+#   записи      - int32[записей, 5]: class_id, x1, y1, x2, y2.
+# Файл отображается в память, поэтому доступ к кадру - O(1) срез
+# без обращений к файловой системе.
+#================================================================
+
+# Сигнатура и версия формата
+PACKED_MAGIC = b"ELAIPAK1"
+PACKED_VERSION = 1
+# Заголовок: сигнатура, версия, число кадров, число классов, число записей,
+# смещения разделов имён, классов, таблицы смещений и записей
+HEADER = struct.Struct("<8sIIIQQQQQ")
+# Число полей в записи бокса (class_id, x1, y1, x2, y2)
+RECORD_FIELDS = 5
+
+#================================================================
+# Функция записи упакованного файла из словаря {имя .txt: AnnotationStore}.
+# Запись идёт во временный файл с последующей атомарной заменой.
+#================================================================
+def write_packed(frames, output_path):
+    names = sorted(frames)
+    # Общая таблица классов для всех кадров: имя -> идентификатор
+    class_lookup = {}
+    offsets = np.zeros(len(names) + 1, dtype=np.uint64)
+    chunks = []
+    for i, name in enumerate(names):
+        store = frames[name]
+        # Перевод локальных идентификаторов классов кадра в общие
+        remap = np.array([class_lookup.setdefault(c, len(class_lookup)) for c in store.classes],
+                         dtype=np.int32)
+        records = np.empty((len(store), RECORD_FIELDS), dtype=np.int32)
+        records[:, 0] = remap[store.class_ids]
+        records[:, 1:] = store.coords
+        chunks.append(records)
+        offsets[i + 1] = offsets[i] + len(store)
+    classes = sorted(class_lookup, key=class_lookup.get)
+    records = np.concatenate(chunks) if chunks else np.empty((0, RECORD_FIELDS), dtype=np.int32)
+    # Разделы с именами кадров и классов
+    names_blob = "\n".join(names).encode("utf-8")
+    classes_blob = "\n".join(classes).encode("utf-8")
+    # Расчёт смещений разделов (таблица и записи выравниваются по 8 байт)
+    names_offset = HEADER.size
+    classes_offset = names_offset + len(names_blob)
+    offsets_offset = _align(classes_offset + len(classes_blob))
+    records_offset = _align(offsets_offset + offsets.nbytes)
+    header = HEADER.pack(PACKED_MAGIC, PACKED_VERSION, len(names), len(classes), len(records),
+                         names_offset, classes_offset, offsets_offset, records_offset)
+    # Запись в уникальный временный файл (несколько записывающих не мешают друг другу)
+    # с правами заменяемого файла и атомарная замена
+    directory = os.path.dirname(output_path) or "."
+    fd, temp_path = tempfile.mkstemp(prefix=".elai_", suffix=".tmp", dir=directory)
+    try:
+        set_file_mode(fd, replacement_mode(output_path))
+        with os.fdopen(fd, "wb") as f:
+            f.write(header)
+            f.write(names_blob)
+            f.write(classes_blob)
+            f.write(b"\0" * (offsets_offset - f.tell()))
+            f.write(offsets.astype("<u8").tobytes())
+            f.write(b"\0" * (records_offset - f.tell()))
+            f.write(records.astype("<i4").tobytes())
+        os.replace(temp_path, output_path)
+    except BaseException:
+        # Удаление временного файла при ошибке записи
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    return len(names)
+
+# Выравнивание смещения вверх до кратного 8
+def _align(offset):
+    return (offset + 7) // 8 * 8
+
+#================================================================
+# Функция импорта: упаковка всех .txt-файлов каталога аннотаций.
+# Возвращает число упакованных кадров.
+#================================================================
+def pack_annotations(annotations_dir, output_path):
+    frames = {}
+    with os.scandir(annotations_dir) as entries:
+        for entry in entries:
+            if entry.is_file() and entry.name.endswith(".txt"):
+                frames[entry.name] = AnnotationStore.from_file(entry.path)
+    return write_packed(frames, output_path)
+
+#================================================================
+# Функция экспорта: запись каждого кадра упакованного файла
+# в отдельный .txt-файл формата "class x1 y1 x2 y2".
+#================================================================
+def unpack_annotations(packed_path, output_dir):
+    os.makedirs(output_dir, exist_ok=True)
+    packed = PackedAnnotations(packed_path)
+    try:
+        for name in packed.frame_names:
+            packed.get(name).save(os.path.join(output_dir, name))
+        return len(packed.frame_names)
+    finally:
+        packed.close()
+
+#================================================================
+# Класс упакованного хранилища аннотаций, отображённого в память.
+# Правки кадров накапливаются в памяти (overrides) и записываются
+# в файл функцией flush().
+#================================================================
+class PackedAnnotations:
+    # Открытие файла и разбор заголовка
+    def __init__(self, packed_path):
+        self.path = packed_path
+        # Изменённые кадры: имя .txt -> AnnotationStore
+        self.overrides = {}
+        self._open()
+
+    # Отображение файла в память и построение таблицы имён
+    def _open(self):
+        self._data = np.memmap(self.path, dtype=np.uint8, mode="r")
+        (magic, version, frame_count, class_count, record_count,
+         names_offset, classes_offset, offsets_offset, records_offset) = HEADER.unpack_from(self._data, 0)
+        if magic != PACKED_MAGIC or version != PACKED_VERSION:
+            raise ValueError(f"Неизвестный формат упакованных аннотаций: {self.path}")
+        # Имена кадров и классов (читаются один раз при открытии)
+        names = bytes(self._data[names_offset:classes_offset]).decode("utf-8")
+        # Раздел классов дополнен нулями до выравнивания - они отбрасываются
+        classes = bytes(self._data[classes_offset:offsets_offset]).rstrip(b"\0").decode("utf-8")
+        self.frame_names = names.split("\n") if frame_count else []
+        self.classes = classes.split("\n") if class_count else []
+        # Словарь имя кадра -> номер для доступа за O(1)
+        self.frame_lookup = {name: i for i, name in enumerate(self.frame_names)}
+        # Представления таблицы смещений и записей без копирования
+        self.offsets = np.frombuffer(self._data, dtype="<u8", count=frame_count + 1, offset=offsets_offset)
+        self.records = np.frombuffer(self._data, dtype="<i4", count=record_count * RECORD_FIELDS,
+                                     offset=records_offset).reshape(record_count, RECORD_FIELDS)
+
+    # Проверка наличия кадра в хранилище
+    def __contains__(self, name):
+        return name in self.overrides or name in self.frame_lookup
+
+    #================================================================
+    # Функция получения аннотаций кадра по имени .txt-файла.
+    # Возвращает новое AnnotationStore или None, если кадра нет.
+    #================================================================
+    def get(self, name):
+        store = self.overrides.get(name)
+        if store is not None:
+            return store.copy()
+        index = self.frame_lookup.get(name)
+        if index is None:
+            return None
+        # Срез записей кадра по таблице смещений
+        start, end = int(self.offsets[index]), int(self.offsets[index + 1])
+        records = self.records[start:end]
+        return AnnotationStore.from_arrays(records[:, 0], records[:, 1:], self.classes)
+
+    # Сохранение изменённых аннотаций кадра (в файл - при flush())
+    def put(self, name, store):
+        self.overrides[name] = store.copy()
+
+    #================================================================
+    # Функция записи накопленных правок: файл пересобирается целиком
+    # и заново отображается в память.
+    #================================================================
+    def flush(self):
+        if not self.overrides:
+            return
+        frames = {name: self.get(name) for name in self.frame_names}
+        frames.update(self.overrides)
+        # Отображение закрывается до замены файла (требование Windows)
+        self.close()
+        write_packed(frames, self.path)
+        self.overrides = {}
+        self._open()
+
+    # Закрытие отображения файла в память: после сброса всех ссылок (таблицы
+    # смещений и записей - представления того же отображения) оно освобождается
+    def close(self):
+        self.offsets = self.records = None
+        self._data = None
+
+#================================================================
+# Командная строка: импорт каталога .txt в упакованный файл и экспорт обратно.
+#   python packed_store.py pack <каталог_аннотаций> <файл.elaipak>
+#   python packed_store.py unpack <файл.elaipak> <каталог_аннотаций>
+#================================================================
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Упаковка аннотаций в один файл и распаковка обратно")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    pack_parser = subparsers.add_parser("pack", help="упаковать каталог .txt в файл")
+    pack_parser.add_argument("annotations_dir")
+    pack_parser.add_argument("packed_path")
+    unpack_parser = subparsers.add_parser("unpack", help="распаковать файл в каталог .txt")
+    unpack_parser.add_argument("packed_path")
+    unpack_parser.add_argument("annotations_dir")
+    args = parser.parse_args()
+    if args.command == "pack":
+        count = pack_annotations(args.annotations_dir, args.packed_path)
+        print(f"Упаковано кадров: {count} -> {args.packed_path}")
+    else:
+        count = unpack_annotations(args.packed_path, args.annotations_dir)
+        print(f"Распаковано кадров: {count} -> {args.annotations_dir}")
@@ -0,0 +1,188 @@
+# Импорт модуля JSON для выгрузки трассы в формате Chrome
+import json
+# Импорт модуля потоков: замеры приходят и из фоновых потоков
+import threading
+# Импорт модуля времени для замеров
+import time
+# Импорт функции-обёртки для сохранения имени и описания функции
+from functools import wraps
+# Импорт очереди фиксированной длины для событий трассы и отметок кадров
+from collections import deque
+# Импорт библиотеки NumPy для процентилей и гистограмм
+import numpy as np
+
+# Границы корзин гистограммы длительностей в мс (логарифмическая шкала от 0.1 мс до 1 с)
+HISTOGRAM_EDGES = np.logspace(-1, 3, 13)
+
+#================================================================
+# Класс скользящей выборки длительностей одного этапа: последние
+# window замеров в кольцевом массиве. По ним считаются процентили и
+# гистограмма по логарифмическим корзинам.
+#================================================================
+class RollingHistogram:
+    def __init__(self, window=512):
+        # Кольцевой массив длительностей в мс
+        self.samples = np.zeros(window, dtype=np.float64)
+        # Позиция следующей записи и общее число замеров
+        self.position = 0
+        self.count = 0
+
+    # Добавление длительности в мс
+    def add(self, duration_ms):
+        self.samples[self.position] = duration_ms
+        self.position = (self.position + 1) % len(self.samples)
+        self.count += 1
+
+    # Замеры в окне (без пустых ячеек, пока окно не заполнено)
+    def values(self):
+        return self.samples[:min(self.count, len(self.samples))]
+
+    # Сводка по окну: число замеров за всё время, медиана, p95 и максимум в мс
+    def summary(self):
+        values = self.values()
+        if not len(values):
+            return {"count": 0, "p50": 0.0, "p95": 0.0, "max": 0.0}
+        p50, p95 = np.percentile(values, [50, 95])
+        return {"count": self.count, "p50": float(p50), "p95": float(p95), "max": float(values.max())}
+
+    # Число замеров окна в каждой корзине HISTOGRAM_EDGES (крайние корзины включают выбросы)
+    def histogram(self):
+        values = np.clip(self.values(), HISTOGRAM_EDGES[0], HISTOGRAM_EDGES[-1])
+        return np.histogram(values, HISTOGRAM_EDGES)[0]
+
+# Пустой этап: используется, когда замеры выключены (никакой работы на входе и выходе)
+class _NullStage:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+_NULL_STAGE = _NullStage()
+
+# Замер этапа name: время входа и выхода передаётся профилировщику
+class _Stage:
+    __slots__ = ("profiler", "name", "start")
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.profiler.record(self.name, self.start, time.perf_counter())
+        return False
+
+#================================================================
+# Класс профилировщика горячих путей. Этапы отмечаются блоками
+# "with profiler.stage(имя):" или декоратором profiler.traced(имя).
+# Включается и выключается во время работы (enable): выключенный
+# профилировщик возвращает общий пустой этап без чтения часов, замеры
+# не хранятся. Включённый ведёт для каждого этапа скользящую выборку
+# длительностей (RollingHistogram), счёт показанных кадров (FPS) и
+# события трассы, которые выгружаются в JSON формата Chrome Trace
+# (chrome://tracing, Perfetto). Замеры принимаются из любых потоков.
+#================================================================
+class Profiler:
+    def __init__(self, window=512, max_events=200000):
+        # Включены ли замеры
+        self.enabled = False
+        # Размер скользящего окна замеров этапа
+        self.window = window
+        # Скользящие выборки: имя этапа -> RollingHistogram
+        self.stages = {}
+        # События трассы (старые вытесняются после max_events)
+        self.events = deque(maxlen=max_events)
+        # Время показа последних кадров (для FPS)
+        self.frames = deque(maxlen=240)
+        # Начало отсчёта времени трассы
+        self.origin = time.perf_counter()
+        self.lock = threading.Lock()
+
+    # Включение (on=True) или выключение замеров
+    def enable(self, on=True):
+        self.enabled = on
+
+    # Сброс накопленных замеров и трассы
+    def reset(self):
+        with self.lock:
+            self.stages = {}
+            self.events.clear()
+            self.frames.clear()
+            self.origin = time.perf_counter()
+
+    # Блок замера этапа name (пустой блок, если замеры выключены)
+    def stage(self, name):
+        if not self.enabled:
+            return _NULL_STAGE
+        return _Stage(self, name)
+
+    # Декоратор замера функции как этапа name
+    def traced(self, name):
+        def decorate(function):
+            @wraps(function)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return function(*args, **kwargs)
+                start = time.perf_counter()
+                try:
+                    return function(*args, **kwargs)
+                finally:
+                    self.record(name, start, time.perf_counter())
+            return wrapper
+        return decorate
+
+    # Сохранение замера этапа name (start, end - показания time.perf_counter)
+    def record(self, name, start, end):
+        thread = threading.get_ident()
+        with self.lock:
+            histogram = self.stages.get(name)
+            if histogram is None:
+                histogram = self.stages[name] = RollingHistogram(self.window)
+            histogram.add((end - start) * 1000)
+            self.events.append((name, start, end, thread))
+
+    # Отметка показа кадра на экране (для FPS)
+    def frame(self):
+        if self.enabled:
+            self.frames.append(time.perf_counter())
+
+    # Частота показа кадров за последнюю секунду
+    def fps(self):
+        now = time.perf_counter()
+        return float(sum(1 for t in self.frames if now - t <= 1.0))
+
+    # Сводка по всем этапам: имя -> словарь RollingHistogram.summary
+    def summary(self):
+        with self.lock:
+            return {name: histogram.summary() for name, histogram in self.stages.items()}
+
+    # Гистограммы всех этапов: имя -> числа замеров по корзинам
+    def histograms(self):
+        with self.lock:
+            return {name: histogram.histogram() for name, histogram in self.stages.items()}
+
+    #================================================================
+    # Функция выгрузки трассы в файл JSON формата Chrome Trace: каждое
+    # событие - полный интервал ("ph": "X") с временем в микросекундах,
+    # потоки различаются по tid. Возвращает число выгруженных событий.
+    #================================================================
+    def export_trace(self, path):
+        with self.lock:
+            events = list(self.events)
+            origin = self.origin
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        trace = [{"name": name, "ph": "X", "pid": 1, "tid": thread,
+                  "ts": (start - origin) * 1e6, "dur": (end - start) * 1e6}
+                 for name, start, end, thread in events]
+        trace += [{"name": "thread_name", "ph": "M", "pid": 1, "tid": ident, "args": {"name": name}}
+                  for ident, name in names.items()]
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"traceEvents": trace, "displayTimeUnit": "ms"}, f)
+        return len(events)
+
+# Общий профилировщик просмотрщика (выключен, пока его не включат из интерфейса)
+profiler = Profiler()
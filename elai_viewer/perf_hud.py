@@ -0,0 +1,97 @@
+# Импорт модуля времени для имени файла трассы
+import time
+# Импорт библиотеки Tkinter для надписи поверх области изображения
+import tkinter as tk
+
+# Импорт журнала просмотрщика
+from logs import get_logger
+
+# Журнал модуля
+log = get_logger("perf")
+
+# Символы столбиков гистограммы (от пустого к полному)
+BARS = " ▁▂▃▄▅▆▇█"
+# Порядок этапов в панели (остальные этапы выводятся после них по алфавиту)
+STAGE_ORDER = ("load_image", "redraw", "motion", "decode", "pyramid", "annotate", "resize", "dim", "colour",
+               "photo", "configure", "tiles")
+
+#================================================================
+# Класс панели производительности поверх области изображения: FPS,
+# доля попаданий в кэш по уровням и для каждого этапа - медиана, p95 и
+# гистограмма последних замеров (0.1 мс ... 1 с по логарифмической
+# шкале). Пока панель скрыта, профилировщик выключен и не обновляется.
+#================================================================
+class PerfHud:
+    # Инициализация; parent - виджет, поверх которого размещается панель
+    def __init__(self, master, parent, profiler, image_cache, interval_ms=500):
+        self.master = master
+        self.parent = parent
+        self.profiler = profiler
+        self.image_cache = image_cache
+        # Период обновления панели в мс
+        self.interval_ms = interval_ms
+        # Надпись панели (моноширинный шрифт для выравнивания столбцов)
+        self.label = tk.Label(parent, justify=tk.LEFT, anchor="nw", font=("Courier", 9),
+                              bg="black", fg="#7CFC00")
+        # Идентификатор запланированного обновления
+        self.update_id = None
+
+    # Показана ли панель
+    @property
+    def visible(self):
+        return self.update_id is not None
+
+    # Переключение панели вместе с замерами
+    def toggle(self):
+        if self.visible:
+            self.hide()
+        else:
+            self.show()
+
+    # Показ панели и включение замеров
+    def show(self):
+        self.profiler.enable(True)
+        self.label.place(in_=self.parent, x=5, y=5)
+        self.label.lift()
+        self.refresh()
+
+    # Скрытие панели и выключение замеров (накопленная трасса сохраняется до выгрузки)
+    def hide(self):
+        self.profiler.enable(False)
+        if self.update_id is not None:
+            self.master.after_cancel(self.update_id)
+            self.update_id = None
+        self.label.place_forget()
+
+    # Обновление текста панели и планирование следующего обновления
+    def refresh(self):
+        self.label.configure(text=self.text())
+        self.update_id = self.master.after(self.interval_ms, self.refresh)
+
+    # Текст панели
+    def text(self):
+        lines = [f"FPS: {self.profiler.fps():.0f}"]
+        stats = self.image_cache.stats()
+        lines.append("кэш: " + "  ".join(f"{name} {level['hit_rate'] * 100:.0f}%" for name, level in stats.items()))
+        summary = self.profiler.summary()
+        histograms = self.profiler.histograms()
+        order = [name for name in STAGE_ORDER if name in summary]
+        order += sorted(name for name in summary if name not in STAGE_ORDER)
+        for name in order:
+            s = summary[name]
+            lines.append(f"{name:<10}{s['p50']:>7.1f}{s['p95']:>7.1f} мс  {sparkline(histograms[name])}  {s['count']}")
+        return "\n".join(lines)
+
+    # Выгрузка трассы в файл JSON формата Chrome Trace в текущем каталоге; возвращает путь
+    def export_trace(self):
+        path = time.strftime("elai_trace_%Y%m%d_%H%M%S.json")
+        count = self.profiler.export_trace(path)
+        log.info("Трасса сохранена: %s (событий: %d)", path, count)
+        return path
+
+# Строка столбиков гистограммы (высота - доля от наибольшей корзины)
+def sparkline(counts):
+    top = counts.max() if len(counts) else 0
+    if not top:
+        return " " * len(counts)
+    return "".join(BARS[int(round(c / top * (len(BARS) - 1)))] for c in counts)
@@ -0,0 +1,190 @@
+# Импорт потокобезопасной очереди для передачи готовых кадров в поток Tk
+import queue
+# Импорт пула потоков для фонового декодирования кадров
+from concurrent.futures import ThreadPoolExecutor
+
+# Импорт функций чтения и подготовки кадров, безопасных для фоновых потоков
+from frame_io import render_zoomed
+# Импорт журнала просмотрщика
+from logs import get_logger
+# Импорт отложенной загрузки тяжёлых модулей (OpenCV, PIL загружаются при первом использовании)
+from lazy_import import lazy_import
+
+# Журнал модуля
+log = get_logger("prefetch")
+# Класс PhotoImage для создания изображений Tkinter (только в главном потоке)
+ImageTk = lazy_import("PIL.ImageTk")
+
+#================================================================
+# Класс фоновой предзагрузки соседних кадров. Декодирует кадры,
+# разбирает аннотации, строит пирамиды масштабов и готовит
+# масштабированные изображения в пуле потоков для N кадров
+# по направлению движения. Готовые кадры
+# передаются в главный поток через очередь, которую опрашивает after().
+# Объекты Tkinter создаются только в главном потоке.
+#================================================================
+class FramePrefetcher:
+    # Инициализация предзагрузчика
+    def __init__(self, master, load_pyramid, load_annotations, image_cache, class_colors,
+                 depth=3, workers=2, poll_interval_ms=15, draw_boxes=True, hidden_classes=None):
+        # Ссылка на главное окно Tkinter (для after())
+        self.master = master
+        # Функция чтения кадра по имени и масштабу в пирамиду масштабов
+        # (при мелком масштабе кадр декодируется уменьшенным)
+        self.load_pyramid = load_pyramid
+        # Функция чтения аннотаций кадра по имени файла (текстовые файлы или упакованное хранилище)
+        self.load_annotations = load_annotations
+        # Общий кэш изображений просмотрщика
+        self.image_cache = image_cache
+        # Словарь цветов классов для отрисовки боксов
+        self.class_colors = class_colors
+        # Рисовать ли боксы на изображениях (False - боксы выводятся векторным слоем)
+        self.draw_boxes = draw_boxes
+        # Множество скрытых классов (изменяется главным потоком; в задачу передаётся снимок)
+        self.hidden_classes = hidden_classes if hidden_classes is not None else set()
+        # Количество кадров, загружаемых вперёд по направлению движения
+        self.depth = depth
+        # Интервал опроса очереди готовых кадров в миллисекундах
+        self.poll_interval_ms = poll_interval_ms
+        # Пул потоков для декодирования
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="prefetch")
+        # Очередь готовых результатов от фоновых потоков
+        self.results = queue.Queue()
+        # Текущие задачи: имя файла -> future
+        self.pending = {}
+        # Номер поколения задач; увеличивается при каждом новом планировании
+        self.generation = 0
+        # Идентификатор запланированного опроса очереди (None - опрос не запущен)
+        self.poll_id = None
+        # Признак остановки предзагрузчика
+        self.closed = False
+
+    #================================================================
+    # Функция планирования предзагрузки после перехода на кадр index.
+    # direction = +1 (вперёд) или -1 (назад). Задачи для кадров вне
+    # нового окна отменяются, уже загруженные кадры пропускаются.
+    #================================================================
+    def schedule(self, image_files, index, direction, scale_factor):
+        if self.closed:
+            return
+        # Новое поколение: незапущенные устаревшие задачи будут отброшены
+        self.generation += 1
+        generation = self.generation
+        # Скрытые классы на момент планирования (ключ готовых изображений)
+        hidden = frozenset(self.hidden_classes) if self.draw_boxes else frozenset()
+        # Кадры в направлении движения, которые нужно подготовить
+        targets = []
+        for step in range(1, self.depth + 1):
+            target = index + direction * step
+            if 0 <= target < len(image_files):
+                targets.append(image_files[target])
+        # Отмена задач для кадров, которые больше не нужны
+        for filename in list(self.pending):
+            if filename not in targets:
+                self.pending.pop(filename).cancel()
+        # Постановка новых задач в пул
+        for filename in targets:
+            if filename in self.pending:
+                continue
+            # Кадр уже готов к отображению в текущем масштабе
+            if (self.image_cache.has_render(filename, scale_factor, plain=not self.draw_boxes, hidden=hidden)
+                    and filename in self.image_cache.annotations):
+                continue
+            # Уже разобранные аннотации (могут содержать сохранённые правки) передаются в задачу
+            bboxes = self.image_cache.get_annotations(filename)
+            self.pending[filename] = self.executor.submit(
+                self._load, generation, filename, bboxes, scale_factor, hidden)
+        # Запуск опроса очереди, если есть незавершённые задачи
+        if self.pending and self.poll_id is None:
+            self.poll_id = self.master.after(self.poll_interval_ms, self._poll)
+
+    #================================================================
+    # Функция отмены всех задач (например, при переходе к
+    # произвольному кадру через go_to_frame).
+    #================================================================
+    def cancel(self):
+        self.generation += 1
+        for future in self.pending.values():
+            future.cancel()
+        self.pending.clear()
+
+    #================================================================
+    # Функция загрузки кадра в фоновом потоке. Проверяет поколение
+    # между этапами, чтобы не тратить время на устаревшую работу.
+    #================================================================
+    def _load(self, generation, filename, bboxes, scale_factor, hidden):
+        # Задача устарела до начала выполнения
+        if generation != self.generation:
+            return
+        try:
+            # Декодирование кадра (уменьшенного при мелком масштабе) в пирамиду масштабов
+            pyramid = self.load_pyramid(filename, scale_factor)
+            # Разбор аннотаций кадра, если их нет в кэше
+            if bboxes is None:
+                bboxes = self.load_annotations(filename)
+            # Задача устарела во время декодирования
+            if generation != self.generation:
+                self.results.put((filename, pyramid, bboxes, None, None, hidden))
+                return
+            # Построение уровней пирамиды и подготовка изображения из ближайшего уровня
+            pyramid.build()
+            scaled = render_zoomed(pyramid, bboxes if self.draw_boxes else None, self.class_colors, scale_factor,
+                                   hidden=hidden)
+        # Ошибки фоновой загрузки не прерывают работу: кадр загрузится синхронно
+        except Exception as e:
+            log.warning("Ошибка предзагрузки кадра %s: %s", filename, e)
+            self.results.put((filename, None, None, None, None, hidden))
+            return
+        # Передача результата в главный поток
+        self.results.put((filename, pyramid, bboxes, scale_factor, scaled, hidden))
+
+    #================================================================
+    # Функция опроса очереди готовых кадров (выполняется в главном потоке
+    # через after()). Сохраняет кадры в кэш и создаёт PhotoImage.
+    #================================================================
+    def _poll(self):
+        self.poll_id = None
+        if self.closed:
+            return
+        # Обработка всех готовых результатов
+        while True:
+            try:
+                filename, pyramid, bboxes, scale_factor, scaled, hidden = self.results.get_nowait()
+            except queue.Empty:
+                break
+            # Ошибка загрузки - пропуск
+            if pyramid is None:
+                continue
+            # Сохранение исходного кадра (если он декодирован целиком), пирамиды и аннотаций
+            # в кэш (аннотации из кэша не перезаписываются - они могли измениться, пока шла загрузка)
+            if pyramid.base_level == 0:
+                self.image_cache.put_original(filename, pyramid.levels[0])
+            if filename not in self.image_cache.annotations:
+                self.image_cache.put_annotations(filename, bboxes)
+            if filename not in self.image_cache.pyramids:
+                self.image_cache.put_pyramid(filename, pyramid)
+            # Создание изображения Tkinter в главном потоке и сохранение в кэш
+            if scaled is not None:
+                self.image_cache.put_render(filename, scale_factor, ImageTk.PhotoImage(image=scaled),
+                                            plain=not self.draw_boxes, hidden=hidden)
+        # Удаление завершённых и отменённых задач из списка ожидания
+        for filename in [f for f, future in self.pending.items() if future.done()]:
+            del self.pending[filename]
+        # Продолжение опроса, пока остаются незавершённые задачи
+        if self.pending or not self.results.empty():
+            self.poll_id = self.master.after(self.poll_interval_ms, self._poll)
+
+    #================================================================
+    # Функция остановки предзагрузчика при закрытии окна.
+    #================================================================
+    def shutdown(self):
+        self.closed = True
+        self.cancel()
+        if self.poll_id is not None:
+            try:
+                self.master.after_cancel(self.poll_id)
+            except Exception:
+                pass
+            self.poll_id = None
+        # Ожидающие задачи уже отменены в cancel() (cancel_futures требует Python 3.9)
+        self.executor.shutdown(wait=False)
@@ -0,0 +1,213 @@
+# Импорт модуля взаимодействия с ОС, выполняет операции с файлами и папками
+import os
+# Импорт модуля математических функций для выбора уровня пирамиды
+import math
+# Импорт модуля потоков для блокировки при построении уровней
+import threading
+# Импорт модуля временных файлов для атомарной записи уровней
+import tempfile
+# Импорт библиотеки NumPy для чтения файлов уровней (работает с кириллицей в путях)
+import numpy as np
+
+# Импорт профилировщика горячих путей (замер построения уровней)
+from perf import profiler
+# Импорт журнала просмотрщика
+from logs import get_logger
+# Импорт установки прав временного файла как у заменяемого
+from annotation_writer import replacement_mode, set_file_mode
+# Импорт отложенной загрузки тяжёлых модулей (OpenCV, PIL загружаются при первом использовании)
+from lazy_import import lazy_import
+
+# Журнал модуля
+log = get_logger("pyramid")
+# Библиотека OpenCV для уменьшения изображений и работы с файлами уровней
+cv2 = lazy_import("cv2")
+
+# Имя каталога рядом с кадрами, в котором сохраняются уровни пирамид
+PYRAMID_DIR_NAME = ".elai_pyramid"
+
+#================================================================
+# Класс пирамиды масштабов изображения: уровень 0 - исходный размер,
+# каждый следующий уровень вдвое меньше предыдущего (1/2, 1/4, 1/8, ...).
+# Уровни строятся лениво по запросу из предыдущего уровня или целиком
+# в фоновом потоке функцией build(). Если задан cache_prefix, уровни
+# читаются с диска и сохраняются на диск (файлы <prefix>.L<k>.png).
+# Уровни хранятся в порядке каналов RGB (как для показа), файлы на
+# диске - обычные PNG (порядок каналов меняется при чтении и записи).
+# Пирамида может начинаться с уменьшенного декодирования: image - уровень
+# base_level, size - размер исходного изображения, а уровни ниже base_level
+# (вплоть до исходного) загружаются функцией load_full() только по запросу.
+#================================================================
+class ImagePyramid:
+    # Минимальная сторона последнего уровня в пикселях
+    MIN_SIDE = 64
+
+    # Инициализация пирамиды из изображения уровня base_level (массив H x W x C)
+    def __init__(self, image, cache_prefix=None, source_mtime=None, base_level=0, size=None, load_full=None):
+        # Префикс путей файлов уровней на диске (None - без сохранения)
+        self.cache_prefix = cache_prefix
+        # Время изменения исходного файла: более старые файлы уровней не используются
+        self.source_mtime = source_mtime
+        # Уровень, с которого построена пирамида, и загрузка исходного изображения
+        self.base_level = base_level
+        self.load_full = load_full
+        # Уровни, уже сохранённые на диск или прочитанные с него
+        self.saved = {base_level}
+        # Блокировка построения уровней (главный поток и фоновое построение)
+        self.lock = threading.RLock()
+        # Размер исходного изображения (ширина, высота)
+        self.full_size = size or (image.shape[1], image.shape[0])
+        # Максимальный номер уровня (пока сторона не меньше MIN_SIDE)
+        self.max_level = 0
+        width, height = self.full_size
+        while min(height, width) // 2 >= self.MIN_SIDE:
+            height, width = height // 2, width // 2
+            self.max_level += 1
+        # Построенные уровни; None - уровень ещё не построен
+        self.levels = [None] * (self.max_level + 1)
+        self.levels[base_level] = image
+
+    # Размер изображения уровня 0 (ширина, высота)
+    @property
+    def size(self):
+        return self.full_size
+
+    # Оценка памяти пирамиды сверх исходного кадра (он учитывается в кэше кадров;
+    # у пирамиды из уменьшенного декодирования исходного кадра в кэше нет)
+    @property
+    def footprint(self):
+        base = self.levels[self.base_level]
+        return base.nbytes // 3 if self.base_level == 0 else base.nbytes * 4 // 3
+
+    #================================================================
+    # Функция получения уровня k (строит недостающие уровни по цепочке
+    # уменьшением вдвое с усреднением INTER_AREA или читает их с диска;
+    # отсутствующий исходный уровень загружается функцией load_full).
+    #================================================================
+    def level(self, k):
+        k = max(0, min(k, self.max_level))
+        if self.levels[k] is None:
+            with self.lock:
+                if self.levels[k] is None and k > 0:
+                    self.levels[k] = self._read_level(k)
+                if self.levels[k] is None and k == 0:
+                    self.levels[0] = self.load_full()
+                    self.saved.add(0)
+                elif self.levels[k] is None:
+                    previous = self.level(k - 1)
+                    height, width = previous.shape[:2]
+                    self.levels[k] = cv2.resize(previous, (width // 2, height // 2), interpolation=cv2.INTER_AREA)
+        return self.levels[k]
+
+    #================================================================
+    # Функция построения всех уровней (вызывается в фоновом потоке).
+    # При заданном cache_prefix несохранённые уровни записываются на диск.
+    # Строятся уровни от base_level: исходный кадр ради них не загружается.
+    #================================================================
+    @profiler.traced("pyramid")
+    def build(self):
+        for k in range(self.base_level + 1, self.max_level + 1):
+            level = self.level(k)
+            if self.cache_prefix is not None and k not in self.saved:
+                try:
+                    self._write_level(k, level)
+                # Ошибка записи кэша не мешает работе: уровень остаётся в памяти
+                except (OSError, cv2.error) as e:
+                    log.warning("Ошибка сохранения уровня пирамиды %s: %s", self._level_path(k), e)
+                    return
+                self.saved.add(k)
+
+    #================================================================
+    # Функция выбора уровня для масштаба scale_factor. Возвращает номер
+    # уровня и остаточный масштаб относительно него: берётся самый
+    # маленький уровень, который не меньше требуемого размера, поэтому
+    # остаточное уменьшение не превышает 2 раз и не даёт алиасинга.
+    #================================================================
+    def level_for_scale(self, scale_factor):
+        if scale_factor >= 1.0:
+            return 0, scale_factor
+        k = min(self.max_level, int(math.floor(math.log2(1.0 / scale_factor) + 1e-9)))
+        return k, scale_factor * (2 ** k)
+
+    # Есть ли в памяти уровень, нужный для масштаба scale_factor (без загрузки исходного кадра)
+    def detailed_for(self, scale_factor):
+        return self.levels[0] is not None or self.level_for_scale(scale_factor)[0] >= self.base_level
+
+    #================================================================
+    # Функция получения изображения в масштабе scale_factor (размер
+    # int(W * s) x int(H * s)) пересчётом из ближайшего уровня.
+    # Результат записывается в out (массив нужного размера), иначе
+    # в новый массив; уровни пирамиды не отдаются наружу. coarse=True -
+    # черновой вид: если нужный уровень мельче уменьшенного декодирования,
+    # изображение увеличивается из уровня base_level без загрузки исходного кадра.
+    #================================================================
+    def resample(self, scale_factor, out=None, coarse=False):
+        width, height = self.size
+        size = (max(1, int(width * scale_factor)), max(1, int(height * scale_factor)))
+        level_index, _ = self.level_for_scale(scale_factor)
+        if coarse and not self.detailed_for(scale_factor):
+            level_index = self.base_level
+        level = self.level(level_index)
+        if (level.shape[1], level.shape[0]) == size:
+            if out is None:
+                return level.copy()
+            np.copyto(out, level)
+            return out
+        # Остаточное уменьшение не больше чем вдвое (или увеличение чернового уровня), поэтому
+        # билинейной интерполяции достаточно (INTER_AREA с дробным коэффициентом в разы медленнее)
+        return cv2.resize(level, size, dst=out, interpolation=cv2.INTER_LINEAR)
+
+    # Путь к файлу уровня k на диске
+    def _level_path(self, k):
+        return f"{self.cache_prefix}.L{k}.png"
+
+    # Чтение уровня k с диска (None, если файла нет, он устарел или повреждён)
+    def _read_level(self, k):
+        if self.cache_prefix is None:
+            return None
+        path = self._level_path(k)
+        try:
+            if self.source_mtime is not None and os.path.getmtime(path) < self.source_mtime:
+                return None
+            level = cv2.imdecode(np.fromfile(path, dtype=np.uint8), cv2.IMREAD_UNCHANGED)
+        except (OSError, cv2.error):
+            return None
+        if level is not None and level.ndim == 3:
+            cv2.cvtColor(level, cv2.COLOR_BGR2RGB, dst=level)
+        # Уровень должен совпадать по размеру с построенным из предыдущего
+        width, height = self.full_size
+        channels = self.levels[self.base_level].shape[2:]
+        if level is None or level.shape != (height >> k, width >> k) + channels:
+            return None
+        self.saved.add(k)
+        return level
+
+    # Запись уровня k на диск (PNG без потерь, атомарная замена файла)
+    def _write_level(self, k, level):
+        path = self._level_path(k)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        if level.ndim == 3:
+            level = cv2.cvtColor(level, cv2.COLOR_RGB2BGR)
+        ok, encoded = cv2.imencode(".png", level, [cv2.IMWRITE_PNG_COMPRESSION, 1])
+        if not ok:
+            raise OSError(f"не удалось закодировать уровень {k}")
+        # Уникальный временный файл: уровень одного кадра могут одновременно
+        # записывать предзагрузка, ядро просмотрщика или другой просмотрщик
+        fd, temp_path = tempfile.mkstemp(prefix=".elai_", suffix=".tmp", dir=os.path.dirname(path))
+        try:
+            set_file_mode(fd, replacement_mode(path))
+            with os.fdopen(fd, "wb") as f:
+                f.write(encoded.tobytes())
+            os.replace(temp_path, path)
+        except BaseException:
+            # Удаление временного файла при ошибке записи
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+#================================================================
+# Функция получения префикса файлов пирамиды кадра в каталоге
+# PYRAMID_DIR_NAME рядом с кадрами.
+#================================================================
+def pyramid_cache_prefix(frames_dir, image_filename):
+    return os.path.join(frames_dir, PYRAMID_DIR_NAME, image_filename)
@@ -0,0 +1,76 @@
+# Импорт модуля времени для ограничения частоты отрисовки
+import time
+
+#================================================================
+# Класс планировщика отрисовки по событиям мыши. Обработчик события
+# только передаёт последнее состояние указателя (request): состояние
+# запоминается, а отрисовка выполняется через after() не чаще одного
+# раза за interval_ms - все события, пришедшие между кадрами, сливаются
+# в одно, и изображение не отстаёт от указателя. Отрисовки разных видов
+# (key: подсветка, перетаскивание) хранятся отдельно. Если состояние не
+# изменилось с последней отрисовки этого вида, отрисовка пропускается.
+#================================================================
+class RedrawScheduler:
+    # Инициализация; master - виджет Tk для after(), interval_ms - наименьший интервал между кадрами
+    def __init__(self, master, interval_ms=16):
+        self.master = master
+        self.interval_ms = interval_ms
+        # Ожидающие отрисовки: вид -> (функция, состояние)
+        self.pending = {}
+        # Состояние последней выполненной отрисовки каждого вида
+        self.rendered = {}
+        # Идентификатор запланированного кадра
+        self.after_id = None
+        # Время последнего кадра (time.perf_counter)
+        self.last_frame = 0.0
+
+    #================================================================
+    # Функция запроса отрисовки вида key с состоянием state (кортеж).
+    # render(*state) будет вызвана в ближайшем кадре с последним из
+    # запрошенных до него состояний.
+    #================================================================
+    def request(self, key, render, state):
+        # Состояние уже на экране и новых запросов не было - отрисовка не нужна
+        if key not in self.pending and self.rendered.get(key) == state:
+            return
+        self.pending[key] = (render, state)
+        if self.after_id is None:
+            wait = self.interval_ms - (time.perf_counter() - self.last_frame) * 1000
+            self.after_id = self.master.after(max(0, int(wait)), self._frame)
+
+    # Немедленное выполнение ожидающей отрисовки вида key (например, перед отпусканием кнопки)
+    def flush(self, key):
+        pending = self.pending.pop(key, None)
+        if pending is not None:
+            self._render(key, *pending)
+        if not self.pending and self.after_id is not None:
+            self.master.after_cancel(self.after_id)
+            self.after_id = None
+
+    # Забывание отрисованного состояния вида key: следующий запрос отрисуется, даже если состояние то же
+    # (изображение под указателем изменилось)
+    def forget(self, key):
+        self.rendered.pop(key, None)
+
+    # Отмена ожидающих отрисовок и забывание отрисованных состояний (смена кадра, масштаба, боксов)
+    def invalidate(self):
+        self.pending.clear()
+        self.rendered.clear()
+        if self.after_id is not None:
+            self.master.after_cancel(self.after_id)
+            self.after_id = None
+
+    # Кадр: выполнение всех ожидающих отрисовок с последними состояниями
+    def _frame(self):
+        self.after_id = None
+        self.last_frame = time.perf_counter()
+        pending, self.pending = self.pending, {}
+        for key, (render, state) in pending.items():
+            self._render(key, render, state)
+
+    # Отрисовка вида key, если состояние изменилось с прошлой отрисовки
+    def _render(self, key, render, state):
+        if self.rendered.get(key) == state:
+            return
+        self.rendered[key] = state
+        render(*state)
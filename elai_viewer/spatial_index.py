@@ -0,0 +1,203 @@
+# Импорт библиотеки NumPy для векторного расчёта ячеек сетки при построении индекса
+import numpy as np
+
+# Допуск (в пикселях исходного изображения) для попадания в угол или край бокса
+HANDLE_TOLERANCE = 10
+
+#================================================================
+# Функция определения режима редактирования по положению курсора
+# внутри бокса: изменение размера за угол, перемещение за край или
+# перетаскивание всего бокса. Возвращает (mode, corner, edge).
+#================================================================
+def classify_handle(rect, x, y, tolerance=HANDLE_TOLERANCE):
+    x1, y1, x2, y2 = rect
+    # Близость курсора к каждой из сторон бокса
+    near_x1 = abs(x - x1) < tolerance
+    near_x2 = abs(x - x2) < tolerance
+    near_y1 = abs(y - y1) < tolerance
+    near_y2 = abs(y - y2) < tolerance
+    # Углы имеют приоритет над краями
+    if near_x1 and near_y1:
+        return "resize", "top_left", None
+    if near_x2 and near_y2:
+        return "resize", "bottom_right", None
+    if near_x1 and near_y2:
+        return "resize", "bottom_left", None
+    if near_x2 and near_y1:
+        return "resize", "top_right", None
+    # Вертикальные и горизонтальные края
+    if near_x1 or near_x2:
+        return "move", None, "vertical"
+    if near_y1 or near_y2:
+        return "move", None, "horizontal"
+    # Внутренняя область бокса
+    return "drag_box", None, None
+
+#================================================================
+# Класс пространственного индекса боксов кадра на основе сетки.
+# Каждый бокс регистрируется во всех ячейках, которые он пересекает,
+# поэтому поиск бокса под курсором и боксов в области просмотра
+# проверяет только боксы соседних ячеек, а не весь список.
+# Идентификаторы боксов совпадают с их индексами в списке кадра.
+#================================================================
+class BoxGridIndex:
+    # Инициализация пустого индекса с размером ячейки в пикселях
+    def __init__(self, cell_size=64):
+        # Размер ячейки сетки в пикселях исходного изображения
+        self.cell_size = cell_size
+        # Ячейки сетки: (cx, cy) -> множество идентификаторов боксов
+        self.cells = {}
+        # Координаты боксов: идентификатор -> (x1, y1, x2, y2)
+        self.rects = {}
+        # Диапазоны ячеек боксов: идентификатор -> (cx1, cy1, cx2, cy2)
+        self.ranges = {}
+
+    # Количество боксов в индексе
+    def __len__(self):
+        return len(self.rects)
+
+    #================================================================
+    # Функция построения индекса по массиву координат боксов (N, 4).
+    # Размер ячейки подбирается по медианному размеру боксов, чтобы
+    # крупные боксы не занимали тысячи ячеек, а мелкие - не сливались.
+    #================================================================
+    def build(self, coords):
+        self.cells = {}
+        self.rects = {}
+        self.ranges = {}
+        if not len(coords):
+            return
+        # Координаты всех боксов одним массивом (N, 4)
+        coords = np.asarray(coords, dtype=np.int64)
+        # Упорядочивание углов (бокс мог быть «вывернут» при изменении размера)
+        lo = np.minimum(coords[:, :2], coords[:, 2:])
+        hi = np.maximum(coords[:, :2], coords[:, 2:])
+        # Подбор размера ячейки по медианному размеру бокса
+        self.cell_size = max(32, int(np.median(np.max(hi - lo, axis=1))))
+        # Векторный расчёт диапазонов ячеек для всех боксов
+        cell_lo = lo // self.cell_size
+        cell_hi = hi // self.cell_size
+        for i, (rect, l, h) in enumerate(zip(coords.tolist(), cell_lo.tolist(), cell_hi.tolist())):
+            self.rects[i] = tuple(rect)
+            cell_range = (l[0], l[1], h[0], h[1])
+            self.ranges[i] = cell_range
+            self._add_to_cells(i, cell_range)
+
+    # Диапазон ячеек, которые пересекает прямоугольник
+    def _cell_range(self, rect):
+        x1, y1, x2, y2 = rect
+        size = self.cell_size
+        return (min(x1, x2) // size, min(y1, y2) // size, max(x1, x2) // size, max(y1, y2) // size)
+
+    # Регистрация бокса в ячейках диапазона
+    def _add_to_cells(self, box_id, cell_range):
+        cx1, cy1, cx2, cy2 = cell_range
+        for cx in range(cx1, cx2 + 1):
+            for cy in range(cy1, cy2 + 1):
+                self.cells.setdefault((cx, cy), set()).add(box_id)
+
+    # Удаление бокса из ячеек диапазона
+    def _remove_from_cells(self, box_id, cell_range):
+        cx1, cy1, cx2, cy2 = cell_range
+        for cx in range(cx1, cx2 + 1):
+            for cy in range(cy1, cy2 + 1):
+                bucket = self.cells.get((cx, cy))
+                if bucket is not None:
+                    bucket.discard(box_id)
+                    if not bucket:
+                        del self.cells[(cx, cy)]
+
+    #================================================================
+    # Функция добавления нового бокса с идентификатором box_id.
+    #================================================================
+    def insert(self, box_id, rect):
+        rect = tuple(int(v) for v in rect)
+        cell_range = self._cell_range(rect)
+        self.rects[box_id] = rect
+        self.ranges[box_id] = cell_range
+        self._add_to_cells(box_id, cell_range)
+
+    #================================================================
+    # Функция обновления координат бокса (изменение размера, перемещение).
+    # Ячейки перерегистрируются только если диапазон ячеек изменился.
+    #================================================================
+    def update(self, box_id, rect):
+        rect = tuple(int(v) for v in rect)
+        cell_range = self._cell_range(rect)
+        old_range = self.ranges.get(box_id)
+        if old_range != cell_range:
+            if old_range is not None:
+                self._remove_from_cells(box_id, old_range)
+            self._add_to_cells(box_id, cell_range)
+            self.ranges[box_id] = cell_range
+        self.rects[box_id] = rect
+
+    #================================================================
+    # Функция удаления бокса. Идентификаторы следующих боксов
+    # уменьшаются на 1, как индексы в списке после del.
+    #================================================================
+    def remove(self, box_id):
+        self._remove_from_cells(box_id, self.ranges.pop(box_id))
+        del self.rects[box_id]
+        # Сдвиг идентификаторов боксов, стоявших в списке после удалённого
+        for old_id in sorted(i for i in self.rects if i > box_id):
+            cell_range = self.ranges.pop(old_id)
+            self._remove_from_cells(old_id, cell_range)
+            self._add_to_cells(old_id - 1, cell_range)
+            self.ranges[old_id - 1] = cell_range
+            self.rects[old_id - 1] = self.rects.pop(old_id)
+
+    #================================================================
+    # Функция поиска боксов, содержащих точку (x, y), в порядке списка.
+    #================================================================
+    def query_point(self, x, y):
+        size = self.cell_size
+        bucket = self.cells.get((int(x // size), int(y // size)))
+        if not bucket:
+            return []
+        hits = []
+        for box_id in bucket:
+            x1, y1, x2, y2 = self.rects[box_id]
+            if x1 <= x <= x2 and y1 <= y <= y2:
+                hits.append(box_id)
+        return sorted(hits)
+
+    # Первый (по порядку списка) бокс под точкой или None (exclude - функция отбора пропускаемых боксов)
+    def first_at(self, x, y, exclude=None):
+        for box_id in self.query_point(x, y):
+            if exclude is None or not exclude(box_id):
+                return box_id
+        return None
+
+    #================================================================
+    # Функция определения бокса и маркера редактирования под курсором.
+    # Возвращает (box_id, mode, corner, edge) или None, если курсор
+    # не попадает ни в один бокс; боксы, для которых exclude(box_id)
+    # истинно (например, скрытые), пропускаются.
+    #================================================================
+    def handle_at(self, x, y, tolerance=HANDLE_TOLERANCE, exclude=None):
+        box_id = self.first_at(x, y, exclude)
+        if box_id is None:
+            return None
+        return (box_id,) + classify_handle(self.rects[box_id], x, y, tolerance)
+
+    #================================================================
+    # Функция поиска боксов, пересекающих область (например, видимую
+    # часть кадра). Возвращает отсортированный список идентификаторов.
+    #================================================================
+    def query_rect(self, x1, y1, x2, y2):
+        cx1, cy1, cx2, cy2 = self._cell_range((x1, y1, x2, y2))
+        found = set()
+        # При большой области дешевле проверить все боксы напрямую
+        if (cx2 - cx1 + 1) * (cy2 - cy1 + 1) > len(self.cells):
+            candidates = self.rects.keys()
+        else:
+            candidates = set()
+            for cx in range(cx1, cx2 + 1):
+                for cy in range(cy1, cy2 + 1):
+                    candidates |= self.cells.get((cx, cy), set())
+        for box_id in candidates:
+            bx1, by1, bx2, by2 = self.rects[box_id]
+            if min(bx1, bx2) <= x2 and max(bx1, bx2) >= x1 and min(by1, by2) <= y2 and max(by1, by2) >= y1:
+                found.add(box_id)
+        return sorted(found)
@@ -0,0 +1,55 @@
+# Импорт модуля времени для замеров этапов запуска
+import time
+# Импорт модуля системных параметров (список загруженных модулей)
+import sys
+
+#================================================================
+# Класс отчёта о времени запуска просмотрщика. Этапы отмечаются
+# вызовом mark(имя) в момент их завершения: длительность этапа -
+# время от предыдущей отметки. Отметки записываются всегда (их
+# несколько за запуск, первые - ещё до разбора командной строки),
+# после finish() - не записываются. finish() возвращает отчёт, если
+# он включён (enable): таблица этапов с длительностью и временем от
+# начала запуска, а также загружены ли к этому моменту тяжёлые модули.
+#================================================================
+class StartupProfile:
+    # Модули, загрузка которых откладывается до первого использования
+    HEAVY_MODULES = ("cv2", "PIL.Image", "PIL.ImageTk")
+
+    # start - время начала запуска (time.perf_counter), по умолчанию - момент создания
+    def __init__(self, start=None):
+        self.start = time.perf_counter() if start is None else start
+        self.enabled = False
+        # Отметки этапов: (имя, время)
+        self.marks = []
+        # Отчёт уже выдан
+        self.finished = False
+
+    def enable(self):
+        self.enabled = True
+
+    # Отметка завершения этапа phase
+    def mark(self, phase):
+        if not self.finished:
+            self.marks.append((phase, time.perf_counter()))
+
+    # Завершение запуска; отчёт по отмеченным этапам (None, если отчёт выключен или уже выдан)
+    def finish(self):
+        if self.finished:
+            return None
+        self.finished = True
+        return self.report() if self.enabled else None
+
+    # Текст отчёта
+    def report(self):
+        lines = [f"{'этап':<16}{'мс':>10}{'с начала, мс':>15}"]
+        previous = self.start
+        for phase, moment in self.marks:
+            lines.append(f"{phase:<16}{(moment - previous) * 1000:>10.1f}{(moment - self.start) * 1000:>15.1f}")
+            previous = moment
+        loaded = [name for name in self.HEAVY_MODULES if name in sys.modules]
+        lines.append(f"загружены тяжёлые модули: {', '.join(loaded) if loaded else 'нет'}")
+        return "\n".join(lines)
+
+# Общий отчёт о запуске (время отсчитывается от первого импорта модуля)
+startup_profile = StartupProfile()
@@ -0,0 +1,158 @@
+# Импорт модуля взаимодействия с ОС, выполняет операции с файлами и папками
+import os
+# Импорт модуля хэш-функций для имён файлов кэша миниатюр
+import hashlib
+# Импорт пула процессов для построения миниатюр вне процесса интерфейса
+from concurrent.futures import ProcessPoolExecutor
+# Импорт выбора способа запуска процессов пула
+import multiprocessing
+
+# Импорт чтения кадра (с уменьшенным декодированием JPEG)
+from frame_io import read_frame
+# Импорт выбора уменьшения при декодировании и чтения размера из заголовка
+from decoders import reduction_for_scale, image_size, registry
+# Импорт журнала просмотрщика
+from logs import get_logger
+# Импорт отложенной загрузки тяжёлых модулей (OpenCV, PIL загружаются при первом использовании)
+from lazy_import import lazy_import
+
+# Журнал модуля
+log = get_logger("thumbnails")
+# Библиотека OpenCV для уменьшения и кодирования миниатюр
+cv2 = lazy_import("cv2")
+
+# Каталог кэша миниатюр по умолчанию (общий для всех наборов кадров пользователя)
+DEFAULT_THUMBNAIL_DIR = os.path.join(os.path.expanduser("~"), ".cache", "elai", "thumbnails")
+# Наибольшая сторона миниатюры в пикселях
+THUMBNAIL_SIDE = 128
+# Качество JPEG файлов миниатюр
+THUMBNAIL_QUALITY = 85
+# Версия формата миниатюр: входит в ключ, при её смене старые файлы не используются
+THUMBNAIL_VERSION = 1
+
+#================================================================
+# Кэш миниатюр кадров на диске. Файл миниатюры адресуется хэшем
+# (путь к кадру, время изменения, размер файла, сторона миниатюры):
+# изменённый кадр получает новый ключ, поэтому кэш не нужно проверять
+# на актуальность, а повторное открытие набора кадров берёт миниатюры
+# с диска без декодирования. Миниатюры строятся в пуле процессов
+# (декодирование JPEG с уменьшением по DCT в 8 раз и уменьшение до
+# THUMBNAIL_SIDE), файлы записываются атомарно.
+#================================================================
+
+# Путь к файлу миниатюры кадра path в каталоге cache_dir (None - файла кадра нет)
+def thumbnail_path(cache_dir, path, side=THUMBNAIL_SIDE):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    key = f"{THUMBNAIL_VERSION}\0{os.path.abspath(path)}\0{stat.st_mtime_ns}\0{stat.st_size}\0{side}"
+    digest = hashlib.sha1(key.encode("utf-8")).hexdigest()
+    return os.path.join(cache_dir, digest[:2], digest + ".jpg")
+
+# Подготовка процесса пула: декодер выбирается без фонового замера (процесс короткоживущий)
+def _init_worker():
+    registry.benchmark = False
+
+#================================================================
+# Функция построения миниатюры кадра path в файл target (выполняется
+# в процессе пула). Кадр декодируется уменьшенным настолько, насколько
+# позволяет размер миниатюры, и уменьшается до стороны side.
+#================================================================
+def make_thumbnail(path, target, side=THUMBNAIL_SIDE):
+    size = image_size(path)
+    # Уменьшение при декодировании не сильнее, чем до размера миниатюры
+    min_side = max(1, side * min(size) // max(size))
+    frame = read_frame(path, reduction_for_scale(side / max(size), size, min_side), size)
+    height, width = frame.shape[:2]
+    scale_factor = min(1.0, side / max(width, height))
+    thumbnail = cv2.resize(frame, (max(1, int(width * scale_factor)), max(1, int(height * scale_factor))),
+                           interpolation=cv2.INTER_AREA)
+    ok, data = cv2.imencode(".jpg", thumbnail, [cv2.IMWRITE_JPEG_QUALITY, THUMBNAIL_QUALITY])
+    if not ok:
+        raise OSError(f"не удалось закодировать миниатюру: {path}")
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    # Запись во временный файл и замена: другой процесс не увидит недописанный файл
+    temporary = f"{target}.{os.getpid()}.tmp"
+    data.tofile(temporary)
+    os.replace(temporary, target)
+    return target
+
+#================================================================
+# Класс построения миниатюр. request() возвращает путь к готовому
+# файлу миниатюры или ставит её построение в пул процессов; готовые
+# миниатюры главный поток забирает через done(). Задачи для кадров,
+# которые больше не видны, отменяются (cancel_except).
+#================================================================
+class ThumbnailCache:
+    def __init__(self, cache_dir=DEFAULT_THUMBNAIL_DIR, side=THUMBNAIL_SIDE, workers=None):
+        # Каталог файлов миниатюр
+        self.cache_dir = cache_dir
+        # Наибольшая сторона миниатюры
+        self.side = side
+        # Число процессов пула (None - по числу ядер, но не больше 4: интерфейсу нужен процессор)
+        self.workers = workers or min(4, os.cpu_count() or 1)
+        # Пул процессов создаётся при первой миниатюре, которой нет на диске
+        self.executor = None
+        # Строящиеся миниатюры: путь к кадру -> future
+        self.pending = {}
+        # Кадры, миниатюру которых построить не удалось (повторно не запрашиваются)
+        self.failed = set()
+        self.closed = False
+
+    #================================================================
+    # Функция запроса миниатюры кадра path. Возвращает путь к файлу
+    # миниатюры, если он уже есть на диске, иначе ставит построение
+    # в пул и возвращает None (готовый файл вернёт done()).
+    #================================================================
+    def request(self, path):
+        if self.closed or path in self.failed:
+            return None
+        target = thumbnail_path(self.cache_dir, path, self.side)
+        if target is None:
+            return None
+        if os.path.exists(target):
+            return target
+        if path not in self.pending:
+            if self.executor is None:
+                # Процессы запускаются заново (spawn), а не копией процесса интерфейса (fork):
+                # копия наследует блокировки, захваченные его потоками (реестр декодеров,
+                # профилировщик, журнал), и может зависнуть на первой же из них
+                self.executor = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                                    mp_context=multiprocessing.get_context("spawn"))
+            self.pending[path] = self.executor.submit(make_thumbnail, path, target, self.side)
+        return None
+
+    # Отмена ещё не начатых построений для кадров не из keep (прокрутка ушла дальше)
+    def cancel_except(self, keep):
+        for path in [p for p in self.pending if p not in keep]:
+            if self.pending[path].cancel():
+                del self.pending[path]
+
+    #================================================================
+    # Функция получения построенных миниатюр (главный поток): список
+    # пар (путь к кадру, путь к файлу миниатюры).
+    #================================================================
+    def done(self):
+        ready = []
+        for path in [p for p, future in self.pending.items() if future.done()]:
+            future = self.pending.pop(path)
+            if future.cancelled():
+                continue
+            if future.exception() is not None:
+                log.warning("Ошибка построения миниатюры %s: %s", path, future.exception())
+                self.failed.add(path)
+                continue
+            ready.append((path, future.result()))
+        return ready
+
+    # Остановка пула процессов
+    def close(self):
+        self.closed = True
+        # Ожидающие задачи отменяются явно (cancel_futures требует Python 3.9)
+        for future in self.pending.values():
+            future.cancel()
+        self.pending.clear()
+        if self.executor is not None:
+            self.executor.shutdown(wait=False)
+            self.executor = None
@@ -0,0 +1,237 @@
+# Импорт модуля математических функций для расчёта сетки плиток
+import math
+# Импорт библиотеки NumPy для работы с массивами плиток
+import numpy as np
+
+# Импорт LRU-кэша с ограничением по памяти
+from image_cache import LRUCache
+# Импорт пирамиды масштабов изображения
+from pyramid import ImagePyramid
+# Импорт отложенной загрузки тяжёлых модулей (OpenCV, PIL загружаются при первом использовании)
+from lazy_import import lazy_import
+
+# Библиотека OpenCV для пересчёта плиток из уровней пирамиды
+cv2 = lazy_import("cv2")
+# Классы Image и ImageTk из PIL для создания изображений Tkinter
+Image = lazy_import("PIL.Image")
+ImageTk = lazy_import("PIL.ImageTk")
+
+#================================================================
+# Класс плиточной отрисовки кадра на canvas. Кадр делится на плитки
+# фиксированного размера в экранных пикселях; на canvas создаются
+# только плитки, пересекающие видимую область. Каждая плитка
+# пересчитывается из ближайшего уровня пирамиды масштабов и
+# кэшируется по ключу (кадр, масштаб, плитка), поэтому при
+# панорамировании уже готовые плитки только сдвигаются.
+# Подсветка бокса (затемнение вокруг) собирается из затемнённого
+# источника и перерисовывает только плитки, затронутые изменением.
+#================================================================
+class TileRenderer:
+    # Тег canvas для всех элементов-плиток
+    TAG = "tile"
+
+    # Инициализация с canvas, размером плитки и лимитом кэша плиток
+    def __init__(self, canvas, tile_size=256, cache_limit_mb=128):
+        # Canvas Tkinter, на котором размещаются плитки
+        self.canvas = canvas
+        # Размер плитки в экранных пикселях
+        self.tile_size = tile_size
+        # Кэш готовых плиток (массивы RGB) по ключу (кадр, вариант, масштаб, плитка)
+        self.tiles = LRUCache(cache_limit_mb * 1024 * 1024, name="tiles")
+        # Ключ текущего источника (например, имя кадра и версия аннотаций)
+        self.source_key = None
+        # Пирамиды источников: вариант ("normal" или ("dim", прозрачность, ...)) -> ImagePyramid
+        self.pyramids = {}
+        # Функция построения затемнённого источника для подсветки
+        self.make_variant = None
+        # Текущая подсветка: (вариант, прямоугольник в экранных пикселях) или None
+        self.focus = None
+        # Текущий масштаб и положение левого верхнего угла изображения на canvas
+        self.scale_factor = 1.0
+        self.origin = (0, 0)
+        # Показанные плитки: (tx, ty) -> [id элемента canvas, PhotoImage, признак содержимого]
+        self.items = {}
+
+    #================================================================
+    # Функция установки источника (кадр RGB с нарисованными боксами).
+    # key должен меняться при изменении содержимого кадра; устаревшие
+    # плитки того же кадра удаляются из кэша. focus_variant - вариант
+    # постоянного затемнения (режим фокуса) или None.
+    #================================================================
+    def set_source(self, key, frame_rgb, make_variant=None, focus_variant=None):
+        frame_name = key[0] if isinstance(key, tuple) else key
+        self.tiles.discard_where(lambda k: _frame_of(k[0]) == frame_name and k[0] != key)
+        self.source_key = key
+        # Кадр уже в порядке каналов для отображения - уровень 0 без перестановки каналов
+        self.pyramids = {"normal": ImagePyramid(frame_rgb)}
+        self.make_variant = make_variant
+        self.focus = (focus_variant, None) if focus_variant is not None else None
+
+    # Размер изображения в экранных пикселях при масштабе scale_factor
+    def display_size(self, scale_factor):
+        width, height = self.pyramids["normal"].size
+        return int(width * scale_factor), int(height * scale_factor)
+
+    #================================================================
+    # Функция установки подсветки: variant - ключ затемнённого варианта
+    # (None - без подсветки), rect - область бокса в экранных пикселях
+    # (None - только затемнённый вариант, например в режиме фокуса без
+    # бокса под курсором). Перерисовываются только плитки, содержимое
+    # которых изменилось; пирамиды прежних затемнённых вариантов удаляются.
+    #================================================================
+    def set_focus(self, variant, rect):
+        focus = (variant, tuple(rect) if rect is not None else None) if variant is not None else None
+        if focus == self.focus:
+            return
+        if variant is not None:
+            self.pyramids = {key: pyramid for key, pyramid in self.pyramids.items()
+                             if key == "normal" or key == variant}
+        self.focus = focus
+        self.render(self.scale_factor, self.origin)
+
+    #================================================================
+    # Функция отрисовки видимых плиток при масштабе scale_factor и
+    # положении изображения origin (x, y) на canvas. Плитки вне
+    # видимой области удаляются с canvas (но остаются в кэше).
+    #================================================================
+    def render(self, scale_factor, origin):
+        if self.source_key is None:
+            return
+        # Сдвиг уже показанных плиток при панорамировании
+        if scale_factor == self.scale_factor and origin != self.origin:
+            self.canvas.move(self.TAG, origin[0] - self.origin[0], origin[1] - self.origin[1])
+        elif scale_factor != self.scale_factor:
+            self.clear()
+        self.scale_factor = scale_factor
+        self.origin = origin
+        visible = set(self.visible_tiles())
+        # Удаление плиток, ушедших из видимой области
+        for tile in [t for t in self.items if t not in visible]:
+            self.canvas.delete(self.items.pop(tile)[0])
+        # Создание или обновление видимых плиток
+        for tile in visible:
+            token = self._token(tile)
+            entry = self.items.get(tile)
+            if entry is not None and entry[2] == token:
+                continue
+            image = Image.fromarray(self._compose(tile))
+            if entry is not None and entry[1].width() == image.width and entry[1].height() == image.height:
+                # Обновление пикселей существующей плитки без создания нового элемента
+                entry[1].paste(image)
+                entry[2] = token
+            else:
+                if entry is not None:
+                    self.canvas.delete(entry[0])
+                photo = ImageTk.PhotoImage(image=image)
+                x = origin[0] + tile[0] * self.tile_size
+                y = origin[1] + tile[1] * self.tile_size
+                item = self.canvas.create_image(x, y, image=photo, anchor="nw", tags=(self.TAG,))
+                self.items[tile] = [item, photo, token]
+
+    # Удаление всех плиток с canvas
+    def clear(self):
+        self.canvas.delete(self.TAG)
+        self.items = {}
+
+    # Удаление плиток и сброс источника (кэш плиток сохраняется)
+    def reset(self):
+        self.clear()
+        self.source_key = None
+        self.pyramids = {}
+        self.focus = None
+
+    #================================================================
+    # Функция расчёта плиток, пересекающих видимую область canvas.
+    #================================================================
+    def visible_tiles(self):
+        width, height = self.display_size(self.scale_factor)
+        # Видимая область canvas в координатах изображения
+        left = self.canvas.canvasx(0) - self.origin[0]
+        top = self.canvas.canvasy(0) - self.origin[1]
+        right = left + (self.canvas.winfo_width() or 1024)
+        bottom = top + (self.canvas.winfo_height() or 768)
+        # Ограничение областью изображения
+        left, top = max(0, left), max(0, top)
+        right, bottom = min(width, right), min(height, bottom)
+        if right <= left or bottom <= top:
+            return []
+        size = self.tile_size
+        return [(tx, ty)
+                for ty in range(int(top // size), int(math.ceil(bottom / size)))
+                for tx in range(int(left // size), int(math.ceil(right / size)))]
+
+    # Экранный прямоугольник плитки, обрезанный по размеру изображения
+    def _tile_rect(self, tile):
+        width, height = self.display_size(self.scale_factor)
+        x1, y1 = tile[0] * self.tile_size, tile[1] * self.tile_size
+        return x1, y1, min(width, x1 + self.tile_size), min(height, y1 + self.tile_size)
+
+    # Признак содержимого плитки: меняется, только если плитку нужно перерисовать
+    def _token(self, tile):
+        if self.focus is None:
+            return self.source_key, None
+        variant, rect = self.focus
+        if rect is not None and _intersects(self._tile_rect(tile), rect):
+            return self.source_key, variant, rect
+        return self.source_key, variant
+
+    #================================================================
+    # Функция сборки плитки с учётом подсветки: затемнённая плитка,
+    # в которую возвращена незатемнённая часть подсвеченного бокса.
+    #================================================================
+    def _compose(self, tile):
+        if self.focus is None:
+            return self._tile("normal", tile)
+        variant, rect = self.focus
+        tx1, ty1, tx2, ty2 = self._tile_rect(tile)
+        if rect is None or not _intersects((tx1, ty1, tx2, ty2), rect):
+            return self._tile(variant, tile)
+        composed = self._tile(variant, tile).copy()
+        normal = self._tile("normal", tile)
+        # Пересечение бокса с плиткой в координатах плитки
+        x1, y1 = max(rect[0], tx1) - tx1, max(rect[1], ty1) - ty1
+        x2, y2 = min(rect[2], tx2) - tx1, min(rect[3], ty2) - ty1
+        composed[y1:y2, x1:x2] = normal[y1:y2, x1:x2]
+        return composed
+
+    #================================================================
+    # Функция получения плитки варианта variant из кэша или её
+    # пересчёта из ближайшего уровня пирамиды (точное аффинное
+    # преобразование без швов между соседними плитками).
+    #================================================================
+    def _tile(self, variant, tile):
+        key = (self.source_key, variant, round(self.scale_factor, 4), tile)
+        pixels = self.tiles.get(key)
+        if pixels is not None:
+            return pixels
+        pyramid = self._pyramid(variant)
+        level_index, _ = pyramid.level_for_scale(self.scale_factor)
+        level = pyramid.level(level_index)
+        width0, height0 = pyramid.size
+        # Точный масштаб уровня по каждой оси (размеры уровней округляются вниз)
+        fx = level.shape[1] / width0 / self.scale_factor
+        fy = level.shape[0] / height0 / self.scale_factor
+        x1, y1, x2, y2 = self._tile_rect(tile)
+        # Экранный пиксель (x, y) плитки -> пиксель уровня пирамиды
+        matrix = np.float32([[fx, 0, (x1 + 0.5) * fx - 0.5], [0, fy, (y1 + 0.5) * fy - 0.5]])
+        pixels = cv2.warpAffine(level, matrix, (x2 - x1, y2 - y1),
+                                flags=cv2.INTER_LINEAR | cv2.WARP_INVERSE_MAP,
+                                borderMode=cv2.BORDER_REPLICATE)
+        self.tiles.put(key, pixels)
+        return pixels
+
+    # Пирамида варианта источника (затемнённые варианты строятся при первом запросе)
+    def _pyramid(self, variant):
+        pyramid = self.pyramids.get(variant)
+        if pyramid is None:
+            pyramid = ImagePyramid(self.make_variant(variant))
+            self.pyramids[variant] = pyramid
+        return pyramid
+
+# Имя кадра из ключа источника (ключ - имя или кортеж, начинающийся с имени)
+def _frame_of(key):
+    return key[0] if isinstance(key, tuple) else key
+
+# Проверка пересечения двух прямоугольников (x1, y1, x2, y2)
+def _intersects(a, b):
+    return a[0] < b[2] and b[0] < a[2] and a[1] < b[3] and b[1] < a[3]